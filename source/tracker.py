@@ -2,15 +2,15 @@
 """Application that receives a video file and initial bounding boxes on the first frame
 of the image and generates a video output with the object trackings
 
-usage: tracker [-h] [-a {KCF,MOSSE,CSRT}] [-t TEXT_COLOR TEXT_COLOR TEXT_COLOR] [-b BOX_COLOR BOX_COLOR BOX_COLOR] [-o OUT_FILE_NAME] [-v {0,1,2,3}] [-l, --log] video initial_conditions
+usage: tracker [-h] [-a {KCF,MOSSE,CSRT,ADAPTIVE}] [-t TEXT_COLOR TEXT_COLOR TEXT_COLOR] [-b BOX_COLOR BOX_COLOR BOX_COLOR] [-o OUT_FILE_NAME] [-v {0,1,2,3}] [-l, --log] [-w WORKERS] [-p PREFETCH] [-q WRITE_QUEUE] [-s SAVE_TRACKINGS] [--scale SCALE] [--search_window SEARCH_WINDOW] [--segments SEGMENTS] [--keyframes KEYFRAMES] [--processes PROCESSES] [--batch BATCH] [--profile PROFILE] [--two_pass] [--real_time] [--reacquire] [--adaptive_budget ADAPTIVE_BUDGET] [--stride STRIDE] [--interpolation {linear,velocity}] [--adaptive_stride] [--kalman KALMAN] [--grayscale] [--reduced_decode] [--incremental] [--load_trackings LOAD_TRACKINGS] [--sidecar {ass,vtt,jsonl} [{ass,vtt,jsonl} ...]] [--codec {MJPG,DIVX,XVID,MP4V,H264,HEVC,VP9}] [--container {avi,mp4,mkv}] [--quality QUALITY] [--resolution WIDTH HEIGHT] [--writer {opencv,ffmpeg}] [--preset PRESET] [--threads THREADS] [--preview PREVIEW] [--preview_step PREVIEW_STEP] [--contact_sheet CONTACT_SHEET] [video] [initial_conditions]
 
 positional arguments:
-  video                 Input video file
+  video                 Input video file, camera device index, streaming url or named pipe
   initial_conditions    Initial conditions (json) file
 
 optional arguments:
   -h, --help            show this help message and exit
-  -a {KCF,MOSSE,CSRT}, --algorithm {KCF,MOSSE,CSRT}
+  -a {KCF,MOSSE,CSRT,ADAPTIVE}, --algorithm {KCF,MOSSE,CSRT,ADAPTIVE}
                         Tracking algorithm (default: KCF)
   -t TEXT_COLOR TEXT_COLOR TEXT_COLOR, --text_color TEXT_COLOR TEXT_COLOR TEXT_COLOR
                         Text color, BGR separated by space (default: [255, 255, 255])
@@ -20,18 +20,87 @@ optional arguments:
   -v {0,1,2,3}, --verbosity {0,1,2,3}
                         Set output verbosity (0- Error, 1 - Warning, 2 - Info, 3 - Debug) (default: 2)
   -l, --log             Log to file (default: False)
+  -w WORKERS, --workers WORKERS
+                        Number of threads used to update the object trackers (default: 1)
+  -p PREFETCH, --prefetch PREFETCH
+                        Number of frames decoded ahead in a background thread, 0 to disable (default: 8)
+  -q WRITE_QUEUE, --write_queue WRITE_QUEUE
+                        Number of frames waiting to be encoded in a background thread, 0 to disable (default: 8)
+  -s SAVE_TRACKINGS, --save_trackings SAVE_TRACKINGS
+                        Save the trackings to this file, json if the extension is .json, binary otherwise (default: None)
+  --scale SCALE         Factor in (0, 1] applied to the frames before tracking (default: 1.0)
+  --search_window SEARCH_WINDOW
+                        Track each object in a crop of the frame of this size relative to its box (default: None)
+  --segments SEGMENTS   Split the video in segments, tracked in parallel processes only when seeded by --keyframes, implies two pass (default: 1)
+  --keyframes KEYFRAMES
+                        Keyframes (json) file with the bounding boxes used to seed the segments (default: None)
+  --processes PROCESSES
+                        Number of processes used to track the segments or run the batch jobs, all the cores if not given (default: None)
+  --batch BATCH         Batch manifest (json or csv) file, runs its jobs instead of a single video (default: None)
+  --profile PROFILE     Write the timing of every stage and object update to this (json) file (default: None)
+  --two_pass            Track the whole video first and then render it, decoding the video twice (default: False)
+  --real_time           Track the most recent frame of the source, dropping the frames that arrive while tracking (default: False)
+  --reacquire           Search the lost objects by template matching and track them again when found (default: False)
+  --adaptive_budget ADAPTIVE_BUDGET
+                        Fraction of the updates of each object run by CSRT instead of MOSSE with the ADAPTIVE algorithm, plus a burst of 10 updates to escalate early, 0 never runs CSRT (default: 0.25)
+  --stride STRIDE       Update the trackers every STRIDE frames and interpolate the frames in between (default: 1)
+  --interpolation {linear,velocity}
+                        Interpolation of the frames between tracker updates (default: linear)
+  --adaptive_stride     Shorten the stride while the objects move fast (default: False)
+  --kalman KALMAN       Smooth the boxes with a Kalman filter and predict lost objects for up to KALMAN frames (default: None)
+  --grayscale           Convert every frame to grayscale once for all the trackers, only with the MOSSE algorithm (default: False)
+  --reduced_decode      Decode the frames at the --scale resolution instead of resizing them for the trackers, implies two pass (default: False)
+  --incremental         Render again only the segments of the output video whose trackings changed since the last render, needs ffmpeg, implies two pass (default: False)
+  --load_trackings LOAD_TRACKINGS
+                        Render the trackings of this file instead of tracking the video, implies two pass (default: None)
+  --sidecar {ass,vtt,jsonl} [{ass,vtt,jsonl} ...]
+                        Write the boxes as annotation files of these formats, drawn by the player, instead of rendering the video, implies two pass (default: None)
+  --codec {MJPG,DIVX,XVID,MP4V,H264,HEVC,VP9}
+                        Codec of the output video, chosen by platform if not given. H264, HEVC and VP9 usually need the ffmpeg writer (default: None)
+  --container {avi,mp4,mkv}
+                        Container of the output video (default: avi)
+  --quality QUALITY     Quality of the output video in [0, 100], higher is better and bigger, only applied by the ffmpeg writer (default: None)
+  --resolution WIDTH HEIGHT
+                        Resolution of the output video, 0 keeps the aspect ratio, as 1280 0 (default: None)
+  --writer {opencv,ffmpeg}
+                        Video writer, OpenCV or an ffmpeg process fed through a pipe (default: opencv)
+  --preset PRESET       Encoder speed preset of the H264 and HEVC codecs with the ffmpeg writer, as ultrafast or veryfast (default: None)
+  --threads THREADS     Encoder threads of the ffmpeg writer, 0 lets ffmpeg choose (default: 0)
+  --preview PREVIEW     Render a preview at this fraction of the resolution instead of the output video, implies two pass (default: None)
+  --preview_step PREVIEW_STEP
+                        Render one of every PREVIEW_STEP frames in the preview, at full resolution without --preview (default: 1)
+  --contact_sheet CONTACT_SHEET
+                        Write a contact sheet image with this number of annotated keyframes per object instead of rendering the video, implies two pass (default: None)
 
 Example: 
     python tracker.py input.mkv initial_conditions.json -a MOSSE -b 0 255 0 -t 255 255 255 -o output -v 2 --log 
+    python tracker.py --batch manifest.json --processes 4
+    python tracker.py 0 initial_conditions.json -a KCF --real_time
+    python tracker.py input.mkv initial_conditions.json -a MOSSE --scale 0.5 --grayscale --reduced_decode
+    python tracker.py input.mkv initial_conditions.json --load_trackings fixed_trackings.json --incremental
+    python tracker.py input.mkv initial_conditions.json -a KCF --sidecar ass jsonl
+    python tracker.py input.mkv initial_conditions.json --load_trackings trackings.json --preview 0.25 --preview_step 2
+    python tracker.py input.mkv initial_conditions.json --writer ffmpeg --codec H264 --container mp4 --preset veryfast --resolution 1280 0
 
 """
 
 from tracker.object_tracker import ObjectTracker
-from tracker.types import TrackerType
+from tracker.types import TrackerType, VideoCodec, VideoFormat, VideoBackend
 from tracker.renderer import  BoundingBoxRenderer 
+from tracker.incremental import IncrementalRenderer
+from tracker.preview import PreviewRenderer
+from tracker.sidecar import SIDECAR_FORMATS
+from tracker.pipeline import TrackingPipeline
+from tracker.segment_tracker import SegmentTracker
+from tracker.profiler import StageProfiler
+from tracker.recovery import TemplateReacquirer
+from tracker.kalman import BatchKalmanFilter
 from tracker import root_logger
 from tracker import utils
+from tracker import batch
 import argparse
+import json
+import os
 import sys
 import logging
 
@@ -42,6 +111,8 @@ def get_tracker_type(name):
         return TrackerType.KCF
     elif name == "CSRT":
         return TrackerType.CSRT
+    elif name == "ADAPTIVE":
+        return TrackerType.ADAPTIVE
     else:
         return TrackerType.MOSSE
 
@@ -57,26 +128,113 @@ if __name__ == "__main__":
     
     # Argument parser configuration
     parser = argparse.ArgumentParser(prog="tracker", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-    parser.add_argument("video", type=str, help="Input video file")
-    parser.add_argument("initial_conditions", type=str, help="Initial conditions (json) file")
-    parser.add_argument("-a", "--algorithm", type=str, choices=["KCF", "MOSSE", "CSRT"], help="Tracking algorithm", default="CSRT")
+    parser.add_argument("video", type=str, nargs="?", help="Input video file, camera device index, streaming url or named pipe")
+    parser.add_argument("initial_conditions", type=str, nargs="?", help="Initial conditions (json) file")
+    parser.add_argument("-a", "--algorithm", type=str, choices=["KCF", "MOSSE", "CSRT", "ADAPTIVE"], help="Tracking algorithm", default="CSRT")
     parser.add_argument("-t", "--text_color", type=int, nargs=3, help="Text color, BGR separated by space", default=[255, 255, 255])
     parser.add_argument("-b", "--box_color", type=int, nargs=3, help="Box color, BGR separated by space", default=[0, 255, 0])
     parser.add_argument("-o", "--out_file_name", type=str, default="out")
     parser.add_argument("-v", "--verbosity", type=int, choices=[0, 1, 2, 3], help="Set output verbosity (0- Error, 1 - Warning, 2 - Info, 3 - Debug)", default=2)
     parser.add_argument("-l", "--log", default=False, action="store_true" , help="Log to file")
+    parser.add_argument("-w", "--workers", type=int, help="Number of threads used to update the object trackers", default=1)
+    parser.add_argument("-p", "--prefetch", type=int, help="Number of frames decoded ahead in a background thread, 0 to disable", default=8)
+    parser.add_argument("-q", "--write_queue", type=int, help="Number of frames waiting to be encoded in a background thread, 0 to disable", default=8)
+    parser.add_argument("-s", "--save_trackings", type=str, help="Save the trackings to this file, json if the extension is .json, binary otherwise", default=None)
+    parser.add_argument("--scale", type=float, help="Factor in (0, 1] applied to the frames before tracking", default=1.0)
+    parser.add_argument("--search_window", type=float, help="Track each object in a crop of the frame of this size relative to its box", default=None)
+    parser.add_argument("--segments", type=int, help="Split the video in segments, tracked in parallel processes only when seeded by --keyframes, implies two pass", default=1)
+    parser.add_argument("--keyframes", type=str, help="Keyframes (json) file with the bounding boxes used to seed the segments", default=None)
+    parser.add_argument("--processes", type=int, help="Number of processes used to track the segments or run the batch jobs, all the cores if not given", default=None)
+    parser.add_argument("--batch", type=str, help="Batch manifest (json or csv) file, runs its jobs instead of a single video", default=None)
+    parser.add_argument("--profile", type=str, help="Write the timing of every stage and object update to this (json) file", default=None)
+    parser.add_argument("--two_pass", default=False, action="store_true", help="Track the whole video first and then render it, decoding the video twice")
+    parser.add_argument("--real_time", default=False, action="store_true", help="Track the most recent frame of the source, dropping the frames that arrive while tracking")
+    parser.add_argument("--reacquire", default=False, action="store_true", help="Search the lost objects by template matching and track them again when found")
+    parser.add_argument("--adaptive_budget", type=float, help="Fraction of the updates of each object run by CSRT instead of MOSSE with the ADAPTIVE algorithm, plus a burst of 10 updates to escalate early, 0 never runs CSRT", default=0.25)
+    parser.add_argument("--stride", type=int, help="Update the trackers every STRIDE frames and interpolate the frames in between", default=1)
+    parser.add_argument("--interpolation", type=str, choices=["linear", "velocity"], help="Interpolation of the frames between tracker updates", default="linear")
+    parser.add_argument("--adaptive_stride", default=False, action="store_true", help="Shorten the stride while the objects move fast")
+    parser.add_argument("--kalman", type=int, help="Smooth the boxes with a Kalman filter and predict lost objects for up to KALMAN frames", default=None)
+    parser.add_argument("--grayscale", default=False, action="store_true", help="Convert every frame to grayscale once for all the trackers, only with the MOSSE algorithm")
+    parser.add_argument("--reduced_decode", default=False, action="store_true", help="Decode the frames at the --scale resolution instead of resizing them for the trackers, implies two pass")
+    parser.add_argument("--incremental", default=False, action="store_true", help="Render again only the segments of the output video whose trackings changed since the last render, needs ffmpeg, implies two pass")
+    parser.add_argument("--load_trackings", type=str, help="Render the trackings of this file instead of tracking the video, implies two pass", default=None)
+    parser.add_argument("--sidecar", type=str, nargs="+", choices=list(SIDECAR_FORMATS), help="Write the boxes as annotation files of these formats, drawn by the player, instead of rendering the video, implies two pass", default=None)
+    parser.add_argument("--codec", type=str, choices=[c.name for c in VideoCodec], help="Codec of the output video, chosen by platform if not given. H264, HEVC and VP9 usually need the ffmpeg writer", default=None)
+    parser.add_argument("--container", type=str, choices=[f.value for f in VideoFormat], help="Container of the output video", default="avi")
+    parser.add_argument("--quality", type=int, help="Quality of the output video in [0, 100], higher is better and bigger, only applied by the ffmpeg writer", default=None)
+    parser.add_argument("--resolution", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"), help="Resolution of the output video, 0 keeps the aspect ratio, as 1280 0", default=None)
+    parser.add_argument("--writer", type=str, choices=[b.value for b in VideoBackend], help="Video writer, OpenCV or an ffmpeg process fed through a pipe", default="opencv")
+    parser.add_argument("--preset", type=str, help="Encoder speed preset of the H264 and HEVC codecs with the ffmpeg writer, as ultrafast or veryfast", default=None)
+    parser.add_argument("--threads", type=int, help="Encoder threads of the ffmpeg writer, 0 lets ffmpeg choose", default=0)
+    parser.add_argument("--preview", type=float, help="Render a preview at this fraction of the resolution instead of the output video, implies two pass", default=None)
+    parser.add_argument("--preview_step", type=int, help="Render one of every PREVIEW_STEP frames in the preview, at full resolution without --preview", default=1)
+    parser.add_argument("--contact_sheet", type=int, help="Write a contact sheet image with this number of annotated keyframes per object instead of rendering the video, implies two pass", default=None)
 
     args = parser.parse_args()
+    if args.batch is None and (args.video is None or args.initial_conditions is None):
+        parser.error("the video and initial_conditions arguments are required without --batch")
+
+    # Device indexes and urls are not files in the in_out path
+    live_source = args.video is not None and utils.is_live_source(args.video)
+    if live_source and (args.two_pass or args.segments > 1 or args.keyframes or args.incremental or args.load_trackings or args.sidecar
+                        or args.preview or args.preview_step > 1 or args.contact_sheet or args.reduced_decode):
+        parser.error("live sources can only be tracked in a single pass")
+    if args.real_time and (args.two_pass or args.segments > 1 or args.keyframes or args.incremental or args.load_trackings or args.sidecar
+                           or args.preview or args.preview_step > 1 or args.contact_sheet or args.reduced_decode):
+        parser.error("--real_time can only be used in a single pass, the dropped frames would have no trackings")
+    if args.incremental and (args.preview or args.preview_step > 1 or args.contact_sheet):
+        parser.error("--incremental can not be combined with --preview or --contact_sheet")
+    if args.grayscale and args.algorithm != TrackerType.MOSSE.name:
+        parser.error("--grayscale is only supported by the MOSSE algorithm")
+    if args.reduced_decode and args.reacquire:
+        parser.error("--reduced_decode can not be combined with --reacquire")
 
     # Read arguments
-    video_file = in_out_path + "/" + args.video
-    objects_to_track_file = in_out_path + "/" + args.initial_conditions
+    batch_file = in_out_path + "/" + args.batch if args.batch else None
+    video_file = args.video if live_source else in_out_path + "/" + str(args.video)
+    objects_to_track_file = in_out_path + "/" + str(args.initial_conditions)
     tracker_type = get_tracker_type(args.algorithm)
     text_color = tuple(args.text_color)
     box_color = tuple(args.box_color)
     out_file_name = args.out_file_name
     log_to_file = args.log
     verbosity = args.verbosity
+    scale = args.scale
+    search_window = args.search_window
+    segments = args.segments
+    keyframes_file = in_out_path + "/" + args.keyframes if args.keyframes else None
+    processes = args.processes
+    segment_tracking = segments > 1 or keyframes_file is not None
+    incremental = args.incremental
+    loaded_trackings_file = in_out_path + "/" + args.load_trackings if args.load_trackings else None
+    sidecar_formats = args.sidecar
+    preview_scale = args.preview if args.preview is not None or args.preview_step == 1 else 1.0
+    preview_step = args.preview_step
+    contact_sheet = args.contact_sheet
+    grayscale = args.grayscale
+    reduced_decode = args.reduced_decode
+    two_pass = (args.two_pass or segment_tracking or incremental or loaded_trackings_file is not None
+                or sidecar_formats is not None or preview_scale is not None or contact_sheet is not None or reduced_decode)
+    workers = args.workers
+    prefetch = args.prefetch
+    write_queue = args.write_queue
+    profile_file = in_out_path + "/" + args.profile if args.profile else None
+    trackings_file = in_out_path + "/" + args.save_trackings if args.save_trackings else None
+    real_time = args.real_time
+    reacquire = args.reacquire
+    adaptive_budget = args.adaptive_budget
+    stride = args.stride
+    interpolation = args.interpolation
+    adaptive_stride = args.adaptive_stride
+    kalman = args.kalman
+    video_codec = VideoCodec[args.codec] if args.codec else None
+    video_format = VideoFormat(args.container)
+    video_quality = args.quality
+    video_resolution = args.resolution
+    video_backend = VideoBackend(args.writer)
+    preset = args.preset
+    threads = args.threads
 
     # Configure logging verbosity
     if verbosity == 0:
@@ -92,18 +250,95 @@ if __name__ == "__main__":
     if log_to_file:
         root_logger.add_file_handler(log_file)
 
+    # Run batch jobs
+    if batch_file is not None:
+        logger.info(f"Running batch manifest {batch_file}")
+        jobs = batch.read_batch_manifest(batch_file)
+        summary = batch.run_batch(jobs, processes, base_path=in_out_path)
+        for result in summary:
+            logger.info(f"{result['video']}: {result['status']} in {result['seconds']:.1f} s {result['error'] or ''}")
+        summary_file = os.path.splitext(batch_file)[0] + "_summary.json"
+        with open(summary_file, "w") as f:
+            json.dump(summary, f, indent=4)
+        logger.info(f"Batch summary written to {summary_file}")
+        sys.exit(0 if all(result["status"] == "ok" for result in summary) else 1)
+
     # Read initial conditions file
-    logger.info("1/3 Reading initial conditions file")
+    step_count = 3 if two_pass else 2
+    logger.info(f"1/{step_count} Reading initial conditions file")
     objects_to_track = utils.read_objects_to_track_file(objects_to_track_file)
 
-    # Create trackings for each object
-    logger.info("2/3 Tracking objects in video")
-    tracker = ObjectTracker(tracker_type)
-    object_trackings = tracker.track_objects(video_file, objects_to_track)
-    
-    # Render video
-    logger.info("3/3 Rendering output video")
-    renderer = BoundingBoxRenderer()
+    # Create profiler, tracker and renderer
+    profiler = StageProfiler() if profile_file is not None else None
+    reacquirer = TemplateReacquirer() if reacquire else None
+    kalman_filter = BatchKalmanFilter(kalman) if kalman is not None else None
+    tracker = ObjectTracker(tracker_type, workers, prefetch, scale, search_window, real_time, reacquirer, adaptive_budget,
+                            stride, interpolation, adaptive_stride, kalman_filter, grayscale, reduced_decode)
+    if incremental:
+        renderer = IncrementalRenderer(prefetch, write_queue)
+    elif preview_scale is not None or contact_sheet is not None:
+        renderer = PreviewRenderer(prefetch, write_queue, preview_scale or 1.0, preview_step)
+    else:
+        renderer = BoundingBoxRenderer(prefetch, write_queue)
     renderer.set_box_format(box_color, 2)
     renderer.set_text_format(text_color, 2, 0.8)
-    renderer.render(video_file, object_trackings, out_path=in_out_path, file_name=out_file_name)
+    renderer.set_video_format(video_codec, video_format, video_quality, video_resolution, video_backend, preset, threads)
+
+    if two_pass:
+        # Create trackings for each object
+        if loaded_trackings_file is not None:
+            logger.info(f"2/3 Reading trackings file {loaded_trackings_file}")
+            object_trackings = utils.read_trackings_file(loaded_trackings_file, memory_map=False)
+        elif segment_tracking:
+            logger.info("2/3 Tracking objects in video")
+            keyframes = utils.read_keyframes_file(keyframes_file) if keyframes_file else None
+            segment_tracker = SegmentTracker(tracker, segments, processes)
+            object_trackings = segment_tracker.track_objects(video_file, objects_to_track, keyframes)
+            for seam in segment_tracker.seams:
+                logger.info(f"Seam in frame {seam['frame']}, seed: {seam['seed']}, lost objects: {seam['lost_objects']}")
+        else:
+            logger.info("2/3 Tracking objects in video")
+            object_trackings = tracker.track_objects(video_file, objects_to_track, profiler=profiler)
+        
+        # Write the annotations and contact sheet instead of the video, a requested preview is rendered too
+        if sidecar_formats is not None or contact_sheet is not None:
+            logger.info("3/3 Writing annotation files")
+            if sidecar_formats is not None:
+                renderer.render_sidecar(video_file, object_trackings, out_path=in_out_path, file_name=out_file_name,
+                                        formats=sidecar_formats)
+            if contact_sheet is not None:
+                renderer.render_contact_sheet(video_file, object_trackings, out_path=in_out_path,
+                                              file_name=out_file_name + "_sheet", thumbnails=contact_sheet)
+        if (sidecar_formats is None and contact_sheet is None) or args.preview is not None or args.preview_step > 1:
+            logger.info("3/3 Rendering output video")
+            renderer.render(video_file, object_trackings, out_path=in_out_path, file_name=out_file_name, profiler=profiler)
+        if incremental and renderer.render_stats is not None:
+            stats = renderer.render_stats
+            logger.info(f"Render {stats['mode']}: {len(stats['rendered_segments'])}/{stats['segments']} segments, "
+                        f"{stats['rendered_frames']} frames rendered")
+    else:
+        # Track objects and render video in a single pass
+        logger.info("2/2 Tracking objects and rendering output video")
+        pipeline = TrackingPipeline(tracker, renderer)
+        object_trackings = pipeline.run(video_file, objects_to_track, out_path=in_out_path, file_name=out_file_name, profiler=profiler)
+        if tracker.real_time_stats is not None:
+            stats = tracker.real_time_stats
+            logger.info(f"Real time: {stats['frames_tracked']} frames tracked, {stats['frames_dropped']} dropped, "
+                        f"latency mean {stats['mean_latency_ms']:.1f} ms, max {stats['max_latency_ms']:.1f} ms")
+
+    # Report re-acquired objects, segment tracking re-acquires them in the worker processes
+    if reacquirer is not None and not segment_tracking:
+        report = reacquirer.report()
+        logger.info(f"{len(report['events'])} objects re-acquired in {report['attempts']} searches, {report['seconds']:.2f} s")
+
+    # Save trackings
+    if trackings_file is not None:
+        logger.info(f"Saving trackings to {trackings_file}")
+        utils.write_trackings_file(trackings_file, object_trackings)
+
+    # Write profile
+    if profiler is not None:
+        profiler.write(profile_file)
+        for name, loop in profiler.report()["loops"].items():
+            logger.info(f"{name}: {loop['frames']} frames, {loop['fps']:.1f} frames/s")
+        logger.info(f"Profile written to {profile_file}")
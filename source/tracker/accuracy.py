@@ -0,0 +1,227 @@
+"""Accuracy versus speed benchmark of the tracker configurations
+
+    Runs every configuration, a combination of tracker type, scale and stride, on a set of reference clips
+    with reference trackings. Each run is evaluated with metrics.evaluate and timed, and the configurations
+    are compared in a table sorted by speed, where the Pareto optimal ones, those that no other configuration
+    beats in both accuracy and speed, are marked with a *.
+
+    The reference clips are listed in a json file, the paths are relative to the file:
+
+        [
+            {"name": "input", "video": "input.mkv", "initial_conditions": "initial_conditions.json",
+             "reference": "input_trackings.json"},
+            ...
+        ]
+
+    The default clip is the input video of the tests, tests/data/input.mkv with its reference trackings
+    tests/data/input_trackings.json.
+
+    Usage, from the source directory:
+
+        python -m tracker.accuracy --out accuracy.json
+        python -m tracker.accuracy --trackers KCF MOSSE --scales 1 0.5 --strides 1 2 4 --frames 100
+        python -m tracker.accuracy --clips clips.json
+
+    The json file has the following structure:
+
+        {
+            "environment": see benchmark.get_environment,
+            "results": [
+                {
+                    "case": (string) unique case name, configuration and clip,
+                    "clip": (string) clip name,
+                    "tracker": (string) tracker type,
+                    "scale": (float) scale of the frames,
+                    "stride": (int) stride of the tracker updates,
+                    "frames": (int) tracked frames,
+                    "fps": (float) tracked frames per second, including the decode,
+                    "mean_iou", "success_auc", "precision_20", "mota", "idf1": (float) see metrics.evaluate,
+                    "error": (string) error message if the case failed, None otherwise
+                },
+
+                ...
+            ],
+            "summary": [
+                {"configuration": (string) configuration name, "tracker", "scale", "stride",
+                 "frames", "fps", "mean_iou", "success_auc", "precision_20", "mota", "idf1",
+                 "pareto": (bool) True if the configuration is Pareto optimal}
+
+                ...
+            ]
+        }
+
+    The accuracy of the summary is the mean over the clips weighted by their frames and the fps is the total
+    frames over the total time. The Pareto front uses the mean iou as accuracy.
+"""
+
+import argparse
+import itertools
+import json
+import time
+from os import path
+import numpy as np
+from tracker.object_tracker import ObjectTracker
+from tracker.types import TrackerType
+from tracker import benchmark
+from tracker import metrics
+from tracker import utils
+import logging
+from tracker import root_logger
+
+
+# Define logger for this module
+logger = logging.getLogger(root_logger.LOGGER_NAME + ".accuracy")
+
+
+# Reference clips used when no clips file is given, relative to the source directory
+DEFAULT_CLIPS = [
+    {"name": "input", "video": "tracker/tests/data/input.mkv",
+     "initial_conditions": "tracker/tests/data/initial_conditions.json",
+     "reference": "tracker/tests/data/input_trackings.json"}
+]
+
+# Accuracy metrics of the results
+ACCURACY_METRICS = ("mean_iou", "success_auc", "precision_20", "mota", "idf1")
+
+
+def read_clips_file(clips_file):
+    """Reads a reference clips json file, returns the clips with the paths relative to the working directory"""
+
+    with open(clips_file) as f:
+        clips = json.load(f)
+
+    base_path = path.dirname(clips_file)
+    for k, clip in enumerate(clips):
+        for key in ("video", "initial_conditions", "reference"):
+            if key not in clip:
+                raise ValueError(f"Clip {k} has no {key}")
+            clip[key] = path.join(base_path, clip[key])
+        clip.setdefault("name", path.splitext(path.basename(clip["video"]))[0])
+    return clips
+
+
+def build_configurations(trackers, scales, strides):
+    """Returns the list of configurations, every combination of tracker, scale and stride"""
+    return [{"configuration": f"{tracker}/scale={scale:g}/stride={stride}", "tracker": tracker, "scale": scale,
+             "stride": stride} for tracker, scale, stride in itertools.product(trackers, scales, strides)]
+
+
+def run_case(configuration, clip, max_frames=None):
+    """Tracks a clip with a configuration and evaluates it against the clip reference trackings
+
+    Returns:
+        The case result, see the module documentation
+    """
+
+    result = {"case": f"{configuration['configuration']}/{clip['name']}", "clip": clip["name"],
+              "tracker": configuration["tracker"], "scale": configuration["scale"], "stride": configuration["stride"],
+              "frames": 0, "fps": 0.0, **{key: 0.0 for key in ACCURACY_METRICS}, "error": None}
+    try:
+        objects_to_track = utils.read_objects_to_track_file(clip["initial_conditions"])
+        reference_trackings = utils.read_trackings_file(clip["reference"])
+        tracker = ObjectTracker(TrackerType[configuration["tracker"]], scale=configuration["scale"],
+                                stride=configuration["stride"])
+
+        start = time.perf_counter()
+        trackings = tracker.track_objects(clip["video"], objects_to_track, stop_frame=max_frames)
+        seconds = time.perf_counter() - start
+
+        report = metrics.evaluate(trackings, reference_trackings)
+        result["frames"] = trackings.frame_count
+        result["fps"] = trackings.frame_count / seconds
+        result.update({key: report[key] for key in ("mean_iou", "success_auc", "precision_20")})
+        result.update({key: report["mot"][key] for key in ("mota", "idf1")})
+    except Exception as e:
+        result["error"] = repr(e)
+
+    return result
+
+
+def run_accuracy(configurations, clips, max_frames=None):
+    """Runs every configuration on every clip, returns the list of results"""
+
+    results = []
+    for configuration in configurations:
+        for clip in clips:
+            result = run_case(configuration, clip, max_frames)
+            if result["error"] is None:
+                logger.info(f"{result['case']}: {result['fps']:.1f} fps, mean iou {result['mean_iou']:.3f}")
+            else:
+                logger.warning(f"{result['case']}: failed, {result['error']}")
+            results.append(result)
+
+    return results
+
+
+def summarize(configurations, results):
+    """Returns the summary of every configuration over the clips, with its Pareto optimality
+
+    A configuration with a failed case is not in the summary
+    """
+
+    summary = []
+    for configuration in configurations:
+        cases = [result for result in results if result["case"].startswith(configuration["configuration"] + "/")]
+        if not cases or any(result["error"] is not None for result in cases):
+            continue
+
+        frames = np.array([result["frames"] for result in cases])
+        seconds = sum(result["frames"] / result["fps"] for result in cases if result["fps"] > 0)
+        item = dict(configuration, frames=int(frames.sum()), fps=float(frames.sum() / seconds) if seconds > 0 else 0.0)
+        for key in ACCURACY_METRICS:
+            item[key] = float(np.average([result[key] for result in cases], weights=np.maximum(frames, 1)))
+        summary.append(item)
+
+    pareto = pareto_front([item["fps"] for item in summary], [item["mean_iou"] for item in summary])
+    for item, optimal in zip(summary, pareto):
+        item["pareto"] = bool(optimal)
+    return summary
+
+
+def pareto_front(speeds, accuracies):
+    """Returns a bool array, True for the points that no other point beats in both speed and accuracy"""
+
+    speeds = np.asarray(speeds, dtype=float)
+    accuracies = np.asarray(accuracies, dtype=float)
+    at_least = (speeds[None, :] >= speeds[:, None]) & (accuracies[None, :] >= accuracies[:, None])
+    better = (speeds[None, :] > speeds[:, None]) | (accuracies[None, :] > accuracies[:, None])
+    return ~(at_least & better).any(axis=1)
+
+
+def format_table(summary):
+    """Returns the summary as a text table sorted by speed, the Pareto optimal configurations marked with a *"""
+
+    lines = [f"  {'configuration':32s} {'fps':>8s} {'mean iou':>9s} {'auc':>6s} {'prec@20':>8s} {'mota':>7s} {'idf1':>6s}"]
+    for item in sorted(summary, key=lambda item: -item["fps"]):
+        lines.append(f"{'*' if item['pareto'] else ' '} {item['configuration']:32s} {item['fps']:8.1f} "
+                     f"{item['mean_iou']:9.3f} {item['success_auc']:6.3f} {item['precision_20']:8.3f} "
+                     f"{item['mota']:7.3f} {item['idf1']:6.3f}")
+    return "\n".join(lines)
+
+
+#######################################################################
+######################## Accuracy application #########################
+#######################################################################
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(prog="accuracy", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--clips", type=str, help="Reference clips (json) file, the input video of the tests if not given", default=None)
+    parser.add_argument("--trackers", type=str, nargs="+", choices=[t.name for t in TrackerType], default=[t.name for t in TrackerType])
+    parser.add_argument("--scales", type=float, nargs="+", help="Scales of the frames before tracking", default=[1.0, 0.5])
+    parser.add_argument("--strides", type=int, nargs="+", help="Strides of the tracker updates", default=[1, 2])
+    parser.add_argument("--frames", type=int, help="Maximum frames per clip, all if not given", default=None)
+    parser.add_argument("--out", type=str, help="Results (json) file", default="accuracy_results.json")
+    args = parser.parse_args()
+
+    root_logger.logger.setLevel(logging.INFO)
+
+    clips = read_clips_file(args.clips) if args.clips else DEFAULT_CLIPS
+    configurations = build_configurations(args.trackers, args.scales, args.strides)
+    results = run_accuracy(configurations, clips, args.frames)
+    summary = summarize(configurations, results)
+
+    with open(args.out, "w") as f:
+        json.dump({"environment": benchmark.get_environment(), "results": results, "summary": summary}, f, indent=4)
+    logger.info(f"Results written to {args.out}")
+
+    print(format_table(summary))
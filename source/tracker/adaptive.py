@@ -0,0 +1,158 @@
+"""Implements a single object tracker that switches between a cheap and an accurate tracker
+
+    Most of the time objects move smoothly and a cheap tracker (MOSSE) is enough, the accurate tracker (CSRT)
+    is only needed while the object moves fast or the cheap tracker loses it. AdaptiveTracker runs the cheap
+    tracker by default and escalates to the accurate one when:
+
+        the cheap tracker loses the object, the frame is reported as lost and the accurate tracker is
+            initialized in the last tracked bounding box
+        the object moves more than motion_threshold times its size in a frame
+
+    The object is demoted back to the cheap tracker after calm_frames consecutive frames tracked by the accurate
+    tracker with a motion below half the threshold. Each switch initializes the new tracker in the current frame
+    and bounding box.
+
+    The budget limits the cost: the accurate tracker can run in a budget fraction of the updates of the object,
+    plus a burst of calm_frames updates so it can escalate early in the video. Out of budget the object is
+    demoted and does not escalate, so a hard object can not make every frame run the accurate tracker. A
+    budget of 0 has no burst, the accurate tracker never runs.
+
+    Typical usage:
+
+        tracker = AdaptiveTracker(cv.TrackerMOSSE_create, cv.TrackerCSRT_create, budget=0.25)
+        tracker.init(frame, bounding_box)
+        track_status, bounding_box = tracker.update(next_frame)
+        print(tracker.stats)
+
+    The stats dictionary counts the updates run by each tracker and the switches, it can be shared by the
+    successive trackers of an object:
+
+        {"cheap_updates": int, "accurate_updates": int, "escalations": int, "demotions": int}
+"""
+
+import math
+import logging
+from tracker import root_logger
+
+
+# Define logger for this module
+logger = logging.getLogger(root_logger.LOGGER_NAME + ".adaptive")
+
+
+def create_adaptive_stats():
+    """Returns empty adaptive tracker stats"""
+    return {"cheap_updates": 0, "accurate_updates": 0, "escalations": 0, "demotions": 0}
+
+
+class AdaptiveTracker:
+    """Tracks an object with a cheap tracker, escalating to an accurate tracker while it is hard to track"""
+
+    def __init__(self, create_cheap_tracker, create_accurate_tracker, budget=0.25, motion_threshold=0.2,
+                 calm_frames=10, stats=None):
+        """Initialize the adaptive tracker parameters
+
+        Args:
+            create_cheap_tracker: function that returns a new cheap single object tracker
+            create_accurate_tracker: function that returns a new accurate single object tracker
+            budget: maximum fraction of the updates of the object run by the accurate tracker, in [0, 1], plus
+                a burst of calm_frames updates unless it is 0
+            motion_threshold: displacement of the bounding box center in a frame, relative to the bounding
+                box size, that escalates to the accurate tracker
+            calm_frames: consecutive low motion frames tracked by the accurate tracker before demoting
+            stats: optional stats dictionary updated by the tracker, see create_adaptive_stats
+
+        Raises:
+            ValueError: if budget is not in [0, 1]
+            ValueError: if motion_threshold is not positive
+            ValueError: if calm_frames is less than 1
+        """
+
+        if budget < 0 or budget > 1:
+            raise ValueError("Budget must be in [0, 1]")
+        if motion_threshold <= 0:
+            raise ValueError("Motion threshold must be a positive value")
+        if calm_frames < 1:
+            raise ValueError("Calm frames must be a positive value")
+
+        self._create_cheap_tracker = create_cheap_tracker
+        self._create_accurate_tracker = create_accurate_tracker
+        self._budget = budget
+        self._motion_threshold = motion_threshold
+        self._calm_frames = calm_frames
+        self.stats = stats if stats is not None else create_adaptive_stats()
+        self._tracker = None
+        self._accurate = False
+        self._calm_count = 0
+        self._bounding_box = None
+
+    def init(self, frame, bounding_box):
+        """Initialize the cheap tracker"""
+
+        self._bounding_box = tuple([int(i) for i in bounding_box])
+        return self._switch(frame, self._bounding_box, accurate=False)
+
+    def update(self, frame):
+        """Update the active tracker and switch trackers if needed
+
+        Returns:
+            (track_status, bounding_box)
+        """
+
+        track_status, bounding_box = self._tracker.update(frame)
+        if self._accurate:
+            self.stats["accurate_updates"] += 1
+        else:
+            self.stats["cheap_updates"] += 1
+
+        # The cheap tracker lost the object, the frame is lost and the accurate tracker follows it
+        # from the last tracked bounding box in the next frames
+        if not track_status:
+            if self._accurate and not self._within_budget():
+                self._switch(frame, self._bounding_box, accurate=False)
+                self.stats["demotions"] += 1
+            elif not self._accurate and self._within_budget():
+                self._escalate(frame, self._bounding_box)
+            return (track_status, bounding_box)
+
+        motion = self._motion(bounding_box)
+        if self._accurate:
+            self._calm_count = self._calm_count + 1 if motion < self._motion_threshold / 2 else 0
+            if self._calm_count >= self._calm_frames or not self._within_budget():
+                self._switch(frame, tuple([int(i) for i in bounding_box]), accurate=False)
+                self.stats["demotions"] += 1
+        elif motion >= self._motion_threshold and self._within_budget():
+            self._escalate(frame, tuple([int(i) for i in bounding_box]))
+
+        return (track_status, bounding_box)
+
+    def _escalate(self, frame, bounding_box):
+        """Switch to the accurate tracker in the bounding box"""
+        self._switch(frame, bounding_box, accurate=True)
+        self.stats["escalations"] += 1
+        logger.debug(f"Escalated to the accurate tracker in {bounding_box}")
+
+    def _switch(self, frame, bounding_box, accurate):
+        """Initialize the cheap or the accurate tracker in the frame and bounding box"""
+
+        self._tracker = self._create_accurate_tracker() if accurate else self._create_cheap_tracker()
+        self._accurate = accurate
+        self._calm_count = 0
+        self._bounding_box = bounding_box
+        return self._tracker.init(frame, bounding_box)
+
+    def _motion(self, bounding_box):
+        """Updates the last bounding box and returns the center displacement relative to the bounding box size"""
+
+        x, y, width, height = self._bounding_box
+        new_x, new_y, new_width, new_height = bounding_box
+        dx = (new_x + new_width / 2) - (x + width / 2)
+        dy = (new_y + new_height / 2) - (y + height / 2)
+        self._bounding_box = tuple([int(i) for i in bounding_box])
+        return math.hypot(dx, dy) / max(math.sqrt(new_width * new_height), 1)
+
+    def _within_budget(self):
+        """Returns True if the accurate tracker ran in less than the budget fraction of the updates, plus a burst"""
+        if self._budget == 0:
+            return False
+        updates = self.stats["cheap_updates"] + self.stats["accurate_updates"]
+        return self.stats["accurate_updates"] < self._budget * updates + self._calm_frames
@@ -0,0 +1,214 @@
+"""Implements a batch job runner to track and render many videos in a single application run
+
+    The jobs are defined in a manifest file, json or csv. Each job has a video, an initial conditions file
+    and optional options, the options have the same names as the long options of the tracker application.
+
+    Json manifest:
+
+        [
+            {
+                "video": "clip_1.mkv",
+                "initial_conditions": "clip_1.json",
+                "options": {"algorithm": "KCF", "out_file_name": "clip_1_out"}
+            },
+
+            ...
+        ]
+
+    Csv manifest, with a header line and one column per option:
+
+        video,initial_conditions,algorithm,out_file_name
+        clip_1.mkv,clip_1.json,KCF,clip_1_out
+        ...
+
+    The jobs are run in a pool of processes. A failed job does not stop the others, the summary
+    returned by run_batch has the status and timing of every job:
+
+        {
+            "video": (string) video file of the job,
+            "status": (string) "ok" or "failed",
+            "error": (string) error message if failed, None otherwise,
+            "seconds": (float) wall time of the job,
+            "frame_count": (int) tracked frames, 0 if failed
+        }
+
+    Typical usage:
+
+        jobs = read_batch_manifest("manifest.json")
+        summary = run_batch(jobs, processes=4, base_path="./in_out")
+"""
+
+import csv
+import json
+import time
+from os import path
+from concurrent.futures import ProcessPoolExecutor
+from tracker.object_tracker import ObjectTracker
+from tracker.renderer import BoundingBoxRenderer
+from tracker.pipeline import TrackingPipeline
+from tracker.recovery import TemplateReacquirer
+from tracker.kalman import BatchKalmanFilter
+from tracker.types import TrackerType, VideoCodec, VideoFormat, VideoBackend
+from tracker import utils
+import logging
+from tracker import root_logger
+
+
+# Define logger for this module
+logger = logging.getLogger(root_logger.LOGGER_NAME + ".batch")
+
+# Job options and its default values, as in the tracker application
+DEFAULT_OPTIONS = {
+    "algorithm": "CSRT",
+    "text_color": [255, 255, 255],
+    "box_color": [0, 255, 0],
+    "out_file_name": None,
+    "workers": 1,
+    "prefetch": 8,
+    "write_queue": 8,
+    "save_trackings": None,
+    "scale": 1.0,
+    "search_window": None,
+    "reacquire": False,
+    "adaptive_budget": 0.25,
+    "stride": 1,
+    "interpolation": "linear",
+    "adaptive_stride": False,
+    "kalman": None,
+    "grayscale": False,
+    "codec": None,
+    "container": None,
+    "quality": None,
+    "resolution": None,
+    "writer": "opencv",
+    "preset": None,
+    "threads": 0
+}
+
+
+def read_batch_manifest(manifest_file):
+    """Reads a json or csv manifest file and returns the list of jobs
+
+    Each job is a dictionary with the "video", "initial_conditions" and "options" keys
+
+    Raises:
+        ValueError: if a job has no video or initial conditions
+        ValueError: if a job has an unknown option
+    """
+
+    with open(manifest_file, newline="") as f:
+        if manifest_file.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+            jobs = []
+            for row in rows:
+                options = {key: _parse_csv_option(key, value) for key, value in row.items()
+                           if key not in ("video", "initial_conditions") and value not in (None, "")}
+                jobs.append({"video": row.get("video"), "initial_conditions": row.get("initial_conditions"), "options": options})
+        else:
+            jobs = json.load(f)
+
+    for job in jobs:
+        if not job.get("video") or not job.get("initial_conditions"):
+            raise ValueError("Every job must have a video and an initial conditions file")
+        job.setdefault("options", {})
+        for key in job["options"]:
+            if key not in DEFAULT_OPTIONS:
+                raise ValueError(f"Unknown job option {key}")
+
+    return jobs
+
+
+def run_batch(jobs, processes=None, base_path="."):
+    """Runs the jobs in a pool of processes
+
+    Args:
+        jobs: list of jobs, see read_batch_manifest
+        processes: number of jobs run at the same time, None uses the number of cores
+        base_path: directory of the input files and the outputs of the jobs
+
+    Returns:
+        The summary of the jobs, a list with the status and timing of every job in the order of the jobs
+
+    Raises:
+        ValueError: if processes is less than 1
+    """
+
+    if processes is not None and processes < 1:
+        raise ValueError("Processes must be a positive value")
+
+    logger.info(f"Running {len(jobs)} jobs")
+    summary = []
+    with ProcessPoolExecutor(processes) as executor:
+        futures = [executor.submit(run_job, job, base_path) for job in jobs]
+        for job, future in zip(jobs, futures):
+
+            # The job catches its own errors, this only fails if the worker process dies
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"video": job["video"], "status": "failed", "error": repr(e), "seconds": 0.0, "frame_count": 0}
+            summary.append(result)
+
+    failed_count = len([result for result in summary if result["status"] != "ok"])
+    logger.info(f"Batch finished, {len(summary) - failed_count} jobs ok, {failed_count} failed")
+    return summary
+
+
+def run_job(job, base_path="."):
+    """Tracks and renders the video of a job, never raises
+
+    Returns:
+        The status and timing of the job
+    """
+
+    start = time.perf_counter()
+    result = {"video": job["video"], "status": "ok", "error": None, "seconds": 0.0, "frame_count": 0}
+    try:
+        options = dict(DEFAULT_OPTIONS, **job.get("options", {}))
+        out_file_name = options["out_file_name"] or path.splitext(path.basename(job["video"]))[0] + "_out"
+        video_file = path.join(base_path, job["video"])
+
+        # Track and render in a single pass
+        objects_to_track = utils.read_objects_to_track_file(path.join(base_path, job["initial_conditions"]))
+        tracker = ObjectTracker(TrackerType[options["algorithm"]], options["workers"], options["prefetch"],
+                                options["scale"], options["search_window"],
+                                reacquire=TemplateReacquirer() if options["reacquire"] else None,
+                                adaptive_budget=options["adaptive_budget"], stride=options["stride"],
+                                interpolation=options["interpolation"], adaptive_stride=options["adaptive_stride"],
+                                kalman=BatchKalmanFilter(options["kalman"]) if options["kalman"] is not None else None,
+                                grayscale=options["grayscale"])
+        renderer = BoundingBoxRenderer(options["prefetch"], options["write_queue"])
+        renderer.set_box_format(tuple(options["box_color"]), 2)
+        renderer.set_text_format(tuple(options["text_color"]), 2, 0.8)
+        renderer.set_video_format(VideoCodec[options["codec"]] if options["codec"] else None,
+                                  VideoFormat(options["container"]) if options["container"] else None,
+                                  options["quality"], options["resolution"], VideoBackend(options["writer"]),
+                                  options["preset"], options["threads"])
+        object_trackings = TrackingPipeline(tracker, renderer).run(video_file, objects_to_track, out_path=base_path,
+                                                                   file_name=out_file_name)
+
+        if options["save_trackings"]:
+            utils.write_trackings_file(path.join(base_path, options["save_trackings"]), object_trackings)
+        result["frame_count"] = object_trackings.frame_count
+
+    except Exception as e:
+        logger.error(f"job {job['video']} failed: {e}")
+        result["status"] = "failed"
+        result["error"] = repr(e)
+
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def _parse_csv_option(key, value):
+    """Converts a csv option value to the type of its default value"""
+
+    if key in ("text_color", "box_color", "resolution"):
+        return [int(c) for c in value.split()]
+    if key in ("workers", "prefetch", "write_queue", "stride", "kalman", "quality", "threads"):
+        return int(value)
+    if key in ("scale", "search_window", "adaptive_budget"):
+        return float(value)
+    if key in ("reacquire", "adaptive_stride", "grayscale"):
+        return value.strip().lower() in ("1", "true", "yes")
+    return value
@@ -0,0 +1,387 @@
+"""Benchmark of the tracking and rendering throughput
+
+    Measures the frames per second, the time per frame of every stage (decode, track, draw, write)
+    and the peak memory of:
+
+        decode: only decoding the video with an OpenCV capture, the baseline of every other case
+        track: tracking with each tracker type with ObjectTracker.track_objects, on the input video and on
+            synthetic videos with several object counts and resolutions
+        render: drawing and encoding the video with fixed trackings with BoundingBoxRenderer.render
+        encode: rendering the input video without objects with each encoder, a writer backend, codec, container
+            and optional speed preset as "ffmpeg/H264/mp4/veryfast", see BoundingBoxRenderer.set_video_format.
+            The size of the output video is measured too. Encoders that are not available fail
+
+    The track, render and encode cases time the public entry points with the prefetch thread and the
+    background writer of the tracker application, the stages are measured by a profiler.StageProfiler. The
+    decode and write stages are then the time waiting for the prefetched frames and the writer queue.
+
+    Every case runs in its own process so the peak resident memory (RSS) belongs to that case. The results
+    are written to a json file that can be compared with the results of another commit.
+
+    Usage, from the source directory:
+
+        python -m tracker.benchmark --out results.json
+        python -m tracker.benchmark --trackers KCF CSRT --objects 1 10 --resolutions 1280x720 --frames 50
+        python -m tracker.benchmark --out new.json --compare old.json
+        python -m tracker.benchmark --trackers KCF --objects 1 --resolutions 640x360 --encoders opencv/XVID/avi ffmpeg/H264/mp4/veryfast
+
+    The json file has the following structure:
+
+        {
+            "environment": {"commit": ..., "opencv": ..., "python": ..., "platform": ..., "date": ...},
+            "results": [
+                {
+                    "case": (string) unique case name, used to compare results,
+                    "stage": (string) "decode", "track", "render" or "encode",
+                    "video": (string) input video, "synthetic" for the generated ones,
+                    "tracker": (string) tracker type, None for decode, render and encode,
+                    "encoder": (string) encoder, None except for encode,
+                    "objects": (int) number of objects,
+                    "resolution": (string) width x height,
+                    "frames": (int) processed frames,
+                    "fps": (float) frames per second,
+                    "ms_per_frame": (dict) milliseconds per frame of every stage,
+                    "peak_rss_mb": (float) peak resident memory of the case process, None where the resource
+                        module is not available, as on windows,
+                    "output_mb": (float) size of the encoded video, None except for encode,
+                    "error": (string) error message if the case failed, None otherwise
+                },
+
+                ...
+            ]
+        }
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import os
+import tempfile
+import time
+from os import path
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import cv2 as cv
+from tracker.object_tracker import ObjectTracker
+from tracker.renderer import BoundingBoxRenderer
+from tracker.trackings import Trackings
+from tracker.profiler import StageProfiler
+from tracker.types import TrackerType, VideoBackend, VideoCodec, VideoFormat
+from tracker import utils
+import logging
+from tracker import root_logger
+
+# The resource module only exists on unix, the peak memory is not measured elsewhere
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Define logger for this module
+logger = logging.getLogger(root_logger.LOGGER_NAME + ".benchmark")
+
+# Prefetched and queued frames of the track and render cases, the defaults of the tracker application
+PREFETCH = 8
+WRITE_QUEUE = 8
+
+# Encoders of the encode cases, writer backend/codec/container[/preset]
+DEFAULT_ENCODERS = ["opencv/XVID/avi", "opencv/MJPG/avi", "opencv/MP4V/mp4", "ffmpeg/XVID/avi",
+                    "ffmpeg/H264/mp4/ultrafast", "ffmpeg/H264/mp4/veryfast", "ffmpeg/HEVC/mp4/ultrafast", "ffmpeg/VP9/mkv"]
+
+
+def make_synthetic_video(video_file, width, height, frame_count, object_count, seed=0):
+    """Writes a video with textured objects moving over a textured background
+
+    Returns:
+        The objects to track, in the format of utils.read_objects_to_track_file
+    """
+
+    random_state = np.random.RandomState(seed)
+    background = random_state.randint(0, 80, (height, width, 3), dtype=np.uint8)
+    size = max(min(width, height) // 10, 8)
+    positions = random_state.uniform(0, [width - size, height - size], (object_count, 2))
+    velocities = random_state.uniform(-3, 3, (object_count, 2)) * width / 640
+    patches = random_state.randint(100, 255, (object_count, size, size, 3), dtype=np.uint8)
+
+    objects_to_track = [{"object": "object", "id": k, "coordinates": (int(x), int(y), size, size)}
+                        for k, (x, y) in enumerate(positions)]
+
+    video_writer = cv.VideoWriter(video_file, cv.VideoWriter_fourcc(*"MJPG"), 25, (width, height))
+    for i in range(frame_count):
+        frame = background.copy()
+        for (x, y), patch in zip(positions.astype(int), patches):
+            frame[y:y + size, x:x + size] = patch
+        video_writer.write(frame)
+
+        # Bounce on the frame borders
+        positions = positions + velocities
+        out = (positions < 0) | (positions > [width - size, height - size])
+        velocities[out] = -velocities[out]
+        positions = np.clip(positions, 0, [width - size, height - size])
+    video_writer.release()
+
+    return objects_to_track
+
+
+def run_decode_case(video_file, max_frames):
+    """Decodes the video with an OpenCV capture, returns the number of frames, the seconds and the seconds of
+    every stage"""
+
+    video_capture = cv.VideoCapture(video_file)
+    times = {"decode": 0.0}
+    frame_count = 0
+    while frame_count < max_frames:
+        start = time.perf_counter()
+        read_ok, _ = video_capture.read()
+        times["decode"] += time.perf_counter() - start
+        if not read_ok:
+            break
+        frame_count = frame_count + 1
+    video_capture.release()
+
+    return frame_count, times["decode"], times
+
+
+def run_track_case(video_file, objects_to_track, tracker_type, max_frames):
+    """Tracks the video with ObjectTracker.track_objects, returns the number of frames, the seconds and the
+    seconds of every stage"""
+
+    profiler = StageProfiler()
+    object_tracker = ObjectTracker(tracker_type, prefetch=PREFETCH)
+    object_tracker.track_objects(video_file, objects_to_track, stop_frame=max_frames, profiler=profiler)
+
+    return _profiled_times(profiler, "tracking")
+
+
+def run_render_case(video_file, objects_to_track, out_path):
+    """Renders the video with BoundingBoxRenderer.render and the initial boxes in every frame, returns the number
+    of frames, the seconds and the seconds of every stage"""
+
+    video_capture = cv.VideoCapture(video_file)
+    frame_count = utils.get_video_frame_count(video_capture)
+    video_capture.release()
+    initial_boxes = np.array([obj["coordinates"] for obj in objects_to_track], dtype=np.int32).reshape(-1, 1, 4)
+    trackings = Trackings(objects_to_track, np.repeat(initial_boxes, frame_count, axis=1),
+                          np.ones((len(objects_to_track), frame_count), dtype=bool))
+
+    profiler = StageProfiler()
+    renderer = BoundingBoxRenderer(PREFETCH, WRITE_QUEUE)
+    renderer.render(video_file, trackings, out_path=out_path, file_name="benchmark_render", profiler=profiler)
+
+    return _profiled_times(profiler, "rendering")
+
+
+def run_encode_case(video_file, encoder, out_path):
+    """Renders the video without objects with an encoder, returns the number of frames, the seconds, the seconds
+    of every stage and the size of the output video in bytes"""
+
+    backend, codec, container, *preset = encoder.split("/")
+    renderer = BoundingBoxRenderer(PREFETCH, WRITE_QUEUE)
+    renderer.set_video_format(VideoCodec[codec], VideoFormat(container), backend=VideoBackend(backend),
+                              preset=preset[0] if preset else None)
+    video_capture = cv.VideoCapture(video_file)
+    frame_count = utils.get_video_frame_count(video_capture)
+    video_capture.release()
+
+    # The rendering loop ends after the writer is released, when ffmpeg finishes the file
+    profiler = StageProfiler()
+    renderer.render(video_file, Trackings([], np.zeros((0, frame_count, 4))), out_path=out_path,
+                    file_name="benchmark_encode", profiler=profiler)
+
+    output_file = path.join(out_path, "benchmark_encode." + container)
+    output_bytes = os.path.getsize(output_file)
+    os.remove(output_file)
+    return _profiled_times(profiler, "rendering") + (output_bytes,)
+
+
+def _profiled_times(profiler, loop):
+    """Returns the number of frames and the seconds of a profiled loop, and the seconds of every stage"""
+
+    report = profiler.report()
+    times = {stage: statistics["total_ms"] / 1000 for stage, statistics in report["stages"].items()}
+    return report["loops"][loop]["frames"], report["loops"][loop]["seconds"], times
+
+
+def write_video_clip(video_file, clip_file, max_frames):
+    """Writes the first max_frames frames of a video as MJPG, the render cases render a whole video"""
+
+    video_capture = cv.VideoCapture(video_file)
+    fps = utils.get_video_fps(video_capture) or 25
+    size = (utils.get_video_frame_width(video_capture), utils.get_video_frame_height(video_capture))
+    video_writer = cv.VideoWriter(clip_file, cv.VideoWriter_fourcc(*"MJPG"), fps, size)
+    read_ok, frame = video_capture.read()
+    frame_count = 0
+    while read_ok and frame_count < max_frames:
+        video_writer.write(frame)
+        frame_count = frame_count + 1
+        read_ok, frame = video_capture.read()
+    video_capture.release()
+    video_writer.release()
+
+
+def run_case(case):
+    """Runs a benchmark case, to be called in its own process
+
+    Args:
+        case: dictionary with the case definition, see build_cases
+
+    Returns:
+        The case result, see the module documentation
+    """
+
+    result = dict(case)
+    result.update({"frames": 0, "fps": 0.0, "ms_per_frame": {}, "peak_rss_mb": 0.0, "output_mb": None, "error": None})
+    try:
+        objects_to_track = case["objects_to_track"]
+        if case["stage"] == "decode":
+            frame_count, seconds, times = run_decode_case(case["video_file"], case["max_frames"])
+        elif case["stage"] == "track":
+            frame_count, seconds, times = run_track_case(case["video_file"], objects_to_track, TrackerType[case["tracker"]],
+                                                         case["max_frames"])
+        elif case["stage"] == "encode":
+            frame_count, seconds, times, output_bytes = run_encode_case(case["clip_file"], case["encoder"], case["out_path"])
+            result["output_mb"] = output_bytes / (1024 * 1024)
+        else:
+            frame_count, seconds, times = run_render_case(case["clip_file"], objects_to_track, case["out_path"])
+
+        result["frames"] = frame_count
+        result["fps"] = frame_count / seconds
+        result["ms_per_frame"] = {stage: 1000 * seconds / frame_count for stage, seconds in times.items()}
+    except Exception as e:
+        result["error"] = repr(e)
+
+    # ru_maxrss is in kilobytes on linux and in bytes on macos
+    if resource is not None:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result["peak_rss_mb"] = peak_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    else:
+        result["peak_rss_mb"] = None
+
+    for key in ("video_file", "clip_file", "objects_to_track", "max_frames", "out_path"):
+        result.pop(key)
+    return result
+
+
+def build_cases(video_file, objects_to_track, trackers, object_counts, resolutions, max_frames, work_path, encoders=()):
+    """Returns the list of benchmark cases, synthetic videos are written to the work path
+
+    The encode cases only run on the input video, the noise of the synthetic videos does not compress as a real one.
+    The render and encode cases of the input video run on a clip of its first max_frames frames, see write_video_clip
+    """
+
+    cases = []
+
+    def add_cases(name, video, objects, video_label, resolution, encoders=(), clip=None):
+        base = {"video_file": video, "clip_file": clip or video, "objects_to_track": objects, "max_frames": max_frames,
+                "out_path": work_path,
+                "video": video_label, "objects": len(objects), "resolution": resolution, "encoder": None}
+        cases.append(dict(base, case=f"decode/{name}", stage="decode", tracker=None))
+        cases.append(dict(base, case=f"render/{name}", stage="render", tracker=None))
+        for tracker in trackers:
+            cases.append(dict(base, case=f"track/{tracker}/{name}", stage="track", tracker=tracker))
+        for encoder in encoders:
+            cases.append(dict(base, case=f"encode/{encoder}/{name}", stage="encode", tracker=None, encoder=encoder))
+
+    # Input video
+    if video_file is not None:
+        video_capture = cv.VideoCapture(video_file)
+        resolution = f"{utils.get_video_frame_width(video_capture)}x{utils.get_video_frame_height(video_capture)}"
+        video_capture.release()
+        clip_file = path.join(work_path, "input_clip.avi")
+        write_video_clip(video_file, clip_file, max_frames)
+        add_cases(f"{path.basename(video_file)}/{len(objects_to_track)}", video_file, objects_to_track, video_file, resolution,
+                  encoders, clip_file)
+
+    # Synthetic videos
+    for resolution in resolutions:
+        width, height = [int(i) for i in resolution.split("x")]
+        for object_count in object_counts:
+            synthetic_file = path.join(work_path, f"synthetic_{resolution}_{object_count}.avi")
+            objects = make_synthetic_video(synthetic_file, width, height, max_frames, object_count)
+            add_cases(f"synthetic/{resolution}/{object_count}", synthetic_file, objects, "synthetic", resolution)
+
+    return cases
+
+
+def run_benchmark(cases):
+    """Runs every case in a new process and returns the list of results"""
+
+    results = []
+    for case in cases:
+        with ProcessPoolExecutor(1) as executor:
+            result = executor.submit(run_case, case).result()
+        if result["error"] is None:
+            memory = f", {result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] is not None else ""
+            size = f", output {result['output_mb']:.2f} MB" if result["output_mb"] is not None else ""
+            logger.info(f"{result['case']}: {result['fps']:.1f} fps{memory}{size}")
+        else:
+            logger.warning(f"{result['case']}: failed, {result['error']}")
+        results.append(result)
+
+    return results
+
+
+def get_environment():
+    """Returns the environment of the benchmark run, to identify the results"""
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+
+    return {"commit": commit, "opencv": cv.__version__, "python": platform.python_version(),
+            "platform": platform.platform(), "date": datetime.datetime.now().isoformat()}
+
+
+def compare_results(results, reference_results):
+    """Returns a list of (case, fps, reference fps, speed up) for the cases in both result lists"""
+
+    reference_fps = {result["case"]: result["fps"] for result in reference_results if result["error"] is None}
+    comparison = []
+    for result in results:
+        if result["error"] is None and reference_fps.get(result["case"]):
+            reference = reference_fps[result["case"]]
+            comparison.append((result["case"], result["fps"], reference, result["fps"] / reference))
+
+    return comparison
+
+
+#######################################################################
+####################### Benchmark application #########################
+#######################################################################
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(prog="benchmark", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--video", type=str, help="Input video file, none to run only synthetic videos", default="../data/input.mkv")
+    parser.add_argument("--initial_conditions", type=str, help="Initial conditions (json) file of the input video", default="../data/initial_conditions.json")
+    parser.add_argument("--trackers", type=str, nargs="+", choices=["KCF", "MOSSE", "CSRT", "ADAPTIVE"], default=["KCF", "MOSSE", "CSRT"])
+    parser.add_argument("--objects", type=int, nargs="+", help="Object counts of the synthetic videos", default=[1, 5, 10])
+    parser.add_argument("--resolutions", type=str, nargs="+", help="Resolutions of the synthetic videos", default=["640x360", "1280x720", "1920x1080"])
+    parser.add_argument("--encoders", type=str, nargs="*", help="Encoders of the encode cases on the input video, backend/codec/container[/preset]", default=DEFAULT_ENCODERS)
+    parser.add_argument("--frames", type=int, help="Maximum frames per case", default=100)
+    parser.add_argument("--out", type=str, help="Results (json) file", default="benchmark_results.json")
+    parser.add_argument("--compare", type=str, help="Results (json) file of a previous run to compare with", default=None)
+    args = parser.parse_args()
+
+    root_logger.logger.setLevel(logging.INFO)
+
+    video_file = args.video if args.video and args.video.lower() != "none" else None
+    objects_to_track = utils.read_objects_to_track_file(args.initial_conditions) if video_file else []
+    with tempfile.TemporaryDirectory() as work_path:
+        cases = build_cases(video_file, objects_to_track, args.trackers, args.objects, args.resolutions, args.frames, work_path,
+                            args.encoders)
+        results = run_benchmark(cases)
+
+    with open(args.out, "w") as f:
+        json.dump({"environment": get_environment(), "results": results}, f, indent=4)
+    logger.info(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            reference_results = json.load(f)["results"]
+        for case, fps, reference, speed_up in compare_results(results, reference_results):
+            print(f"{case:60s} {fps:10.1f} fps {reference:10.1f} fps {speed_up:6.2f}x")
@@ -0,0 +1,85 @@
+"""Shared fixtures for the tracker package tests"""
+
+import pytest
+import numpy as np
+import cv2 as cv
+from tracker.trackings import Trackings
+
+
+# Frames of the synthetic video
+SYNTHETIC_FRAME_COUNT = 40
+
+
+def _synthetic_boxes(frame_count):
+    """Returns the (n_objects, frame_count, 4) int32 bounding boxes of the squares of the synthetic video
+
+    The first square moves (+3, +1) pixels per frame from (20, 40, 30, 30), the second one (-2, -1) from (250, 150, 24, 24)
+    """
+
+    i = np.arange(frame_count)
+    boxes = np.zeros((2, frame_count, 4), dtype=np.int32)
+    boxes[0] = np.stack([20 + 3 * i, 40 + i, np.full(frame_count, 30), np.full(frame_count, 30)], axis=1)
+    boxes[1] = np.stack([250 - 2 * i, 150 - i, np.full(frame_count, 24), np.full(frame_count, 24)], axis=1)
+    return boxes
+
+
+@pytest.fixture(scope="session")
+def synthetic_video(tmp_path_factory):
+    """Creates a small synthetic video with two moving squares over a textured background
+
+    Returns:
+        (video_file, objects_to_track)
+    """
+
+    video_file = str(tmp_path_factory.mktemp("synthetic") / "synthetic.avi")
+    width, height = 320, 240
+
+    # Static noise background so the trackers have texture to lock on
+    random_state = np.random.RandomState(0)
+    background = random_state.randint(0, 60, (height, width, 3), dtype=np.uint8)
+    patch_1 = random_state.randint(100, 255, (30, 30, 3), dtype=np.uint8)
+    patch_2 = random_state.randint(100, 255, (24, 24, 3), dtype=np.uint8)
+
+    video_writer = cv.VideoWriter(video_file, cv.VideoWriter_fourcc(*"MJPG"), 25, (width, height))
+    for boxes in _synthetic_boxes(SYNTHETIC_FRAME_COUNT).transpose(1, 0, 2):
+        frame = background.copy()
+        for (x, y, box_width, box_height), patch in zip(boxes, (patch_1, patch_2)):
+            frame[y:y + box_height, x:x + box_width] = patch
+        video_writer.write(frame)
+    video_writer.release()
+
+    objects_to_track = [
+        {"object": "player", "id": 0, "coordinates": (20, 40, 30, 30)},
+        {"object": "player", "id": 1, "coordinates": (250, 150, 24, 24)}
+    ]
+
+    return (video_file, objects_to_track)
+
+
+@pytest.fixture(scope="session")
+def synthetic_boxes():
+    """Returns the function that computes the ground truth boxes of the synthetic video for a number of frames,
+    longer than the video to test the motion model alone
+
+    Returns:
+        function(frame_count) that returns a (n_objects, frame_count, 4) int32 array
+    """
+    return _synthetic_boxes
+
+
+@pytest.fixture
+def synthetic_ground_truth():
+    """Returns the (n_objects, n_frames, 4) int32 ground truth boxes of the synthetic video"""
+    return _synthetic_boxes(SYNTHETIC_FRAME_COUNT)
+
+
+@pytest.fixture
+def synthetic_trackings(synthetic_video, synthetic_ground_truth):
+    """Returns (video_file, trackings) with the ground truth of the synthetic video, every object tracked
+
+    The trackings are created for each test, which can mark some frames as lost through trackings.statuses
+    """
+
+    video_file, objects_to_track = synthetic_video
+    statuses = np.ones(synthetic_ground_truth.shape[:2], dtype=bool)
+    return (video_file, Trackings(objects_to_track, synthetic_ground_truth, statuses))
@@ -0,0 +1,292 @@
+"""Implements an incremental renderer that only encodes again the parts of the video whose annotations changed
+
+    IncrementalRenderer keeps the rendered video as a list of segments of segment_frames frames, each one
+    encoded in its own file so it starts with a keyframe, together with the trackings and the render settings
+    of the last run, in a cache directory next to the output video:
+
+        <out_path>/<file_name>.cache/
+            state.json: render settings, video and segment length of the last run
+            trackings: trackings of the last run, in the binary trackings format
+            segment_00000.avi, segment_00001.avi, ...
+
+    A new render diffs the trackings against the cached ones and only decodes, draws and encodes the segments
+    with a changed frame. The output video is then assembled from the segments with ffmpeg, by stream copy,
+    so the untouched segments are not decoded nor encoded. Fixing the boxes of one object in a few frames of
+    a long video takes the time of a segment instead of the time of the whole video.
+
+    A change of the render settings (colors, line width, text format, video format) or of the video changes every
+    frame, so every segment is rendered again. When ffmpeg is not available the segments can not be joined
+    without encoding them again, so the video is rendered in full with BoundingBoxRenderer.render, and only a
+    render without any change is skipped.
+
+    Typical usage:
+
+        renderer = IncrementalRenderer(segment_frames=250)
+        renderer.set_box_format((0, 255, 0), 2)
+        renderer.render(video_file, object_trackings, out_path=".", file_name="out")
+        ...
+        renderer.render(video_file, fixed_object_trackings, out_path=".", file_name="out")
+        print(renderer.render_stats)
+
+    The render_stats attribute describes the last render:
+
+        {
+            "mode": (string) "incremental", "full" or "unchanged",
+            "segments": (int) number of segments of the video, 0 in full mode,
+            "rendered_segments": (list) indexes of the segments rendered again,
+            "rendered_frames": (int) number of frames decoded, drawn and encoded
+        }
+
+    Seeking to the first frame of a segment must be frame accurate, as in the segment tracker.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+from os import path
+import numpy as np
+from tracker.renderer import BoundingBoxRenderer
+from tracker.trackings import Trackings
+from tracker.profiler import NullProfiler
+from tracker import utils
+import logging
+from tracker import root_logger
+
+
+# Define logger for this module
+logger = logging.getLogger(root_logger.LOGGER_NAME + ".incremental")
+
+# Version of the cache layout, caches of other versions are discarded
+_CACHE_VERSION = 1
+
+
+class IncrementalRenderer(BoundingBoxRenderer):
+    """Bounding box renderer that only renders again the segments of the video with changed annotations"""
+
+    def __init__(self, prefetch=0, write_queue=0, segment_frames=250, ffmpeg="ffmpeg"):
+        """Inititialize the renderer
+
+        Args:
+            prefetch: see BoundingBoxRenderer
+            write_queue: see BoundingBoxRenderer
+            segment_frames: number of frames of each segment, shorter segments render less frames after a
+                small change but the output has more keyframes
+            ffmpeg: ffmpeg executable used to join the segments
+
+        Raises:
+            ValueError: if segment_frames is less than 1
+        """
+
+        super().__init__(prefetch, write_queue)
+        if segment_frames < 1:
+            raise ValueError("Segment frames must be a positive value")
+        self.segment_frames = segment_frames
+        self.ffmpeg = ffmpeg
+        self.render_stats = None
+
+    def render(self, video_file, object_trackings, out_path = ".", file_name = "out", profiler = None):
+        """Render a video file with the bounding boxes specified in object trackings, reusing the last render
+
+        See BoundingBoxRenderer.render for the arguments and exceptions
+        """
+
+        if not path.exists(out_path):
+            logger.error("output path does not exist")
+            raise ValueError("Output path does not exist")
+
+        trackings = object_trackings if isinstance(object_trackings, Trackings) else Trackings.from_list(object_trackings)
+
+        # Check that the object tracks are the same length of the video
+        _, video_capture = utils.get_video_capture(video_file)
+        video_frame_count = utils.get_video_frame_count(video_capture)
+        video_capture.release()
+        if video_frame_count != trackings.frame_count:
+            logger.error("video frame count and object trackings must be equal")
+            raise ValueError("Video frame count and object trackings must be equal")
+
+        cache_path = path.join(out_path, file_name + ".cache")
+        out_file = path.join(out_path, file_name + "." + self.video_format.value)
+        state = self._get_state(video_file, trackings)
+
+        # Without ffmpeg the segments can not be joined, render the whole video unless nothing changed
+        if shutil.which(self.ffmpeg) is None:
+            previous_state, previous_trackings = self._read_cache(cache_path)
+            if state == previous_state and previous_trackings == trackings and path.exists(out_file):
+                self.render_stats = {"mode": "unchanged", "segments": 0, "rendered_segments": [], "rendered_frames": 0}
+                logger.info("Trackings not changed since the last render")
+                return
+            logger.warning("ffmpeg not found, rendering the whole video")
+            super().render(video_file, trackings, out_path, file_name, profiler)
+            self._write_cache(cache_path, state, trackings)
+            self.render_stats = {"mode": "full", "segments": 0, "rendered_segments": [],
+                                 "rendered_frames": trackings.frame_count}
+            return
+
+        # Segments with a changed frame, or all of them if the settings or the video changed
+        frame_count = trackings.frame_count
+        segment_count = -(-frame_count // self.segment_frames)
+        segment_files = [path.join(cache_path, f"segment_{s:05d}.{self.video_format.value}") for s in range(segment_count)]
+        changed_segments = self._changed_segments(cache_path, state, trackings, segment_files)
+        if not changed_segments and path.exists(out_file):
+            self.render_stats = {"mode": "unchanged", "segments": segment_count, "rendered_segments": [], "rendered_frames": 0}
+            logger.info("Trackings not changed since the last render")
+            return
+
+        # Render the changed segments, a run of consecutive segments is decoded from a single seek
+        os.makedirs(cache_path, exist_ok=True)
+        self._write_cache(cache_path, None, None)
+        profiler = profiler or NullProfiler()
+        profiler.begin("rendering")
+        try:
+            for first, last in _runs(changed_segments):
+                self._render_segments(video_file, trackings, cache_path, first, last, profiler)
+        finally:
+            profiler.end("rendering")
+
+        # Join the segments without encoding them again
+        start = profiler.start()
+        self._join_segments(cache_path, segment_files, out_file)
+        profiler.stop("join", start)
+        self._write_cache(cache_path, state, trackings)
+
+        rendered_frames = sum(min(self.segment_frames, frame_count - s * self.segment_frames) for s in changed_segments)
+        self.render_stats = {"mode": "incremental", "segments": segment_count, "rendered_segments": changed_segments,
+                             "rendered_frames": rendered_frames}
+        logger.info(f"Rendered {len(changed_segments)}/{segment_count} segments, {rendered_frames} frames")
+
+    def _changed_segments(self, cache_path, state, trackings, segment_files):
+        """Returns the sorted indexes of the segments that must be rendered again"""
+
+        segment_count = len(segment_files)
+        previous_state, previous_trackings = self._read_cache(cache_path)
+        if state != previous_state or previous_trackings is None:
+            return list(range(segment_count))
+
+        # Frames where the status or the box of any object changed
+        changed = (previous_trackings.statuses != trackings.statuses).any(axis=0)
+        changed = changed | (previous_trackings.boxes != trackings.boxes).any(axis=(0, 2))
+        changed_segments = set((np.nonzero(changed)[0] // self.segment_frames).tolist())
+        changed_segments.update(s for s, segment_file in enumerate(segment_files) if not path.exists(segment_file))
+        return sorted(changed_segments)
+
+    def _render_segments(self, video_file, trackings, cache_path, first, last, profiler):
+        """Renders the segments from first to last, both included, into their segment files"""
+
+        start_frame = first * self.segment_frames
+        stop_frame = min((last + 1) * self.segment_frames, trackings.frame_count)
+        first_frame, video_capture = utils.get_video_capture(video_file, self.prefetch, start_frame)
+        frame_height = utils.get_video_frame_height(video_capture)
+        frame = first_frame
+        video_writer = None
+        try:
+            for i in range(start_frame, stop_frame):
+
+                # Start a new segment file, renamed when it is complete so a failed render leaves no partial segment
+                if (i - start_frame) % self.segment_frames == 0:
+                    if video_writer is not None:
+                        self._close_segment(video_writer, cache_path, segment)
+                    segment = i // self.segment_frames
+                    video_writer = self.create_video_writer(video_capture, cache_path, f"partial_{segment:05d}")
+
+                start = profiler.start()
+                self.draw_frame(frame, trackings, i, frame_height)
+                profiler.stop("draw", start)
+
+                start = profiler.start()
+                video_writer.write(frame)
+                profiler.stop("write", start)
+                profiler.frame("rendering")
+
+                if i + 1 < stop_frame:
+                    start = profiler.start()
+                    read_ok, frame = video_capture.read()
+                    profiler.stop("decode", start)
+                    if not read_ok:
+                        raise ValueError("Video frame count and object trackings must be equal")
+
+            self._close_segment(video_writer, cache_path, segment)
+            video_writer = None
+        finally:
+            video_capture.release()
+            if video_writer is not None:
+                video_writer.release()
+
+    def _close_segment(self, video_writer, cache_path, segment):
+        """Releases the writer of a segment and replaces the previous segment file"""
+
+        video_writer.release()
+        extension = "." + self.video_format.value
+        os.replace(path.join(cache_path, f"partial_{segment:05d}" + extension),
+                   path.join(cache_path, f"segment_{segment:05d}" + extension))
+
+    def _join_segments(self, cache_path, segment_files, out_file):
+        """Concatenates the segment files into the output video with ffmpeg stream copy"""
+
+        list_file = path.join(cache_path, "segments.txt")
+        with open(list_file, "w") as f:
+            for segment_file in segment_files:
+                f.write(f"file '{path.basename(segment_file)}'\n")
+
+        command = [self.ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_file,
+                   "-c", "copy", out_file]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise ValueError(f"ffmpeg could not join the segments: {result.stderr.strip()}")
+
+    def _get_state(self, video_file, trackings):
+        """Returns the render settings and video description that invalidate every segment when changed"""
+
+        video_stat = os.stat(video_file) if path.isfile(str(video_file)) else None
+        return {
+            "version": _CACHE_VERSION,
+            "video": path.abspath(str(video_file)),
+            "video_size": video_stat.st_size if video_stat else None,
+            "video_mtime": video_stat.st_mtime if video_stat else None,
+            "frame_count": trackings.frame_count,
+            "segment_frames": self.segment_frames,
+            "objects": trackings.objects,
+            "box": [list(self._box_color), self._box_line_width],
+            "text": [list(self._text_color), self._text_thickness, self._font_scale, self._text_font],
+            "video_codec": self.video_codec.value,
+            "video_format": self.video_format.value,
+            "video_quality": self.video_quality,
+            "video_resolution": list(self.video_resolution) if self.video_resolution else None,
+            "video_backend": self.video_backend.value,
+            "ffmpeg_preset": self.ffmpeg_preset
+        }
+
+    @staticmethod
+    def _read_cache(cache_path):
+        """Returns the (state, trackings) of the last render, (None, None) if there is no valid cache"""
+
+        try:
+            with open(path.join(cache_path, "state.json")) as f:
+                state = json.load(f)
+            if state is None:
+                return (None, None)
+            return (state, utils.read_trackings_file(path.join(cache_path, "trackings"), memory_map=False))
+        except (OSError, ValueError):
+            return (None, None)
+
+    @staticmethod
+    def _write_cache(cache_path, state, trackings):
+        """Writes the state and trackings of a render, a None state invalidates the cache while rendering"""
+
+        os.makedirs(cache_path, exist_ok=True)
+        if trackings is not None:
+            utils.write_trackings_file(path.join(cache_path, "trackings"), trackings)
+        with open(path.join(cache_path, "state.json"), "w") as f:
+            json.dump(state, f)
+
+
+def _runs(indexes):
+    """Returns the (first, last) runs of consecutive values of a sorted list of indexes"""
+
+    runs = []
+    for index in indexes:
+        if runs and index == runs[-1][1] + 1:
+            runs[-1][1] = index
+        else:
+            runs.append([index, index])
+    return [tuple(run) for run in runs]
@@ -0,0 +1,151 @@
+"""Implements the interpolation of the bounding boxes of the frames skipped by the trackers
+
+    With a stride the trackers are only updated in one of every stride frames, the keyframes. The bounding boxes
+    of the frames in between are filled by:
+
+        linear: interpolation between the previous and the next keyframe. The skipped frames are buffered until
+            the next keyframe is tracked, so they are emitted with a delay of up to stride frames
+        velocity: constant velocity extrapolation from the last two keyframes, emitted without delay
+
+    The skipped frames at the end of the video, after the last keyframe, are always extrapolated.
+
+    With an adaptive stride the gap to the next keyframe is shortened when the objects move fast, so the
+    displacement of every object between keyframes stays below max_motion times its size. Trackers only search
+    the neighbourhood of the last bounding box, so larger displacements make them lose the objects.
+
+    Typical usage:
+
+        interpolator = StrideInterpolator(stride=3, method="linear")
+        for frame_index, frame in frames:
+            if interpolator.is_keyframe(frame_index):
+                statuses, boxes = track(frame)
+                ready = interpolator.keyframe(frame_index, statuses, boxes, frame)
+            else:
+                ready = interpolator.skipped(frame_index, frame)
+            for frame_index, statuses, boxes, frame in ready:
+                ...
+        for frame_index, statuses, boxes, frame in interpolator.flush():
+            ...
+
+    The status of an interpolated box is True if the object is tracked in the keyframes it is computed from.
+"""
+
+import numpy as np
+
+
+# Interpolation methods
+INTERPOLATION_METHODS = ("linear", "velocity")
+
+
+class StrideInterpolator:
+    """Decides the keyframes and fills the bounding boxes of the skipped frames"""
+
+    def __init__(self, stride, method="linear", adaptive=False, max_motion=0.5):
+        """Initialize the interpolator
+
+        Args:
+            stride: number of frames between keyframes, the maximum with an adaptive stride
+            method: "linear" or "velocity", see the module documentation
+            adaptive: if True the stride is shortened when the objects move fast
+            max_motion: maximum displacement of an object between keyframes relative to its size, with adaptive stride
+
+        Raises:
+            ValueError: if stride is less than 1
+            ValueError: if method is not a valid interpolation method
+            ValueError: if max_motion is not positive
+        """
+
+        if stride < 1:
+            raise ValueError("Stride must be a positive value")
+        if method not in INTERPOLATION_METHODS:
+            raise ValueError(f"Interpolation method must be one of {INTERPOLATION_METHODS}")
+        if max_motion <= 0:
+            raise ValueError("Max motion must be a positive value")
+
+        self.stride = stride
+        self.method = method
+        self.adaptive = adaptive
+        self.max_motion = max_motion
+        self.current_stride = stride
+        self._previous = None
+        self._last = None
+        self._pending = []
+
+    def is_keyframe(self, frame_index):
+        """Returns True if the trackers must be updated in the frame"""
+        return self._last is None or frame_index - self._last[0] >= self.current_stride
+
+    def keyframe(self, frame_index, statuses, boxes, frame=None):
+        """Adds a tracked frame
+
+        Returns:
+            The list of (frame_index, statuses, boxes, frame) ready to be emitted, the buffered skipped frames and the keyframe
+        """
+
+        statuses, boxes = np.asarray(statuses, dtype=bool), np.asarray(boxes, dtype=np.int32)
+        ready = []
+        if self._last is not None and self._pending:
+            ready = [(i, *self._interpolate(self._last, (frame_index, statuses, boxes), i), skipped_frame)
+                     for i, skipped_frame in self._pending]
+            self._pending = []
+        ready.append((frame_index, statuses, boxes, frame))
+
+        self._previous, self._last = self._last, (frame_index, statuses, boxes)
+        if self.adaptive:
+            self.current_stride = self._adapted_stride()
+        return ready
+
+    def skipped(self, frame_index, frame=None):
+        """Adds a frame not tracked
+
+        Returns:
+            The list of (frame_index, statuses, boxes, frame) ready to be emitted
+        """
+
+        if self.method == "linear":
+            self._pending.append((frame_index, frame))
+            return []
+        return [(frame_index, *self._extrapolate(frame_index), frame)]
+
+    def flush(self):
+        """Returns the buffered skipped frames, extrapolated from the last keyframes"""
+
+        ready = [(i, *self._extrapolate(i), skipped_frame) for i, skipped_frame in self._pending]
+        self._pending = []
+        return ready
+
+    def _interpolate(self, start, stop, frame_index):
+        """Returns (statuses, boxes) linearly interpolated between two keyframes"""
+
+        start_index, start_statuses, start_boxes = start
+        stop_index, stop_statuses, stop_boxes = stop
+        t = (frame_index - start_index) / (stop_index - start_index)
+        boxes = np.rint(start_boxes + t * (stop_boxes - start_boxes)).astype(np.int32)
+        return (start_statuses & stop_statuses, boxes)
+
+    def _extrapolate(self, frame_index):
+        """Returns (statuses, boxes) extrapolated with the velocity of the last two keyframes"""
+
+        last_index, last_statuses, last_boxes = self._last
+        if self._previous is None:
+            return (last_statuses.copy(), last_boxes.copy())
+
+        previous_index, previous_statuses, previous_boxes = self._previous
+        velocity = (last_boxes - previous_boxes) / (last_index - previous_index)
+        boxes = np.rint(last_boxes + velocity * (frame_index - last_index)).astype(np.int32)
+        return (last_statuses & previous_statuses, boxes)
+
+    def _adapted_stride(self):
+        """Returns the stride that keeps the displacement of every object between keyframes below max_motion"""
+
+        if self._previous is None:
+            return self.stride
+
+        previous_index, _, previous_boxes = self._previous
+        last_index, _, last_boxes = self._last
+        displacement = np.hypot(*(last_boxes[:, :2] - previous_boxes[:, :2]).T.astype(float))
+        size = np.sqrt(np.maximum(last_boxes[:, 2] * last_boxes[:, 3], 1))
+        motion = (displacement / size).max(initial=0) / (last_index - previous_index)
+        if motion == 0:
+            return self.stride
+        return int(min(max(self.max_motion // motion, 1), self.stride))
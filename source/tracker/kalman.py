@@ -0,0 +1,162 @@
+"""Implements a constant velocity Kalman filter of the bounding boxes of all the objects
+
+    The filter runs over the results of the multitracker as they are produced, one batched predict and
+    update per frame for all the objects, so it does not need another pass over the trackings history.
+    The state of each object is the center, width and height of its bounding box and their velocities:
+
+        (cx, cy, w, h, vcx, vcy, vw, vh)
+
+    It provides:
+
+        smoothed boxes: the filtered bounding boxes, with less jitter than the raw tracker boxes
+        prediction: a lost object is reported at its predicted position, with a True status, for up to
+            max_prediction frames, so brief tracking failures or occlusions do not break the track
+        search windows: the region where each object is expected in the next frame, sized by the uncertainty
+            of the prediction, used to search lost objects (see recovery.TemplateReacquirer)
+
+    The process and measurement noise are proportional to the size of each box, as in SORT/DeepSORT.
+
+    Typical usage:
+
+        kalman = BatchKalmanFilter(max_prediction=5)
+        tracker = ObjectTracker(TrackerType.KCF, kalman=kalman)
+        object_trackings = tracker.track_objects(video_file, objects_to_track)
+
+    or over any stream of results:
+
+        kalman.start(initial_boxes)
+        for i, statuses, boxes in results:
+            statuses, boxes = kalman.update(statuses, boxes)
+"""
+
+import numpy as np
+
+
+class BatchKalmanFilter:
+    """Constant velocity Kalman filter of the bounding boxes of all the objects, vectorized over the objects"""
+
+    def __init__(self, max_prediction=5, position_weight=1 / 20, velocity_weight=1 / 160):
+        """Initialize the filter parameters
+
+        Args:
+            max_prediction: number of consecutive frames a lost object is reported at its predicted position
+            position_weight: standard deviation of the position noise relative to the box size
+            velocity_weight: standard deviation of the velocity noise relative to the box size
+
+        Raises:
+            ValueError: if max_prediction is negative
+            ValueError: if a weight is not positive
+        """
+
+        if max_prediction < 0:
+            raise ValueError("Max prediction can not be negative")
+        if position_weight <= 0 or velocity_weight <= 0:
+            raise ValueError("Noise weights must be positive values")
+
+        self.max_prediction = max_prediction
+        self.position_weight = position_weight
+        self.velocity_weight = velocity_weight
+        self.start(np.zeros((0, 4)))
+
+    def start(self, boxes):
+        """Resets the filter to the initial (x, y, width, height) bounding boxes, with zero velocity"""
+
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        n_objects = len(boxes)
+        self._state = np.zeros((n_objects, 8))
+        self._state[:, :4] = _to_center(boxes)
+        self._lost_frames = np.zeros(n_objects, dtype=int)
+
+        # Initial uncertainty, the velocity is unknown
+        sizes = self._sizes()
+        std = np.concatenate([2 * self.position_weight * sizes, 10 * self.velocity_weight * sizes], axis=1)
+        self._covariance = np.zeros((n_objects, 8, 8))
+        self._covariance[:, np.arange(8), np.arange(8)] = std ** 2
+
+    def predict(self, dt=1):
+        """Moves the state dt frames ahead"""
+
+        transition = np.eye(8)
+        transition[np.arange(4), np.arange(4, 8)] = dt
+
+        sizes = self._sizes()
+        std = np.concatenate([self.position_weight * sizes, self.velocity_weight * sizes], axis=1)
+        process_noise = np.zeros_like(self._covariance)
+        process_noise[:, np.arange(8), np.arange(8)] = dt * std ** 2
+
+        self._state = self._state @ transition.T
+        self._covariance = transition @ self._covariance @ transition.T + process_noise
+
+    def correct(self, statuses, boxes):
+        """Updates the state of the tracked objects with their measured (x, y, width, height) bounding boxes"""
+
+        tracked = np.asarray(statuses, dtype=bool)
+        if not tracked.any():
+            return
+
+        measurement = _to_center(np.asarray(boxes, dtype=float).reshape(-1, 4)[tracked])
+        state, covariance = self._state[tracked], self._covariance[tracked]
+
+        std = self.position_weight * self._sizes()[tracked]
+        innovation_covariance = covariance[:, :4, :4].copy()
+        innovation_covariance[:, np.arange(4), np.arange(4)] += std ** 2
+        gain = covariance[:, :, :4] @ np.linalg.inv(innovation_covariance)
+        innovation = measurement - state[:, :4]
+
+        self._state[tracked] = state + np.einsum("nij,nj->ni", gain, innovation)
+        self._covariance[tracked] = covariance - gain @ covariance[:, :4, :]
+
+    def update(self, statuses, boxes, dt=1):
+        """Predicts the state dt frames ahead, corrects it with the tracked boxes and returns the filtered results
+
+        Args:
+            statuses: track status of every object
+            boxes: measured (x, y, width, height) bounding box of every object
+            dt: frames since the previous update
+
+        Returns:
+            (statuses, boxes) arrays, lost objects are predicted for up to max_prediction frames
+        """
+
+        statuses = np.asarray(statuses, dtype=bool)
+        self.predict(dt)
+        self.correct(statuses, boxes)
+
+        self._lost_frames = np.where(statuses, 0, self._lost_frames + dt)
+        return (self._lost_frames <= self.max_prediction, self.boxes())
+
+    def boxes(self):
+        """Returns the filtered (x, y, width, height) bounding boxes as a (n_objects, 4) int32 array"""
+        return np.rint(_to_corner(self._state[:, :4])).astype(np.int32)
+
+    def search_windows(self, n_std=3, dt=1):
+        """Returns the (x, y, width, height) regions where the objects are expected dt frames ahead
+
+        The region is the predicted bounding box enlarged by n_std standard deviations of the predicted position
+        """
+
+        transition = np.eye(8)
+        transition[np.arange(4), np.arange(4, 8)] = dt
+        state = self._state @ transition.T
+        variance = np.einsum("ij,njk,ik->ni", transition[:2], self._covariance, transition[:2])
+        margin = n_std * np.sqrt(variance)
+
+        windows = _to_corner(state[:, :4])
+        windows[:, :2] -= margin
+        windows[:, 2:] += 2 * margin
+        return np.rint(windows).astype(np.int32)
+
+    def _sizes(self):
+        """Returns the (n_objects, 4) size used to scale the noise of each state component"""
+        heights = np.maximum(self._state[:, 3], 1)
+        return np.repeat(heights[:, None], 4, axis=1)
+
+
+def _to_center(boxes):
+    """Converts (x, y, width, height) boxes to (cx, cy, width, height)"""
+    return np.concatenate([boxes[:, :2] + boxes[:, 2:] / 2, boxes[:, 2:]], axis=1)
+
+
+def _to_corner(boxes):
+    """Converts (cx, cy, width, height) boxes to (x, y, width, height)"""
+    return np.concatenate([boxes[:, :2] - boxes[:, 2:] / 2, boxes[:, 2:]], axis=1)
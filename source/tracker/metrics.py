@@ -0,0 +1,296 @@
+"""Implements the evaluation of object trackings against reference trackings
+
+    All the metrics are computed on whole (n_objects, n_frames) arrays at once, with no loop over the frames,
+    so a full video is evaluated in a few milliseconds. The reference trackings have the same format as the
+    trackings, for example tests/data/input_trackings.json, a reference status False means that the object
+    is not visible in that frame.
+
+    Single object metrics, the objects are matched by id:
+
+        iou: intersection over union (Jaccard index) of the tracked and the reference bounding boxes,
+            0 in the frames where the object is lost
+        success curve: fraction of the frames with an iou above each threshold, its area under the
+            curve (auc) is the mean success
+        precision curve: fraction of the frames with a center error below each threshold in pixels,
+            precision_20 is its value at 20 pixels
+
+    Multiple object metrics (CLEAR MOT and identity metrics), the tracked boxes are assigned to the reference
+    boxes in every frame by iou, regardless of their id:
+
+        mota: 1 - (false negatives + false positives + id switches) / reference boxes
+        motp: mean iou of the matched boxes
+        idf1: F1 score of the boxes matched with a single tracked object per reference object along the video
+
+    The assignments are greedy, by decreasing iou, instead of the optimal (hungarian) assignment. They are
+    the same unless several tracked boxes overlap several reference boxes in the same frame. The greedy
+    assignment is computed in rounds that accept, in every frame at once, the pairs that are the best
+    match of both their tracked and their reference box, usually a single round.
+
+    Typical usage:
+
+        report = evaluate(object_trackings, utils.read_trackings_file("tests/data/input_trackings.json"))
+        print(report["mean_iou"], report["mot"]["mota"])
+
+    or, from the source directory:
+
+        python -m tracker.metrics trackings.json ../data/input_trackings.json
+"""
+
+import argparse
+import json
+import numpy as np
+from tracker.trackings import Trackings
+from tracker import utils
+
+
+# Default thresholds of the success (iou) and precision (center error in pixels) curves
+SUCCESS_THRESHOLDS = np.linspace(0, 1, 21)
+PRECISION_THRESHOLDS = np.arange(0, 51)
+
+
+def box_iou(boxes, reference_boxes):
+    """Returns the intersection over union of (..., 4) arrays of (x, y, width, height) boxes
+
+    The arrays are broadcast against each other, the result has the broadcast shape without the last axis
+    """
+
+    boxes = np.asarray(boxes, dtype=float)
+    reference_boxes = np.asarray(reference_boxes, dtype=float)
+    x1 = np.maximum(boxes[..., 0], reference_boxes[..., 0])
+    y1 = np.maximum(boxes[..., 1], reference_boxes[..., 1])
+    x2 = np.minimum(boxes[..., 0] + boxes[..., 2], reference_boxes[..., 0] + reference_boxes[..., 2])
+    y2 = np.minimum(boxes[..., 1] + boxes[..., 3], reference_boxes[..., 1] + reference_boxes[..., 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    union = boxes[..., 2] * boxes[..., 3] + reference_boxes[..., 2] * reference_boxes[..., 3] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-12), 0.0)
+
+
+def pairwise_iou(boxes, reference_boxes):
+    """Returns the (n_frames, n, m) iou of every box of (n, n_frames, 4) and (m, n_frames, 4) arrays in every frame"""
+
+    boxes = np.asarray(boxes).transpose(1, 0, 2)
+    reference_boxes = np.asarray(reference_boxes).transpose(1, 0, 2)
+    return box_iou(boxes[:, :, None], reference_boxes[:, None])
+
+
+def center_error(boxes, reference_boxes):
+    """Returns the distance in pixels between the centers of (..., 4) arrays of (x, y, width, height) boxes"""
+
+    boxes = np.asarray(boxes, dtype=float)
+    reference_boxes = np.asarray(reference_boxes, dtype=float)
+    difference = (boxes[..., :2] + boxes[..., 2:] / 2) - (reference_boxes[..., :2] + reference_boxes[..., 2:] / 2)
+    return np.hypot(difference[..., 0], difference[..., 1])
+
+
+def success_curve(ious, thresholds=SUCCESS_THRESHOLDS):
+    """Returns the fraction of the ious above each threshold"""
+
+    ious = np.asarray(ious, dtype=float).ravel()
+    if ious.size == 0:
+        return np.zeros(len(thresholds))
+    return (ious[:, None] > np.asarray(thresholds)[None]).mean(axis=0)
+
+
+def precision_curve(errors, thresholds=PRECISION_THRESHOLDS):
+    """Returns the fraction of the center errors below or equal to each threshold"""
+
+    errors = np.asarray(errors, dtype=float).ravel()
+    if errors.size == 0:
+        return np.zeros(len(thresholds))
+    return (errors[:, None] <= np.asarray(thresholds)[None]).mean(axis=0)
+
+
+def evaluate(object_trackings, reference_trackings, iou_threshold=0.5):
+    """Evaluates the trackings against the reference trackings
+
+    Only the frames in both trackings are evaluated. A reference object without a tracked object with the
+    same id counts as lost in every frame.
+
+    Args:
+        object_trackings: a Trackings object or a list of dictionaries, see ObjectTracker.track_objects
+        reference_trackings: a Trackings object or a list of dictionaries with the reference trackings
+        iou_threshold: minimum iou of a tracked box to match a reference box in the multiple object metrics
+
+    Returns:
+        A dictionary with the following structure:
+
+            {
+                "frames": (int) evaluated frames,
+                "mean_iou": (float) mean iou of all the visible reference boxes,
+                "success_auc": (float) area under the success curve,
+                "precision_20": (float) fraction of center errors below 20 pixels,
+                "success_curve": {"thresholds": list, "values": list},
+                "precision_curve": {"thresholds": list, "values": list},
+                "objects": {object label: {"mean_iou", "success_auc", "precision_20", "lost_frames"}},
+                "mot": {"mota", "motp", "idf1", "true_positives", "false_positives", "false_negatives",
+                        "id_switches", "reference_boxes"}
+            }
+
+    Raises:
+        ValueError: if iou_threshold is not in (0, 1]
+    """
+
+    if iou_threshold <= 0 or iou_threshold > 1:
+        raise ValueError("IoU threshold must be in (0, 1]")
+
+    trackings = _as_trackings(object_trackings)
+    reference = _as_trackings(reference_trackings)
+    frame_count = min(trackings.frame_count, reference.frame_count)
+    boxes, statuses = trackings.boxes[:, :frame_count], trackings.statuses[:, :frame_count]
+    reference_boxes, reference_statuses = reference.boxes[:, :frame_count], reference.statuses[:, :frame_count]
+
+    # Tracked boxes aligned with the reference objects by id
+    indexes = {obj["id"]: k for k, obj in enumerate(trackings.objects)}
+    aligned = [indexes.get(obj["id"]) for obj in reference.objects]
+    aligned_boxes = np.zeros(reference_boxes.shape, dtype=np.int32)
+    aligned_statuses = np.zeros(reference_statuses.shape, dtype=bool)
+    for j, k in enumerate(aligned):
+        if k is not None:
+            aligned_boxes[j], aligned_statuses[j] = boxes[k], statuses[k]
+
+    # Lost objects have 0 iou and an infinite center error
+    ious = np.where(aligned_statuses, box_iou(aligned_boxes, reference_boxes), 0.0)
+    errors = np.where(aligned_statuses, center_error(aligned_boxes, reference_boxes), np.inf)
+
+    objects = {}
+    for j, obj in enumerate(reference.objects):
+        visible = reference_statuses[j]
+        objects[f"{obj['object']}_{obj['id']}"] = {
+            **_summary(ious[j][visible], errors[j][visible]),
+            "lost_frames": int((visible & ~aligned_statuses[j]).sum())
+        }
+
+    return {
+        "frames": frame_count,
+        **_summary(ious[reference_statuses], errors[reference_statuses]),
+        "success_curve": {"thresholds": SUCCESS_THRESHOLDS.tolist(),
+                          "values": success_curve(ious[reference_statuses]).tolist()},
+        "precision_curve": {"thresholds": PRECISION_THRESHOLDS.tolist(),
+                            "values": precision_curve(errors[reference_statuses]).tolist()},
+        "objects": objects,
+        "mot": mot_metrics(boxes, statuses, reference_boxes, reference_statuses, iou_threshold)
+    }
+
+
+def mot_metrics(boxes, statuses, reference_boxes, reference_statuses, iou_threshold=0.5):
+    """Returns the CLEAR MOT and identity metrics of (n, n_frames) tracked and (m, n_frames) reference arrays
+
+    See evaluate for the returned dictionary
+    """
+
+    statuses = np.asarray(statuses, dtype=bool)
+    reference_statuses = np.asarray(reference_statuses, dtype=bool)
+    n_reference = int(reference_statuses.sum())
+    n_tracked = int(statuses.sum())
+    if len(statuses) == 0 or len(reference_statuses) == 0 or statuses.shape[1] == 0:
+        return _mot_summary(0, n_tracked, n_reference, 0, 0.0, 0)
+
+    # Tracked and reference boxes that can be matched in every frame
+    ious = pairwise_iou(boxes, reference_boxes)
+    valid = (ious >= iou_threshold) & statuses.T[:, :, None] & reference_statuses.T[:, None, :]
+
+    # Frame by frame assignment, (n_frames, m) index of the tracked box matched to each reference box
+    matches = _greedy_match(ious, valid)
+    matched = matches >= 0
+    true_positives = int(matched.sum())
+    frames = np.nonzero(matched)[0]
+    iou_sum = float(ious[frames, matches[matched], np.nonzero(matched)[1]].sum())
+
+    # An id switch is a change of the tracked box matched to a reference object
+    id_switches = 0
+    for j in range(matches.shape[1]):
+        sequence = matches[:, j][matched[:, j]]
+        id_switches = id_switches + int(np.count_nonzero(np.diff(sequence)))
+
+    # Identity assignment, one tracked object per reference object along the whole video
+    identity_matches = valid.sum(axis=0)
+    assignment = _greedy_match(identity_matches[None].astype(float), identity_matches[None] > 0)[0]
+    identity_true_positives = int(sum(identity_matches[k, j] for j, k in enumerate(assignment) if k >= 0))
+
+    return _mot_summary(true_positives, n_tracked, n_reference, id_switches, iou_sum, identity_true_positives)
+
+
+def _greedy_match(scores, valid):
+    """Assigns the tracked boxes to the reference boxes by decreasing score, in every frame at once
+
+    Args:
+        scores: (n_frames, n, m) score of every tracked and reference box pair
+        valid: (n_frames, n, m) bool array of the pairs that can be matched
+
+    Returns:
+        (n_frames, m) int array with the index of the tracked box matched to every reference box, -1 if unmatched
+    """
+
+    n_frames, n, m = scores.shape
+    scores = np.where(valid, scores, -1.0)
+    matches = np.full((n_frames, m), -1, dtype=int)
+    while True:
+        # Best tracked box of every reference box, and best reference box of every tracked box
+        best_tracked = scores.argmax(axis=1)
+        best_reference = scores.argmax(axis=2)
+        best_scores = np.take_along_axis(scores, best_tracked[:, None, :], axis=1)[:, 0, :]
+        frames, j = np.nonzero(best_scores >= 0)
+        k = best_tracked[frames, j]
+        mutual = best_reference[frames, k] == j
+        if not mutual.any():
+            return matches
+
+        # The pairs that are the best match of both boxes are in the greedy assignment
+        frames, j, k = frames[mutual], j[mutual], k[mutual]
+        matches[frames, j] = k
+        scores[frames, k, :] = -1.0
+        scores[frames, :, j] = -1.0
+
+
+def _summary(ious, errors):
+    """Returns the mean iou, success auc and precision at 20 pixels"""
+    return {"mean_iou": float(ious.mean()) if ious.size else 0.0,
+            "success_auc": float(success_curve(ious).mean()),
+            "precision_20": float(precision_curve(errors, [20])[0])}
+
+
+def _mot_summary(true_positives, n_tracked, n_reference, id_switches, iou_sum, identity_true_positives):
+    """Returns the MOT metrics dictionary from the counts"""
+
+    false_positives = n_tracked - true_positives
+    false_negatives = n_reference - true_positives
+    return {
+        "mota": 1 - (false_negatives + false_positives + id_switches) / n_reference if n_reference else 0.0,
+        "motp": iou_sum / true_positives if true_positives else 0.0,
+        "idf1": 2 * identity_true_positives / (n_tracked + n_reference) if n_tracked + n_reference else 0.0,
+        "true_positives": true_positives,
+        "false_positives": false_positives,
+        "false_negatives": false_negatives,
+        "id_switches": id_switches,
+        "reference_boxes": n_reference
+    }
+
+
+def _as_trackings(object_trackings):
+    """Returns the trackings as a Trackings object"""
+    if isinstance(object_trackings, Trackings):
+        return object_trackings
+    return Trackings.from_list(object_trackings)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(prog="metrics", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("trackings", type=str, help="Trackings (json or binary) file")
+    parser.add_argument("reference", type=str, help="Reference trackings (json or binary) file")
+    parser.add_argument("--iou_threshold", type=float, help="Minimum iou of a match in the multiple object metrics", default=0.5)
+    parser.add_argument("--out", type=str, help="Write the full report to this (json) file", default=None)
+    args = parser.parse_args()
+
+    report = evaluate(utils.read_trackings_file(args.trackings), utils.read_trackings_file(args.reference),
+                      args.iou_threshold)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=4)
+
+    print(f"frames {report['frames']}, mean iou {report['mean_iou']:.3f}, success auc {report['success_auc']:.3f}, "
+          f"precision@20 {report['precision_20']:.3f}")
+    for label, summary in report["objects"].items():
+        print(f"    {label:20s} mean iou {summary['mean_iou']:.3f}, lost frames {summary['lost_frames']}")
+    mot = report["mot"]
+    print(f"mota {mot['mota']:.3f}, motp {mot['motp']:.3f}, idf1 {mot['idf1']:.3f}, id switches {mot['id_switches']}")
@@ -2,8 +2,8 @@
 
     Typical usage:
 
-        multi_tracker = MultiTracker()   
-        
+        multi_tracker = MultiTracker()
+
         tracker = cv.TrackerMOSSE_create()
         tracker.init(initial_frame, bbox1)
         multi_tracker.add()
@@ -14,35 +14,162 @@
 
         for frame in frames:
             track_status_list, bbox_list = multi_tracker.update(frame)
+
+    The single trackers can be updated in parallel by a pool of threads, OpenCV releases
+    the GIL inside the tracker update, so the objects are tracked in different cores:
+
+        multi_tracker = MultiTracker(workers=4)
+        ...
+        multi_tracker.close()
+
+    With a scale factor the frame is resized once before updating the trackers and the boxes are mapped
+    back to the native resolution. The trackers must be initialized in the scaled frame:
+
+        multi_tracker = MultiTracker(scale=0.5)
+        tracker.init(multi_tracker.scale_frame(initial_frame), multi_tracker.scale_box(bbox1))
+        multi_tracker.add(tracker)
+
+    Every frame goes through a preprocessing stage once, shared by all the trackers, before they are updated
+    or re-initialized. With grayscale it is also converted to a single channel, which trackers like MOSSE
+    otherwise convert again in the region of every object. When the frames are already decoded at the
+    scale, see video_io.ScaledVideoCapture, they are not resized again and only the boxes are mapped:
+
+        multi_tracker = MultiTracker(scale=0.5, grayscale=True, prescaled=True)
+        tracker.init(multi_tracker.preprocess(initial_frame), multi_tracker.scale_box(bbox1))
+
+    An enabled profiler.StageProfiler times the update of every tracker.
+
+    The tracker of a lost object can be deactivated, it is not updated until it is initialized again
+    with reinit, see recovery.TemplateReacquirer.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+import time
+import cv2 as cv
+
+
 class MultiTracker:
     """Collection of single object trackers"""
 
-    def __init__(self):
-        """Initialize an empty list of trackers"""
+    def __init__(self, workers=1, scale=1.0, profiler=None, grayscale=False, prescaled=False):
+        """Initialize an empty list of trackers
+
+        Args:
+            workers: number of threads used to update the trackers, 1 updates them sequentially
+            scale: factor applied to the frames before updating the trackers
+            profiler: optional profiler, the update time of every tracker is added to it when enabled
+            grayscale: if True the trackers are updated with grayscale frames, converted once per frame
+            prescaled: if True the frames are already decoded at the scale, only the boxes are mapped
+
+        Raises:
+            ValueError: if workers is less than 1
+            ValueError: if scale is not in (0, 1]
+        """
+
+        if workers < 1:
+            raise ValueError("Workers must be a positive value")
+        if scale <= 0 or scale > 1:
+            raise ValueError("Scale must be in (0, 1]")
+
         self.trackers = []
+        self._inactive = {}
+        self.workers = workers
+        self.scale = scale
+        self.grayscale = grayscale
+        self.prescaled = prescaled
+        self._profiler = profiler if profiler is not None and profiler.enabled else None
+        self._executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
 
     def add(self, tracker):
         """Add tracker to trackers list"""
         self.trackers.append(tracker)
-    
+
     def update(self, frame):
         """Update each of the trackers in the list
-        
+
         Returns:
-            A list containing the track status and the bbox for each tracker
+            A list containing the track status and the bbox for each tracker, in the same order
+            the trackers were added. The bbox is in the coordinates of the frame, not the scaled one.
         """
 
-        # Create empty lists of track status and bounding boxes        
+        # Preprocess the frame once for every tracker
+        frame = self.preprocess(frame)
+
+        # Create empty lists of track status and bounding boxes
         track_status_list = []
         bounding_boxes = []
 
         # Update each tracker in the multi trackers list
-        for tracker in self.trackers:
-            track_status, bounding_box = tracker.update(frame)
-            bounding_box = tuple([int(i) for i in bounding_box])
+        # map keeps the order of the trackers when running in the thread pool
+        if self._profiler is None:
+            update = lambda k: self.trackers[k].update(frame)
+        else:
+            update = lambda k: self._timed_update(k, frame)
+        if self._inactive:
+            update = self._skip_inactive(update)
+        if self._executor is None:
+            results = [update(k) for k in range(len(self.trackers))]
+        else:
+            results = self._executor.map(update, range(len(self.trackers)))
+
+        for track_status, bounding_box in results:
+            if self.scale == 1:
+                bounding_box = tuple([int(i) for i in bounding_box])
+            else:
+                bounding_box = tuple([int(round(i / self.scale)) for i in bounding_box])
             track_status_list.append(track_status)
             bounding_boxes.append(bounding_box)
-        
+
         return (track_status_list, bounding_boxes)
+
+    def deactivate(self, k, bounding_box):
+        """Stops updating the k-th tracker, its update returns a lost status and the given bounding box"""
+        self._inactive.setdefault(k, self.scale_box(bounding_box))
+
+    def reinit(self, k, tracker, frame, bounding_box):
+        """Replaces the k-th tracker by a new tracker initialized in the frame and bounding box, and activates it
+
+        The frame and bounding box are in the coordinates of the frame, not the scaled one.
+        """
+
+        tracker.init(self.preprocess(frame), self.scale_box(bounding_box))
+        self.trackers[k] = tracker
+        self._inactive.pop(k, None)
+
+    def _skip_inactive(self, update):
+        """Returns the update function that skips the inactive trackers"""
+        return lambda k: (False, self._inactive[k]) if k in self._inactive else update(k)
+
+    def _timed_update(self, k, frame):
+        """Updates the k-th tracker and adds its update time to the profiler"""
+        start = time.perf_counter()
+        result = self.trackers[k].update(frame)
+        self._profiler.add_object_update(k, time.perf_counter() - start)
+        return result
+
+    def preprocess(self, frame):
+        """Returns the frame the trackers are updated with, scaled and converted to grayscale if enabled"""
+        if not self.prescaled:
+            frame = self.scale_frame(frame)
+        if self.grayscale and frame.ndim == 3:
+            frame = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
+        return frame
+
+    def scale_frame(self, frame):
+        """Returns the frame resized by the scale factor"""
+        if self.scale == 1:
+            return frame
+        return cv.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv.INTER_AREA)
+
+    def scale_box(self, bounding_box):
+        """Returns the bounding box in the coordinates of the scaled frame"""
+        if self.scale == 1:
+            return tuple(bounding_box)
+        x, y, width, height = [int(round(i * self.scale)) for i in bounding_box]
+        return (x, y, max(width, 1), max(height, 1))
+
+    def close(self):
+        """Shutdown the thread pool, if any"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
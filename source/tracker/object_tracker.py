@@ -17,10 +17,22 @@
         tracker = ObjectTracker(tracker_type)
         object_trackings = tracker.track_objects(video_file, objects_to_track)
 
+        # Or consume the results frame by frame, without keeping the history
+        for i, statuses, boxes in tracker.iter_tracks(video_file, objects_to_track):
+            ...
+
 """
 
 from tracker.types import TrackerType
 from  tracker.multi_tracker import MultiTracker
+from tracker.trackings import Trackings
+from tracker.search_window import SearchWindowTracker
+from tracker.adaptive import AdaptiveTracker, create_adaptive_stats
+from tracker.interpolation import StrideInterpolator, INTERPOLATION_METHODS
+from tracker.profiler import NullProfiler
+from functools import partial
+import time
+import numpy as np
 import cv2 as cv
 from tracker import utils
 import logging
@@ -34,16 +46,92 @@ logger = logging.getLogger(root_logger.LOGGER_NAME + ".object_tracker")
 class ObjectTracker:
     """This class implements a video tracker for multiple objects"""
 
-    def __init__(self, tracker_type = TrackerType.CSRT):
-        self.tracker_type = tracker_type
-        logger.info(f"Object tracker {tracker_type.name} initialized")
+    def __init__(self, tracker_type = TrackerType.CSRT, workers = 1, prefetch = 0, scale = 1.0, search_window = None,
+                 real_time = False, reacquire = None, adaptive_budget = 0.25, stride = 1, interpolation = "linear",
+                 adaptive_stride = False, kalman = None, grayscale = False, reduced_decode = False):
+        """Initialize the tracker type and the number of threads used to update the single trackers
+        
+        Args:
+            tracker_type: single object tracker algorithm
+            workers: number of threads used to update the single trackers
+            prefetch: number of frames decoded ahead in a background thread, 0 decodes in the tracking thread
+            scale: factor in (0, 1] applied to the frames before tracking, the bounding boxes are returned in 
+                the native resolution
+            search_window: if given, each object is tracked in a crop of the frame of this size relative to its 
+                bounding box, see search_window.SearchWindowTracker
+            real_time: if True the most recent frame of the source is tracked and the frames that arrive while
+                tracking are dropped, see video_io.LatestFrameCapture. Files are read at their frame rate
+            reacquire: optional recovery.TemplateReacquirer, the trackers of lost objects are stopped and 
+                re-initialized when the reacquirer finds the object again
+            adaptive_budget: with the ADAPTIVE tracker type, maximum fraction of the updates of each object
+                run by CSRT instead of MOSSE, plus a burst to escalate early, see adaptive.AdaptiveTracker
+            stride: the trackers are updated every stride frames, the bounding boxes of the frames in between
+                are interpolated, see interpolation.StrideInterpolator. There is still one result per frame
+            interpolation: "linear" or "velocity" interpolation of the skipped frames
+            adaptive_stride: if True the stride is shortened while the objects move fast
+            kalman: optional kalman.BatchKalmanFilter, the tracked boxes are smoothed and lost objects are predicted
+                for a few frames. With a reacquirer, lost objects are searched in the predicted windows
+            grayscale: if True the frames are converted to grayscale once and shared by the trackers, only
+                with the MOSSE tracker, which tracks in grayscale anyway, see MultiTracker.preprocess
+            reduced_decode: if True and scale is less than 1, the frames are decoded at the scaled resolution
+                instead of being resized by the multitracker, see video_io.ScaledVideoCapture. Not used when
+                the frames are yielded, they are rendered in the native resolution
+
+        Raises:
+            ValueError: if workers is less than 1
+            ValueError: if prefetch is negative
+            ValueError: if scale is not in (0, 1]
+            ValueError: if search window is not greater than 1
+            ValueError: if adaptive budget is not in [0, 1]
+            ValueError: if stride is less than 1
+            ValueError: if interpolation is not a valid interpolation method
+            ValueError: if grayscale is used with a tracker type other than MOSSE
+            ValueError: if reduced decode is used with a reacquirer
+        """
+
+        if workers < 1:
+            raise ValueError("Workers must be a positive value")
+        if prefetch < 0:
+            raise ValueError("Prefetch can not be negative")
+        if scale <= 0 or scale > 1:
+            raise ValueError("Scale must be in (0, 1]")
+        if search_window is not None and search_window <= 1:
+            raise ValueError("Search window must be greater than 1")
+        if adaptive_budget < 0 or adaptive_budget > 1:
+            raise ValueError("Adaptive budget must be in [0, 1]")
+        if stride < 1:
+            raise ValueError("Stride must be a positive value")
+        if interpolation not in INTERPOLATION_METHODS:
+            raise ValueError(f"Interpolation must be one of {INTERPOLATION_METHODS}")
+        if grayscale and tracker_type != TrackerType.MOSSE:
+            raise ValueError("Grayscale is only supported by the MOSSE tracker")
+        if reduced_decode and reacquire is not None:
+            raise ValueError("Reduced decode can not be used with a reacquirer")
 
-    def track_objects(self, video_file, objects_to_track):
+        self.tracker_type = tracker_type
+        self.workers = workers
+        self.prefetch = prefetch
+        self.scale = scale
+        self.search_window = search_window
+        self.real_time = real_time
+        self.real_time_stats = None
+        self.reacquire = reacquire
+        self.adaptive_budget = adaptive_budget
+        self.adaptive_stats = None
+        self.stride = stride
+        self.interpolation = interpolation
+        self.adaptive_stride = adaptive_stride
+        self.kalman = kalman
+        self.grayscale = grayscale
+        self.reduced_decode = reduced_decode
+        logger.info(f"Object tracker {tracker_type.name} initialized with {workers} workers")
+
+    def track_objects(self, video_file, objects_to_track, start_frame=0, stop_frame=None, profiler=None):
         """Tracks objects in a video file given the initial bounding boxes
 
         Args:
-            video_file: video file 
-            objects_info: list of dictionaries that define the objects to track. Each element of the list must have
+            video_file: video file, device index, streaming url or named pipe, see utils.is_live_source
+            objects_to_track: list of dictionaries that define the objects to track. Each element of the list must have
                 the following structure:
                         
                     {
@@ -52,8 +140,13 @@ class ObjectTracker:
                         "coordinates": (tuple) coordinates of the initial bounding box (x, y, width, height)
                     }
 
+            start_frame: index of the frame where the initial bounding boxes are located, tracking starts there
+            stop_frame: index of the frame where tracking stops (not included), None tracks until the end of the video
+            profiler: optional profiler.StageProfiler that times the decode and track stages and each object update
+
         Returns:
-            A list containing the object trackings. Each element of the list is
+            A Trackings object (see trackings module) with the bounding boxes and track status of every object
+            in every frame. It can be used as a list containing the object trackings, each element of the list is
             a dictionary with the following structure:
 
                 {
@@ -70,83 +163,305 @@ class ObjectTracker:
                     } 
 
         Raises:
+            ValueError: if the frame range is not valid
             ValueError: if video file can not be opened
             ValueError: if no frame can be read from the video
             
         """
 
-        # Create a video capture object to read videos 
+        # The video info is available once the first frame is tracked
+        video_info = {}
+        tracks = self._iter_tracks(video_file, objects_to_track, start_frame, stop_frame, False, profiler, video_info)
+        _, statuses, boxes = next(tracks)
+
+        # Create object_trackings structure to be returned
+        object_trackings = self.create_object_trackings(objects_to_track, video_info["frame_count"])
+        object_trackings.append(statuses, boxes)
+
+        # Update tracking info for every frame in the video
+        for _, statuses, boxes in tracks:
+            object_trackings.append(statuses, boxes)
+
+        # Return the object trackings
+        return object_trackings
+
+    def iter_tracks(self, video_file, objects_to_track, start_frame=0, stop_frame=None, yield_frames=False, profiler=None,
+                    video_info=None):
+        """Tracks objects in a video file, yielding the result of every frame as soon as it is tracked
+
+        Only the current frame is kept in memory, so it can be used with long videos and live sources. 
+        The video capture is released when the generator finishes or is closed.
+
+            for i, statuses, boxes in tracker.iter_tracks(video_file, objects_to_track):
+                ...
+
+        Args:
+            video_file: video file
+            objects_to_track: list of dictionaries that define the objects to track, see track_objects
+            start_frame: index of the frame where the initial bounding boxes are located, tracking starts there
+            stop_frame: index of the frame where tracking stops (not included), None tracks until the end of the video
+            yield_frames: if True the frame is yielded too
+            profiler: optional profiler.StageProfiler that times the decode and track stages and each object update
+            video_info: optional dictionary filled with the "frame_count" to track, 0 if unknown, and the open
+                "video_capture" before the first result is yielded
+
+        Yields:
+            (frame_index, statuses, boxes) or (frame_index, statuses, boxes, frame) if yield_frames is True. 
+            statuses is a (n_objects,) bool array and boxes a (n_objects, 4) int32 array with (x, y, width, height)
+            bounding boxes, in the order of objects_to_track
+
+        Raises:
+            ValueError: if the frame range is not valid, when iter_tracks is called
+            ValueError: if video file can not be opened, when the first result is requested
+            ValueError: if no frame can be read from the video, when the first result is requested
+        """
+
+        # The video is opened by the generator, so that it is released when the generator finishes
+        self._check_frame_range(start_frame, stop_frame)
+        video_info = video_info if video_info is not None else {}
+        return self._iter_tracks(video_file, objects_to_track, start_frame, stop_frame, yield_frames, profiler, video_info)
+
+    def _iter_tracks(self, video_file, objects_to_track, start_frame, stop_frame, yield_frames, profiler, video_info):
+        """Generator of iter_tracks
+        
+        The video_info dictionary is filled with the "frame_count" to track and the "video_capture" before the first yield
+        """
+
+        self._check_frame_range(start_frame, stop_frame)
+
+        # Create a video capture object to read videos, at the tracking resolution if the frames are not yielded
+        prescaled = self.reduced_decode and self.scale < 1 and not yield_frames
         try:
-            first_frame, video_capture = utils.get_video_capture(video_file)
+            first_frame, video_capture = utils.get_video_capture(video_file, self.prefetch, start_frame, self.real_time,
+                                                                 self.scale if prescaled else 1.0)
         except ValueError:
             logger.error("invalid video file")
             raise
 
         # Initialize tracker with every object to track
+        profiler = profiler or NullProfiler()
+        profiler.set_objects(objects_to_track)
         initial_bounding_boxes = [obj["coordinates"] for obj in objects_to_track]
-        tracker = self._initialize_tracker(initial_bounding_boxes, first_frame)
-
-        # Create object_trackings structure to be returned
-        object_trackings = []
-        for obj in objects_to_track:
-            object_track = {"object": obj["object"], "id": obj["id"], "track": []}
-            object_trackings.append(object_track)
-
-        # Update tracking info for every frame in the video capture
+        tracker = self._initialize_tracker(initial_bounding_boxes, first_frame, profiler, prescaled)
+        if self.reacquire is not None:
+            self.reacquire.start(objects_to_track, first_frame)
+        if self.kalman is not None:
+            self.kalman.start(initial_bounding_boxes)
+
+        # Number of frames to track, 0 if unknown
+        frame_count = 0 if utils.is_live_source(video_file) else utils.get_video_frame_count(video_capture)
+        if frame_count > 0 and stop_frame is not None:
+            frame_count = min(frame_count, stop_frame)
+        frame_count = max(frame_count - start_frame, 0)
+        video_info["frame_count"] = frame_count
+        video_info["video_capture"] = video_capture
+
+        # Track every frame in the video capture
+        # The capture and the tracker are released even if the consumer stops early
+        # In real time the frames can be dropped, the frame index is the index of the frame in the source
+        # With a stride only the keyframes are tracked, the results of the other frames are interpolated
         frame = first_frame
+        frame_index = start_frame
+        keyframe_index = start_frame
         i = 0
-        frame_count = utils.get_video_frame_count(video_capture)
-        while video_capture.isOpened():
+        latency = {"total": 0.0, "max": 0.0}
+        interpolator = None
+        if self.stride > 1:
+            interpolator = StrideInterpolator(self.stride, self.interpolation, self.adaptive_stride)
+        profiler.begin("tracking")
+        try:
+            while video_capture.isOpened():
+
+                if interpolator is None or interpolator.is_keyframe(frame_index):
+                    # Track objects in new frame
+                    start = profiler.start()
+                    statuses, boxes = self._track_frame(tracker, frame, objects_to_track, frame_index)
+                    profiler.stop("track", start)
+                    if self.reacquire is not None:
+                        start = profiler.start()
+                        statuses, boxes = self._reacquire_objects(tracker, frame, statuses, boxes, frame_index,
+                                                                  frame_index - keyframe_index)
+                        profiler.stop("reacquire", start)
+                    if self.kalman is not None:
+                        start = profiler.start()
+                        statuses, boxes = self.kalman.update(statuses, boxes, frame_index - keyframe_index)
+                        profiler.stop("kalman", start)
+                    keyframe_index = frame_index
+                    if self.real_time:
+                        frame_latency = time.perf_counter() - video_capture.frame_time
+                        latency["total"] += frame_latency
+                        latency["max"] = max(latency["max"], frame_latency)
+                        profiler.stop("latency", video_capture.frame_time)
+                    if interpolator is None:
+                        ready = [(frame_index, statuses, boxes, frame)]
+                    else:
+                        ready = interpolator.keyframe(frame_index, statuses, boxes, frame)
+                else:
+                    ready = interpolator.skipped(frame_index, frame)
+                profiler.frame("tracking")
+
+                # Log info
+                if utils.is_progress_frame(i, frame_count):
+                    logger.info(f"tracking frame {frame_index}/{start_frame + frame_count if frame_count else '?'}")
+
+                for result in ready:
+                    yield result if yield_frames else result[:3]
+                i = i + 1
+
+                # Stop at the last frame of the segment
+                if stop_frame is not None and start_frame + i >= stop_frame:
+                    break
+
+                # Read new frame from video
+                # If end of video, then break
+                start = profiler.start()
+                read_ok, frame = video_capture.read()
+                profiler.stop("decode", start)
+                if not read_ok:
+                    break
+                frame_index = start_frame + video_capture.frame_index if self.real_time else start_frame + i
+                if stop_frame is not None and frame_index >= stop_frame:
+                    break
+
+            # Skipped frames after the last keyframe
+            if interpolator is not None:
+                for result in interpolator.flush():
+                    yield result if yield_frames else result[:3]
+        finally:
+            profiler.end("tracking")
+
+            # Release the capture and the multitracker
+            video_capture.release()
+            tracker.close()
+
+            # Report the dropped frames and the latency from decode to tracked
+            if self.real_time:
+                self.real_time_stats = {
+                    "frames_read": video_capture.frames_read,
+                    "frames_tracked": i,
+                    "frames_dropped": video_capture.frames_dropped,
+                    "mean_latency_ms": 1000 * latency["total"] / max(i, 1),
+                    "max_latency_ms": 1000 * latency["max"]
+                }
+                profiler.count("dropped_frames", self.real_time_stats["frames_dropped"])
+                logger.info(f"Real time tracking: {i} frames tracked, {self.real_time_stats['frames_dropped']} dropped, "
+                            f"mean latency {self.real_time_stats['mean_latency_ms']:.1f} ms")
+
+            # Report how often each algorithm ran for every object
+            if self.adaptive_stats is not None:
+                for obj, stats in zip(objects_to_track, self.adaptive_stats):
+                    logger.info(f"Object {obj['id']}: {stats['cheap_updates']} MOSSE and {stats['accurate_updates']} CSRT updates, "
+                                f"{stats['escalations']} escalations")
 
-            # Track  objects in new frame and update history
-            track_status_list, bounding_boxes = tracker.update(frame)
-            for track_status, bounding_box, object_track in zip(track_status_list, bounding_boxes, object_trackings):
-                track_item ={"track_status": track_status, "coordinates": bounding_box}
-                object_track["track"].append(track_item)
+    @staticmethod
+    def create_object_trackings(objects_to_track, frame_count=0):
+        """Returns the empty object trackings structure for the objects to track
+        
+        Args:
+            objects_to_track: list of dictionaries that define the objects to track
+            frame_count: expected number of frames, used to preallocate the trackings
+        """
 
-                # Log if object not tracked
-                if track_status == False:
-                    logger.warning(f"Tracking error for object {object_track['id']} in frame {i}")
+        if frame_count > 0:
+            return Trackings(objects_to_track, capacity=frame_count)
+        return Trackings(objects_to_track)
 
-            # Log info
-            if i % (frame_count/10) == 0:
-                logger.info(f"tracking frame {i}/{frame_count}")
-            i = i + 1
+    @staticmethod
+    def _track_frame(tracker, frame, objects_to_track, i):
+        """Updates the multitracker with a new frame
+        
+        Args:
+            tracker: multitracker object
+            frame: new frame of the video
+            objects_to_track: objects tracked by the multitracker
+            i: index of the frame in the video
 
-            # Read new frame from video
-            # If end of video, then break
-            read_ok, frame = video_capture.read()
-            if not read_ok:
-                break
+        Returns:
+            (statuses, boxes) arrays of the frame
+        """
 
-        # Release the capture
-        video_capture.release()
+        track_status_list, bounding_boxes = tracker.update(frame)
+        statuses = np.array(track_status_list, dtype=bool)
+        boxes = np.array(bounding_boxes, dtype=np.int32).reshape(-1, 4)
 
-        # Return the object trackings
-        return object_trackings
+        # Log if object not tracked
+        for track_status, obj in zip(track_status_list, objects_to_track):
+            if track_status == False:
+                logger.warning(f"Tracking error for object {obj['id']} in frame {i}")
 
-        
-    def _initialize_tracker(self, initial_bounding_boxes, frame):
+        return (statuses, boxes)
+
+    def _reacquire_objects(self, tracker, frame, statuses, boxes, frame_index, dt=1):
+        """Stops the trackers of the lost objects and re-initializes the ones found again by the reacquirer
+
+        With a Kalman filter the lost objects are searched where they are predicted dt frames after the last update
+
+        Returns:
+            (statuses, boxes) arrays of the frame, with the re-acquired objects
+        """
+
+        for k in np.flatnonzero(~statuses):
+            tracker.deactivate(k, boxes[k].tolist())
+
+        search_windows = self.kalman.search_windows(dt=dt) if self.kalman is not None else None
+        for k, bounding_box in self.reacquire.update(frame, statuses, boxes, frame_index, search_windows):
+            tracker.reinit(k, self._create_tracker(k), frame, bounding_box)
+            statuses[k] = True
+            boxes[k] = bounding_box
+
+        return (statuses, boxes)
+
+    def _check_frame_range(self, start_frame, stop_frame):
+        """Raises ValueError if the frame range is not valid"""
+
+        if start_frame < 0 or (stop_frame is not None and stop_frame <= start_frame):
+            logger.error("invalid frame range")
+            raise ValueError("Invalid frame range")
+
+    def _initialize_tracker(self, initial_bounding_boxes, frame, profiler=None, prescaled=False):
         """Returns a multitracker object
         
         Args:
             initial_bounding_boxes: initial box for each object
             frame: initial frame where the objecs are located
+            profiler: optional profiler that times the update of each object
+            prescaled: if True the frames are decoded at the scale, see MultiTracker
 
         Returns:
             A multitracker object
         """
         
-        multi_tracker = MultiTracker()
+        multi_tracker = MultiTracker(self.workers, self.scale, profiler, self.grayscale, prescaled)
+
+        # The adaptive trackers of each object count the updates of each algorithm
+        if self.tracker_type == TrackerType.ADAPTIVE:
+            self.adaptive_stats = [create_adaptive_stats() for _ in initial_bounding_boxes]
         
-        for bounding_box in initial_bounding_boxes:
-            tracker = self._create_tracker_by_type(self.tracker_type)
-            tracker.init(frame, bounding_box)
+        # The trackers are initialized in the preprocessed frame
+        tracking_frame = multi_tracker.preprocess(frame)
+        for k, bounding_box in enumerate(initial_bounding_boxes):
+            tracker = self._create_tracker(k)
+            tracker.init(tracking_frame, multi_tracker.scale_box(bounding_box))
             multi_tracker.add(tracker)
         
         logger.info(f"Multi tracker initialized for {len(initial_bounding_boxes)} objects")
         return multi_tracker
 
+    def _create_tracker(self, k=None):
+        """Returns a single tracker object for the k-th object, wrapped in a search window tracker if enabled"""
+
+        if self.tracker_type == TrackerType.ADAPTIVE:
+            stats = self.adaptive_stats[k] if self.adaptive_stats is not None and k is not None else None
+            create_tracker = partial(AdaptiveTracker, partial(self._create_tracker_by_type, TrackerType.MOSSE),
+                                     partial(self._create_tracker_by_type, TrackerType.CSRT), self.adaptive_budget,
+                                     stats=stats)
+        else:
+            create_tracker = partial(self._create_tracker_by_type, self.tracker_type)
+
+        if self.search_window is not None:
+            return SearchWindowTracker(create_tracker, self.search_window)
+        return create_tracker()
+
     @staticmethod
     def _create_tracker_by_type(tracker_type):
         """Returns a single tracker object according to the type parameter"""
@@ -155,7 +470,8 @@ class ObjectTracker:
         if tracker_type == TrackerType.KCF:
             tracker = cv.TrackerKCF_create()
         elif tracker_type == TrackerType.MOSSE:
-            tracker = cv.TrackerMOSSE_create()
+            # MOSSE is only in the legacy module since OpenCV 4.5.1
+            tracker = cv.TrackerMOSSE_create() if hasattr(cv, "TrackerMOSSE_create") else cv.legacy.TrackerMOSSE_create()
         elif tracker_type == TrackerType.CSRT:
             tracker = cv.TrackerCSRT_create()
         else:
@@ -0,0 +1,120 @@
+"""Implements a single pass tracking and rendering pipeline
+
+    Every frame of the video is decoded once, passed to the multitracker and then drawn and written
+    to the output video. This avoids decoding the whole video a second time in the renderer.
+
+    Typical usage:
+
+        tracker = ObjectTracker(TrackerType.CSRT)
+        renderer = BoundingBoxRenderer()
+        renderer.set_box_format((0, 255, 0), 2)
+        renderer.set_text_format((255, 255, 255), 2, 0.8)
+
+        pipeline = TrackingPipeline(tracker, renderer)
+        object_trackings = pipeline.run(video_file, objects_to_track, out_path=".", file_name="out")
+
+    The returned object trackings have the same structure as the ones returned by ObjectTracker.track_objects,
+    so they can be stored and re-rendered later with BoundingBoxRenderer.render.
+
+    The pipeline is the only way to render live sources (device indexes, streaming urls and named pipes),
+    which can not be decoded twice. An interrupt (Ctrl-C) stops the pipeline of a live source and the rendered
+    video is kept, with files it is raised.
+"""
+
+from os import path
+from tracker import utils
+from tracker.profiler import NullProfiler
+import logging
+from tracker import root_logger
+
+
+# Define logger for this module
+logger = logging.getLogger(root_logger.LOGGER_NAME + ".pipeline")
+
+
+class TrackingPipeline:
+    """Tracks objects and renders the output video in a single pass over the input video"""
+
+    def __init__(self, object_tracker, renderer):
+        """Initialize the pipeline with an ObjectTracker and a BoundingBoxRenderer"""
+        self.object_tracker = object_tracker
+        self.renderer = renderer
+        logger.info(f"Tracking pipeline initialized")
+
+    def run(self, video_file, objects_to_track, out_path = ".", file_name = "out", profiler = None):
+        """Tracks the objects in the video file and renders the output video
+
+        Args:
+            video_file: video file
+            objects_to_track: list of dictionaries that define the objects to track, see ObjectTracker.track_objects
+            out_path: output directory of the rendered video
+            file_name: output file name of the rendered video, without extension
+            profiler: optional profiler.StageProfiler that times the decode, track, draw and write stages
+
+        Returns:
+            The object trackings, see ObjectTracker.track_objects
+
+        Raises:
+            ValueError: if output path does not exist
+            ValueError: if video file can not be opened
+            ValueError: if no frame can be read from the video
+        """
+
+        if not path.exists(out_path):
+            logger.error("output path does not exist")
+            raise ValueError("Output path does not exist")
+
+        # Tracking starts when the first frame is requested, then the video capture is available
+        # The capture is released if the video writer can not be created
+        profiler = profiler or NullProfiler()
+        video_info = {}
+        tracks = self.object_tracker.iter_tracks(video_file, objects_to_track, yield_frames=True, profiler=profiler,
+                                                 video_info=video_info)
+        try:
+            i, statuses, boxes, frame = next(tracks)
+            video_capture = video_info["video_capture"]
+            frame_count = video_info["frame_count"]
+            object_trackings = self.object_tracker.create_object_trackings(objects_to_track, frame_count)
+            video_writer = self.renderer.create_video_writer(video_capture, out_path, file_name)
+        except BaseException:
+            tracks.close()
+            raise
+
+        # Draw and write every tracked frame, the tracker decodes and tracks the next one
+        frame_height = utils.get_video_frame_height(video_capture)
+        profiler.begin("pipeline")
+        try:
+            while True:
+                object_trackings.append(statuses, boxes)
+
+                start = profiler.start()
+                self.renderer.draw_objects(frame, objects_to_track, statuses, boxes, frame_height)
+                profiler.stop("draw", start)
+
+                start = profiler.start()
+                video_writer.write(frame)
+                profiler.stop("write", start)
+                profiler.frame("pipeline")
+
+                # Log info
+                if utils.is_progress_frame(i, frame_count):
+                    logger.info(f"tracking and rendering frame {i}/{frame_count if frame_count else '?'}")
+
+                # Track next frame, if end of video, then break
+                try:
+                    i, statuses, boxes, frame = next(tracks)
+                except StopIteration:
+                    break
+        except KeyboardInterrupt:
+            # Live sources never end, an interrupt stops the pipeline and keeps the rendered video
+            # A file has an end, its trackings would be incomplete
+            if not utils.is_live_source(video_file):
+                raise
+            logger.info(f"Interrupted in frame {i}")
+        finally:
+            # Release capture, multitracker and writer
+            tracks.close()
+            video_writer.release()
+            profiler.end("pipeline")
+
+        return object_trackings
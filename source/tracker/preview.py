@@ -0,0 +1,249 @@
+"""Implements a preview renderer for a quick look at the trackings, cheaper than rendering the whole video
+
+    PreviewRenderer renders a video at a fraction of the resolution and, optionally, only every frame_step
+    frames, at the frame rate divided by frame_step so it plays at the speed of the source. Each frame is
+    downscaled before the boxes and labels are drawn, with the scaled boxes, so drawing and encoding work on
+    the small frames. The font scale, text thickness and label offsets are scaled too, so the labels keep
+    their size relative to the frame. The skipped frames are only grabbed, not converted to BGR.
+
+    It also renders a contact sheet, an image with one row per object and one column per keyframe, each
+    thumbnail cropped around the object from the annotated frame. The keyframes of an object are evenly spaced
+    over the frames where it is tracked, and only the frames up to the last keyframe are grabbed, only the
+    keyframes are drawn.
+
+    Both use the box and label drawing of BoundingBoxRenderer.draw_objects and its formats.
+
+    Typical usage:
+
+        renderer = PreviewRenderer(scale=0.25, frame_step=2)
+        renderer.set_box_format((0, 255, 0), 2)
+        renderer.render(video_file, object_trackings, out_path=".", file_name="preview")
+        renderer.render_contact_sheet(video_file, object_trackings, out_path=".", file_name="sheet", thumbnails=8)
+"""
+
+from os import path
+import numpy as np
+import cv2 as cv
+from tracker.renderer import BoundingBoxRenderer, DEFAULT_FPS
+from tracker.trackings import Trackings
+from tracker.profiler import NullProfiler
+from tracker import utils
+import logging
+from tracker import root_logger
+
+
+# Define logger for this module
+logger = logging.getLogger(root_logger.LOGGER_NAME + ".preview")
+
+# Height of the frame index caption under every thumbnail of the contact sheet
+_CAPTION_HEIGHT = 18
+
+
+class PreviewRenderer(BoundingBoxRenderer):
+    """Bounding box renderer of downscaled previews and contact sheets"""
+
+    def __init__(self, prefetch=0, write_queue=0, scale=0.5, frame_step=1):
+        """Inititialize the renderer
+
+        Args:
+            prefetch: see BoundingBoxRenderer, only used when every frame is rendered
+            write_queue: see BoundingBoxRenderer
+            scale: factor in (0, 1] applied to the width and height of the preview
+            frame_step: render one of every frame_step frames
+
+        Raises:
+            ValueError: if scale is not in (0, 1]
+            ValueError: if frame_step is less than 1
+        """
+
+        super().__init__(prefetch, write_queue)
+        if not 0 < scale <= 1:
+            raise ValueError("Scale must be in (0, 1]")
+        if frame_step < 1:
+            raise ValueError("Frame step must be a positive value")
+        self.scale = scale
+        self.frame_step = frame_step
+
+    def render(self, video_file, object_trackings, out_path = ".", file_name = "out", profiler = None):
+        """Render a downscaled preview of the video with the bounding boxes specified in object trackings
+
+        See BoundingBoxRenderer.render for the arguments and exceptions
+        """
+
+        if not path.exists(out_path):
+            logger.error("output path does not exist")
+            raise ValueError("Output path does not exist")
+
+        trackings = object_trackings if isinstance(object_trackings, Trackings) else Trackings.from_list(object_trackings)
+
+        # Skipped frames are grabbed, a prefetch thread would decode them
+        first_frame, video_capture = utils.get_video_capture(video_file, self.prefetch if self.frame_step == 1 else 0)
+        frame_count = utils.get_video_frame_count(video_capture)
+        if frame_count != trackings.frame_count:
+            logger.error("video frame count and object trackings must be equal")
+            video_capture.release()
+            raise ValueError("Video frame count and object trackings must be equal")
+
+        # The preview plays at the speed of the source
+        fps = (utils.get_video_fps(video_capture) or DEFAULT_FPS) / self.frame_step
+        size = (max(int(round(first_frame.shape[1] * self.scale)), 1), max(int(round(first_frame.shape[0] * self.scale)), 1))
+        try:
+            video_writer = self.create_video_writer(video_capture, out_path, file_name, fps, size)
+        except Exception:
+            video_capture.release()
+            raise
+
+        profiler = profiler or NullProfiler()
+        profiler.begin("preview")
+        frame = first_frame
+        text_format = self._scale_labels(self.scale)
+        try:
+            for i in range(0, frame_count, self.frame_step):
+
+                # Draw the scaled boxes over the downscaled frame
+                start = profiler.start()
+                preview = cv.resize(frame, size, interpolation=cv.INTER_AREA) if size != (frame.shape[1], frame.shape[0]) else frame
+                profiler.stop("resize", start)
+
+                start = profiler.start()
+                statuses, boxes = trackings.frame(i)
+                self.draw_objects(preview, trackings.objects, statuses, np.round(boxes * self.scale), size[1])
+                profiler.stop("draw", start)
+
+                start = profiler.start()
+                video_writer.write(preview)
+                profiler.stop("write", start)
+                profiler.frame("preview")
+
+                if utils.is_progress_frame(i, frame_count):
+                    logger.info(f"rendering preview frame {i}/{frame_count}")
+
+                # Grab the skipped frames and decode the next one
+                if i + self.frame_step < frame_count:
+                    start = profiler.start()
+                    for _ in range(self.frame_step - 1):
+                        video_capture.grab()
+                    read_ok, frame = video_capture.read()
+                    profiler.stop("decode", start)
+                    if not read_ok:
+                        raise ValueError("Video frame count and object trackings must be equal")
+        finally:
+            self._restore_labels(text_format)
+            video_capture.release()
+            video_writer.release()
+            profiler.end("preview")
+
+    def _scale_labels(self, scale):
+        """Scales the font, text thickness and label offsets, returns the previous text format to restore it"""
+
+        text_format = (self._text_color, self._text_thickness, self._font_scale, self._text_font)
+        self.set_text_format(self._text_color, max(int(round(self._text_thickness * scale)), 1),
+                             self._font_scale * scale, self._text_font)
+        self._label_scale = scale
+        return text_format
+
+    def _restore_labels(self, text_format):
+        """Restores the text format and the label offsets of the full resolution frames"""
+        self.set_text_format(*text_format)
+        self._label_scale = 1.0
+
+    def render_contact_sheet(self, video_file, object_trackings, out_path = ".", file_name = "out", thumbnails = 8,
+                             thumbnail_size = (160, 120)):
+        """Render a contact sheet with a row of annotated keyframe thumbnails per object
+
+        Args:
+            video_file: video file
+            object_trackings: object trackings history, see ObjectTracker.track_objects
+            out_path: output directory of the contact sheet
+            file_name: output file name of the contact sheet, without extension, it is written as jpg
+            thumbnails: number of keyframes of every object
+            thumbnail_size: (width, height) of every thumbnail
+
+        Returns:
+            The contact sheet file
+
+        Raises:
+            ValueError: if thumbnails is less than 1
+            ValueError: if video file can not be opened
+            ValueError: if video frame count not equal to object_trackings length
+        """
+
+        if not path.exists(out_path):
+            logger.error("output path does not exist")
+            raise ValueError("Output path does not exist")
+        if thumbnails < 1:
+            raise ValueError("Thumbnails must be a positive value")
+
+        trackings = object_trackings if isinstance(object_trackings, Trackings) else Trackings.from_list(object_trackings)
+        keyframes = [self._keyframes(trackings.statuses[k], thumbnails) for k in range(len(trackings.objects))]
+        width, height = thumbnail_size
+        sheet = np.zeros((len(trackings.objects) * (height + _CAPTION_HEIGHT), thumbnails * width, 3), dtype=np.uint8)
+
+        first_frame, video_capture = utils.get_video_capture(video_file)
+        frame_count = utils.get_video_frame_count(video_capture)
+        if frame_count != trackings.frame_count:
+            logger.error("video frame count and object trackings must be equal")
+            video_capture.release()
+            raise ValueError("Video frame count and object trackings must be equal")
+
+        # Decode the keyframes in order, the frames in between are only grabbed
+        frame_height = first_frame.shape[0]
+        frame, position = first_frame, 1
+        try:
+            for i in sorted(set(i for object_keyframes in keyframes for i in object_keyframes)):
+                if i > 0:
+                    while position < i:
+                        video_capture.grab()
+                        position = position + 1
+                    read_ok, frame = video_capture.read()
+                    position = position + 1
+                    if not read_ok:
+                        raise ValueError("Video frame count and object trackings must be equal")
+
+                statuses, boxes = trackings.frame(i)
+                annotated = frame.copy()
+                self.draw_objects(annotated, trackings.objects, statuses, boxes, frame_height)
+                for k, object_keyframes in enumerate(keyframes):
+                    if i in object_keyframes:
+                        x, y = object_keyframes.index(i) * width, k * (height + _CAPTION_HEIGHT)
+                        sheet[y:y + height, x:x + width] = self._thumbnail(annotated, boxes[k], thumbnail_size)
+                        cv.putText(sheet, f"{trackings.objects[k]['object']}_{trackings.objects[k]['id']} #{i}",
+                                   (x + 4, y + height + _CAPTION_HEIGHT - 5), cv.FONT_HERSHEY_SIMPLEX, 0.4,
+                                   (255, 255, 255), 1, cv.LINE_AA)
+        finally:
+            video_capture.release()
+
+        sheet_file = path.join(out_path, file_name + ".jpg")
+        cv.imwrite(sheet_file, sheet)
+        logger.info(f"Contact sheet written to {sheet_file}")
+        return sheet_file
+
+    @staticmethod
+    def _keyframes(statuses, thumbnails):
+        """Returns up to thumbnails frame indexes evenly spaced over the frames where the object is tracked"""
+
+        tracked = np.nonzero(statuses)[0]
+        if len(tracked) == 0:
+            return []
+        picks = np.round(np.linspace(0, len(tracked) - 1, min(thumbnails, len(tracked)))).astype(int)
+        return tracked[picks].tolist()
+
+    @staticmethod
+    def _thumbnail(frame, box, thumbnail_size):
+        """Returns the thumbnail of the region around the box, with the aspect ratio of the thumbnail"""
+
+        frame_height, frame_width = frame.shape[:2]
+        width, height = thumbnail_size
+        x, y, box_width, box_height = [int(v) for v in box]
+
+        # Twice the box, and room for the label under it, widened to the thumbnail aspect ratio
+        crop_height = max(2 * box_height, box_height + 80)
+        crop_width = max(2 * box_width, crop_height * width // height)
+        crop_height = max(crop_height, crop_width * height // width)
+        crop_width, crop_height = min(crop_width, frame_width), min(crop_height, frame_height)
+
+        # Centered on the box, shifted inside the frame
+        x1 = int(np.clip(x + box_width // 2 - crop_width // 2, 0, frame_width - crop_width))
+        y1 = int(np.clip(y + box_height // 2 - crop_height // 2 + 20, 0, frame_height - crop_height))
+        crop = frame[y1:y1 + crop_height, x1:x1 + crop_width]
+        return cv.resize(crop, thumbnail_size, interpolation=cv.INTER_AREA)
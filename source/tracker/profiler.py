@@ -0,0 +1,200 @@
+"""Implements a lightweight profiler of the tracking and rendering hot paths
+
+    The tracking and rendering loops time every stage of every frame (decode, track, draw, write) and,
+    optionally, the update of every single object tracker. At the end of a run the profiler reports the
+    cumulative time and percentiles of every stage, the per object update latency and the frames per second.
+
+    Typical usage:
+
+        profiler = StageProfiler()
+        object_trackings = tracker.track_objects(video_file, objects_to_track, profiler=profiler)
+        renderer.render(video_file, object_trackings, profiler=profiler)
+        profiler.write("profile.json")
+
+    Instrumented code times a loop with begin and end, every frame of the loop with frame and a stage
+    with start and stop:
+
+        profiler.begin("tracking")
+        while ...:
+            start = profiler.start()
+            read_ok, frame = video_capture.read()
+            profiler.stop("decode", start)
+            ...
+            profiler.frame("tracking")
+        profiler.end("tracking")
+
+    When profiling is disabled the loops use a NullProfiler, whose methods do nothing, so the overhead
+    is a couple of empty method calls per frame.
+
+    In real time tracking the loop adds the latency stage, the time from decoding a frame to tracking it,
+    and the dropped_frames counter.
+
+    Every stage and object keeps a running count, total and max of its times and a histogram with log spaced
+    bins, from 1 microsecond to 100 seconds, where the percentiles are estimated within half a bin (about 6%).
+    The memory of the profiler does not grow with the length of the video, so it can profile live sources.
+
+    Stages with the same name in different loops, as decode in tracking and rendering, are accumulated.
+    The write stage is the time the rendering loop waits for the video writer, with a background encoder
+    (see video_io.AsyncVideoWriter) it only includes the time blocked on a full queue.
+"""
+
+import json
+import math
+import time
+
+# Bins of the time histograms: log spaced, _BINS_PER_DECADE per decade from _MIN_SECONDS
+_MIN_SECONDS = 1e-6
+_BINS_PER_DECADE = 20
+_BINS = 8 * _BINS_PER_DECADE
+
+
+class StageProfiler:
+    """Collects the time of every stage and object update"""
+
+    enabled = True
+
+    def __init__(self):
+        """Initialize empty timings"""
+        self._stages = {}
+        self._objects = {}
+        self._object_labels = []
+        self._loops = {}
+        self._counters = {}
+
+    def begin(self, loop):
+        """Starts timing a loop, for example "tracking" or "rendering" """
+        self._loops.setdefault(loop, {"frames": 0, "seconds": 0.0, "begin": None})["begin"] = time.perf_counter()
+
+    def end(self, loop):
+        """Stops timing a loop"""
+        loop = self._loops[loop]
+        loop["seconds"] += time.perf_counter() - loop["begin"]
+
+    def frame(self, loop):
+        """Counts a processed frame of a loop"""
+        self._loops[loop]["frames"] += 1
+
+    def start(self):
+        """Returns the start time of a stage"""
+        return time.perf_counter()
+
+    def stop(self, stage, start):
+        """Adds the time elapsed since start to the stage"""
+        seconds = time.perf_counter() - start
+        timings = self._stages.get(stage)
+        if timings is None:
+            timings = self._stages[stage] = _Timings()
+        timings.add(seconds)
+
+    def count(self, counter, n=1):
+        """Adds n to a counter, for example the dropped frames of a real time source"""
+        self._counters[counter] = self._counters.get(counter, 0) + n
+
+    def set_objects(self, objects):
+        """Sets the objects whose update is timed, in the order of the multitracker"""
+        self._object_labels = [f"{obj['object']}_{obj['id']}" for obj in objects]
+        self._objects = {k: _Timings() for k in range(len(objects))}
+
+    def add_object_update(self, k, seconds):
+        """Adds the update time of the k-th object tracker, it can be called from several threads, one per object"""
+        timings = self._objects.get(k)
+        if timings is None:
+            timings = self._objects.setdefault(k, _Timings())
+        timings.add(seconds)
+
+    def report(self):
+        """Returns the profile as a dictionary
+
+            {
+                "loops": {loop: {"frames": processed frames, "seconds": wall time, "fps": frames per second}},
+                "stages": {stage: statistics},
+                "objects": {object label: statistics of its tracker updates},
+                "counters": {counter: value}
+            }
+
+            The statistics of a stage are its count, the total time in milliseconds and the mean,
+            p50, p90, p99 and max time in milliseconds. The percentiles are estimated from a histogram.
+        """
+
+        object_labels = {k: self._object_labels[k] if k < len(self._object_labels) else str(k) for k in self._objects}
+        return {
+            "loops": {name: {"frames": loop["frames"], "seconds": loop["seconds"], 
+                             "fps": loop["frames"] / loop["seconds"] if loop["seconds"] > 0 else 0.0}
+                      for name, loop in self._loops.items()},
+            "stages": {stage: timings.statistics() for stage, timings in self._stages.items()},
+            "objects": {object_labels[k]: timings.statistics() for k, timings in self._objects.items() if timings.count},
+            "counters": dict(self._counters)
+        }
+
+    def write(self, json_file):
+        """Writes the report to a json file"""
+        with open(json_file, "w") as f:
+            json.dump(self.report(), f, indent=4)
+
+
+class NullProfiler:
+    """Profiler that does nothing, used when profiling is disabled"""
+
+    enabled = False
+
+    def begin(self, loop):
+        pass
+
+    def end(self, loop):
+        pass
+
+    def start(self):
+        return 0.0
+
+    def stop(self, stage, start):
+        pass
+
+    def frame(self, loop):
+        pass
+
+    def count(self, counter, n=1):
+        pass
+
+    def set_objects(self, objects):
+        pass
+
+    def add_object_update(self, k, seconds):
+        pass
+
+
+class _Timings:
+    """Running count, total, min and max of a series of times and their log spaced histogram"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.bins = [0] * _BINS
+
+    def add(self, seconds):
+        """Adds a time in seconds"""
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        index = int(math.log10(max(seconds, _MIN_SECONDS) / _MIN_SECONDS) * _BINS_PER_DECADE)
+        self.bins[min(index, _BINS - 1)] += 1
+
+    def percentile(self, q):
+        """Returns the q-th percentile in seconds, the center of its bin within the min and max times"""
+
+        rank = q / 100 * self.count
+        cumulative = 0
+        for index, count in enumerate(self.bins):
+            cumulative += count
+            if count and cumulative >= rank:
+                break
+        seconds = _MIN_SECONDS * 10 ** ((index + 0.5) / _BINS_PER_DECADE)
+        return min(max(seconds, self.min), self.max)
+
+    def statistics(self):
+        """Returns the statistics of the times in milliseconds"""
+        return {"count": self.count, "total_ms": 1000 * self.total, "mean_ms": 1000 * self.total / self.count,
+                "p50_ms": 1000 * self.percentile(50), "p90_ms": 1000 * self.percentile(90),
+                "p99_ms": 1000 * self.percentile(99), "max_ms": 1000 * self.max}
@@ -0,0 +1,207 @@
+"""Implements the re-acquisition of lost objects
+
+    When the tracker of an object loses it, the object tracker stops updating that tracker and, every few frames,
+    searches the object around its last good bounding box by template matching against the appearance of the
+    object in its last tracked frames. When the match is good enough the single tracker is initialized again
+    in the found bounding box. Optionally a re-detect function, for example an object detector, is called when
+    template matching fails:
+
+        def redetect(frame, k, last_bounding_box):
+            ...
+            return bounding_box  # or None if the k-th object is not found
+
+    Typical usage:
+
+        reacquirer = TemplateReacquirer(threshold=0.6, interval=5, redetect=redetect)
+        tracker = ObjectTracker(TrackerType.KCF, reacquire=reacquirer)
+        object_trackings = tracker.track_objects(video_file, objects_to_track)
+        print(reacquirer.report())
+
+    The report has the re-acquisition events and the time spent searching the lost objects:
+
+        {
+            "attempts": (int) number of searches of lost objects,
+            "seconds": (float) time spent in the searches,
+            "events": list of re-acquisitions, each one a dictionary with the following structure:
+
+                {
+                    "frame": (int) frame index where the object was found,
+                    "id": (int) object id,
+                    "frames_lost": (int) number of frames the object was lost,
+                    "method": (string) "template" or "redetect",
+                    "score": (float) template matching score, None for redetect
+                }
+        }
+
+    The re-detect function must be picklable to be used by the segment tracker worker processes.
+"""
+
+import time
+import cv2 as cv
+import logging
+from tracker import root_logger
+
+
+# Define logger for this module
+logger = logging.getLogger(root_logger.LOGGER_NAME + ".recovery")
+
+
+class TemplateReacquirer:
+    """Searches lost objects by template matching around their last good bounding box"""
+
+    def __init__(self, search_factor=3.0, threshold=0.6, interval=5, refresh=10, redetect=None):
+        """Initialize the re-acquisition parameters
+
+        Args:
+            search_factor: size of the searched region relative to the last good bounding box size
+            threshold: minimum normalized correlation of a template match, in (0, 1]
+            interval: a lost object is searched every interval frames
+            refresh: the template of a tracked object is taken again every refresh frames
+            redetect: optional function (frame, k, last_bounding_box) -> bounding box or None, called when
+                template matching fails
+
+        Raises:
+            ValueError: if search_factor is not greater than 1
+            ValueError: if threshold is not in (0, 1]
+            ValueError: if interval or refresh is less than 1
+        """
+
+        if search_factor <= 1:
+            raise ValueError("Search factor must be greater than 1")
+        if threshold <= 0 or threshold > 1:
+            raise ValueError("Threshold must be in (0, 1]")
+        if interval < 1 or refresh < 1:
+            raise ValueError("Interval and refresh must be positive values")
+
+        self.search_factor = search_factor
+        self.threshold = threshold
+        self.interval = interval
+        self.refresh = refresh
+        self.redetect = redetect
+        self.start([], None)
+
+    def start(self, objects, frame):
+        """Resets the state for a new tracking run and takes the templates of the objects in the first frame"""
+
+        self._ids = [obj["id"] for obj in objects]
+        self._last_boxes = [tuple(obj["coordinates"]) for obj in objects]
+        self._templates = [None] * len(objects)
+        self._tracked_frames = [0] * len(objects)
+        self._lost_frames = [0] * len(objects)
+        self.events = []
+        self.attempts = 0
+        self.seconds = 0.0
+        gray_frame = _gray(frame)
+        for k, bounding_box in enumerate(self._last_boxes):
+            self._templates[k] = self._crop(gray_frame, bounding_box)
+
+    def update(self, frame, statuses, bounding_boxes, frame_index, search_windows=None):
+        """Records the tracked objects of a frame and searches the lost ones every interval frames
+
+        Args:
+            frame: tracked frame
+            statuses: track status of every object
+            bounding_boxes: bounding box of every object
+            frame_index: index of the frame in the video, used in the events
+            search_windows: optional (x, y, width, height) region where each object is expected, for example
+                from kalman.BatchKalmanFilter.search_windows. By default the region around the last good box
+
+        Returns:
+            A list of (k, bounding_box) with the index and the found bounding box of the re-acquired objects
+        """
+
+        gray_frame = None
+        reacquired = []
+        for k, (track_status, bounding_box) in enumerate(zip(statuses, bounding_boxes)):
+            if track_status:
+                # Keep the last good box, the template is taken again every refresh frames
+                self._last_boxes[k] = tuple([int(i) for i in bounding_box])
+                self._lost_frames[k] = 0
+                self._tracked_frames[k] = self._tracked_frames[k] + 1
+                if self._tracked_frames[k] % self.refresh == 0:
+                    gray_frame = _gray(frame) if gray_frame is None else gray_frame
+                    template = self._crop(gray_frame, self._last_boxes[k])
+                    if template is not None:
+                        self._templates[k] = template
+            else:
+                self._lost_frames[k] = self._lost_frames[k] + 1
+                if self._lost_frames[k] % self.interval == 0:
+                    gray_frame = _gray(frame) if gray_frame is None else gray_frame
+                    search_window = search_windows[k] if search_windows is not None else None
+                    bounding_box = self._search(k, frame, gray_frame, frame_index, search_window)
+                    if bounding_box is not None:
+                        reacquired.append((k, bounding_box))
+
+        return reacquired
+
+    def _search(self, k, frame, gray_frame, frame_index, search_window=None):
+        """Searches the k-th lost object, returns the found bounding box or None"""
+
+        start = time.perf_counter()
+        self.attempts = self.attempts + 1
+        method = "template"
+        bounding_box, score = self._match_template(k, gray_frame, search_window)
+        if bounding_box is None and self.redetect is not None:
+            method, score = "redetect", None
+            bounding_box = self.redetect(frame, k, self._last_boxes[k])
+        self.seconds = self.seconds + time.perf_counter() - start
+
+        if bounding_box is None:
+            return None
+
+        bounding_box = tuple([int(i) for i in bounding_box])
+        self.events.append({"frame": frame_index, "id": self._ids[k], "frames_lost": self._lost_frames[k],
+                            "method": method, "score": score})
+        logger.info(f"Object {self._ids[k]} re-acquired in frame {frame_index} by {method}")
+        self._last_boxes[k] = bounding_box
+        self._lost_frames[k] = 0
+        return bounding_box
+
+    def report(self):
+        """Returns the re-acquisition events and the time spent searching the lost objects"""
+        return {"attempts": self.attempts, "seconds": self.seconds, "events": list(self.events)}
+
+    def _match_template(self, k, gray_frame, search_window=None):
+        """Returns (bounding_box, score) of the best template match around the last box, (None, score) if not good enough"""
+
+        template = self._templates[k]
+        if template is None:
+            return (None, None)
+
+        # Region around the last good bounding box or the given search window, inside the frame
+        frame_height, frame_width = gray_frame.shape[:2]
+        if search_window is not None:
+            x, y, width, height = [int(i) for i in search_window]
+            region_x, region_y, region_x2, region_y2 = max(x, 0), max(y, 0), min(x + width, frame_width), min(y + height, frame_height)
+        else:
+            x, y, width, height = self._last_boxes[k]
+            region_x = max(int(x + width / 2 - self.search_factor * width / 2), 0)
+            region_y = max(int(y + height / 2 - self.search_factor * height / 2), 0)
+            region_x2 = min(int(x + width / 2 + self.search_factor * width / 2), frame_width)
+            region_y2 = min(int(y + height / 2 + self.search_factor * height / 2), frame_height)
+        region = gray_frame[region_y:region_y2, region_x:region_x2]
+        if region.shape[0] < template.shape[0] or region.shape[1] < template.shape[1]:
+            return (None, None)
+
+        scores = cv.matchTemplate(region, template, cv.TM_CCOEFF_NORMED)
+        _, score, _, location = cv.minMaxLoc(scores)
+        if score < self.threshold:
+            return (None, float(score))
+        return ((region_x + location[0], region_y + location[1], template.shape[1], template.shape[0]), float(score))
+
+    @staticmethod
+    def _crop(gray_frame, bounding_box):
+        """Returns a copy of the bounding box region of the frame, None if it is not inside the frame"""
+
+        x, y, width, height = [int(i) for i in bounding_box]
+        frame_height, frame_width = gray_frame.shape[:2]
+        if x < 0 or y < 0 or width < 1 or height < 1 or x + width > frame_width or y + height > frame_height:
+            return None
+        return gray_frame[y:y + height, x:x + width].copy()
+
+
+def _gray(frame):
+    """Returns the grayscale version of a frame"""
+    if frame is None or frame.ndim == 2:
+        return frame
+    return cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
@@ -10,6 +10,26 @@ Typical usage:
 
     The object_trackings history can be obtained with the ObjectTracker class.
 
+    Instead of the rendered video, the boxes can be written as annotation files that the player draws,
+    see the sidecar module:
+
+    renderer.render_sidecar(video_file, object_trackings, out_path=".", file_name="out", formats=("ass", "jsonl"))
+
+The label of every object is rasterized once, with cv.putText, into a sprite: an image of the text and the
+mask of its pixels, cached per object, that is copied into a numpy slice of the frame with cv.copyTo, several
+times faster than rasterizing the text again. Labels that cross the frame border
+are drawn with cv.putText, as its clipping changes a few pixels of the text. The boxes of a frame are
+drawn in a single cv.polylines call, and the labels are drawn after all the boxes. The output is pixel
+identical to drawing each box and label with cv.rectangle and cv.putText, except where a box crosses the
+label of a previous object, where the label is now drawn over the box.
+
+The codec is chosen by platform, in an AVI container, unless set with set_video_format, which also sets the
+quality, the output resolution and the writer backend: OpenCV, or an ffmpeg process fed raw frames through
+a pipe, that has the H264, HEVC and VP9 encoders and its speed presets (see video_io.FFmpegVideoWriter):
+
+    renderer.set_video_format(VideoCodec.H264, VideoFormat.MP4, quality=70, resolution=(1280, 0),
+                              backend=VideoBackend.FFMPEG, preset="veryfast")
+
 """
 
 
@@ -17,18 +37,46 @@ import platform
 from enum import Enum
 from os import path
 from tracker import utils
+import numpy as np
 import cv2 as cv
 import logging
 from tracker import root_logger
-from tracker.types import VideoCodec, VideoFormat
+from tracker.types import VideoCodec, VideoFormat, VideoBackend
+from tracker.video_io import AsyncVideoWriter, FFmpegVideoWriter, ScaledVideoWriter, ffmpeg_output_size
+from tracker.trackings import Trackings
+from tracker.profiler import NullProfiler
+from tracker import sidecar
+
+# Frame rate of the output video when the source does not report it, as some live sources
+DEFAULT_FPS = 30
+
+# Text shown when an object is lost, and its position
+TRACKING_FAILURE_TEXT = "Tracking failure: one or more objects could not be tracked"
+TRACKING_FAILURE_POINT = (60, 50)
 
 # Define logger for this module
 logger = logging.getLogger(root_logger.LOGGER_NAME + ".bounding_box_render")
 
 class BoundingBoxRenderer:
 
-    def __init__(self):
-        """Inititialize codec and format according to the system running"""
+    def __init__(self, prefetch=0, write_queue=0):
+        """Inititialize codec and format according to the system running
+        
+        Args:
+            prefetch: number of frames decoded ahead in a background thread, 0 decodes in the rendering thread
+            write_queue: number of frames waiting to be encoded by a background thread, 0 encodes in the rendering thread
+
+        Raises:
+            ValueError: if prefetch is negative
+            ValueError: if write_queue is negative
+        """
+
+        if prefetch < 0:
+            raise ValueError("Prefetch can not be negative")
+        if write_queue < 0:
+            raise ValueError("Write queue can not be negative")
+        self.prefetch = prefetch
+        self.write_queue = write_queue
         
         system = platform.system()
         if system == "Darwin":
@@ -43,6 +91,11 @@ class BoundingBoxRenderer:
         else:
             self.video_codec = VideoCodec.DIVX
             self.video_format = VideoFormat.AVI
+        self.video_quality = None
+        self.video_resolution = None
+        self.video_backend = VideoBackend.OPENCV
+        self.ffmpeg_preset = None
+        self.ffmpeg_threads = 0
         
         self._box_color = (0, 0, 255)
         self._box_line_width = 5
@@ -50,6 +103,9 @@ class BoundingBoxRenderer:
         self._text_thickness = 2
         self._font_scale = 0.75
         self._text_font = cv.FONT_HERSHEY_SIMPLEX
+        self._label_sprites = {}
+        # Factor of the label offsets from the bounding box and of the tracking failure text position
+        self._label_scale = 1.0
 
         # Log data
         logger.info(f"Renderer initialized")
@@ -93,11 +149,63 @@ class BoundingBoxRenderer:
         self._text_color = color
         self._text_thickness = thickness
         self._font_scale = scale
+        self._text_font = font
+        self._label_sprites = {}
         logger.debug(f"Set text format, color: {color}, thikness: {thickness}, scale: {scale}")
 
-    def render(self, video_file, object_trackings, out_path = ".", file_name = "out"):
+    def set_video_format(self, codec=None, video_format=None, quality=None, resolution=None,
+                         backend=VideoBackend.OPENCV, preset=None, threads=0):
+        """Set the codec, container, quality and resolution of the output video and the writer that encodes it
+
+        Args:
+            codec: types.VideoCodec, the codec of the platform if None. The OpenCV builds usually lack the
+                H264 and HEVC encoders, that the ffmpeg backend has
+            video_format: types.VideoFormat container, the current one, AVI by default, is kept if None
+            quality: quality in [0, 100], higher is better and bigger, only applied by the ffmpeg backend
+            resolution: (width, height) of the output video, the frames are resized after drawing. A 0
+                dimension keeps the aspect ratio of the video. The video resolution if None
+            backend: types.VideoBackend, OpenCV or an ffmpeg process fed through a pipe
+            preset: encoder speed preset of H264 and HEVC with the ffmpeg backend, as "ultrafast" or "veryfast"
+            threads: number of encoder threads of the ffmpeg backend, 0 lets ffmpeg choose
+
+        Raises:
+            ValueError: if quality is not in [0, 100]
+            ValueError: if resolution is negative or both dimensions are 0
+            ValueError: if threads is negative
+        """
+
+        # Preconditions
+        if quality is not None and not 0 <= quality <= 100:
+            raise ValueError("Quality must be in [0, 100]")
+        if resolution is not None and (min(resolution) < 0 or max(resolution) == 0):
+            raise ValueError("Invalid resolution")
+        if threads < 0:
+            raise ValueError("Threads can not be negative")
+        if quality is not None and backend == VideoBackend.OPENCV:
+            logger.warning("The OpenCV video writer does not apply the quality, use the ffmpeg backend")
+
+        if codec is not None:
+            self.video_codec = codec
+        if video_format is not None:
+            self.video_format = video_format
+        self.video_quality = quality
+        self.video_resolution = tuple(resolution) if resolution is not None else None
+        self.video_backend = backend
+        self.ffmpeg_preset = preset
+        self.ffmpeg_threads = threads
+        logger.debug(f"Set video format, codec: {self.video_codec.name}, format: {self.video_format.value}, "
+                     f"quality: {quality}, resolution: {resolution}, backend: {backend.value}")
+
+    def render(self, video_file, object_trackings, out_path = ".", file_name = "out", profiler = None):
         """Render a video file with the bounding boxes specified in object trackings
         
+        Args:
+            video_file: video file
+            object_trackings: object trackings history, see ObjectTracker.track_objects
+            out_path: output directory of the rendered video
+            file_name: output file name of the rendered video, without extension
+            profiler: optional profiler.StageProfiler that times the decode, draw and write stages
+        
         Raises:
             ValueError: if video file can not be opened
             ValueError: if no frame can be read from the video
@@ -110,7 +218,7 @@ class BoundingBoxRenderer:
         
         # Get video capture and first frame
         try:
-            first_frame, video_capture = utils.get_video_capture(video_file)
+            first_frame, video_capture = utils.get_video_capture(video_file, self.prefetch)
         except Exception as e:
             logger.error("invalid video file")
             raise
@@ -119,58 +227,253 @@ class BoundingBoxRenderer:
         for obj in object_trackings:
             if utils.get_video_frame_count(video_capture) != len(obj["track"]):
                 logger.error("video frame count and object trackings must be equal")
+                video_capture.release()
                 raise ValueError("Video frame count and object trackings must be equal")
         
         # Create video writer
-        video_writer = cv.VideoWriter(  out_path + "/" + file_name + "." + self.video_format.value,
-                                        cv.VideoWriter_fourcc(*self.video_codec.value), 
-                                        utils.get_video_fps(video_capture), 
-                                        (utils.get_video_frame_width(video_capture), utils.get_video_frame_height(video_capture))
-                                     )
+        try:
+            video_writer = self.create_video_writer(video_capture, out_path, file_name)
+        except Exception:
+            video_capture.release()
+            raise
         
         # Add the object bounding boxes and text to every frame in the video
         frame_count = utils.get_video_frame_count(video_capture)
-        frame_width = utils.get_video_frame_width(video_capture)
         frame_height = utils.get_video_frame_height(video_capture)
         frame = first_frame
+        profiler = profiler or NullProfiler()
+        profiler.begin("rendering")
         for i in range(frame_count):
 
-            # Loop over tracked objects 
-            for obj in object_trackings:                
-                coordinates = obj["track"][i]["coordinates"]
-                track_status = obj["track"][i]["track_status"]
-                if track_status:
-
-                    # Add rectangle over object
-                    point1 = (coordinates[0], coordinates[1])
-                    point2 = (coordinates[0] + coordinates[2], coordinates[1] + coordinates[3])
-                    cv.rectangle(frame, point1, point2, self._box_color, self._box_line_width)
-
-                    # Add text for object
-                    # Text is shown UNDER the bbox unless it goes out of the video frame
-                    # In that case it is shown OVER the bbox
-                    text = obj["object"] + "_" + str(obj["id"])
-                    x = coordinates[0]
-                    y_under = coordinates[1] + coordinates[3] + 30
-                    y_over = coordinates[1] - 20
-                    point = (x, y_over) if y_under >= frame_height else (x, y_under)
-                    cv.putText(frame, text, point, self._text_font, self._font_scale, self._text_color, self._text_thickness)
-                else:
-                    # Indicate a tracking error ocurred
-                    point = (60, 50)
-                    text = "Tracking failure: one or more objects could not be tracked"
-                    cv.putText(frame, text, point, self._text_font, self._font_scale, self._text_color, self._text_thickness)
+            # Draw the tracked objects over the frame
+            start = profiler.start()
+            self.draw_frame(frame, object_trackings, i, frame_height)
+            profiler.stop("draw", start)
 
             # Log info
-            if i % (frame_count/10) == 0:
+            if utils.is_progress_frame(i, frame_count):
                 logger.info(f"rendering frame {i}/{frame_count}")
-            i = i + 1
 
             # Write frame to output video
+            start = profiler.start()
             video_writer.write(frame)
+            profiler.stop("write", start)
+            profiler.frame("rendering")
 
             # Read new frame 
+            start = profiler.start()
             success, frame = video_capture.read()
+            profiler.stop("decode", start)
+
+        # Release capture and writer
+        video_capture.release()
+        video_writer.release()
+        profiler.end("rendering")
+
+    def render_sidecar(self, video_file, object_trackings, out_path = ".", file_name = "out", formats = ("jsonl",)):
+        """Write the object trackings as annotation files, drawn by the player or client, instead of a video
+
+        Only the frame rate, size and frame count are read from the video capture properties, no frame is
+        decoded nor encoded. See the sidecar module for the formats.
+
+        Args:
+            video_file: video file
+            object_trackings: object trackings history, see ObjectTracker.track_objects
+            out_path: output directory of the annotation files
+            file_name: output file name of the annotation files, without extension
+            formats: annotation formats, any of sidecar.SIDECAR_FORMATS
+
+        Returns:
+            The list of written files
+
+        Raises:
+            ValueError: if a format is not supported
+            ValueError: if video file can not be opened
+            ValueError: if video frame count not equal to object_trackings length
+        """
+
+        if not path.exists(out_path):
+            logger.error("output path does not exist")
+            raise ValueError("Output path does not exist")
+        for sidecar_format in formats:
+            if sidecar_format not in sidecar.SIDECAR_FORMATS:
+                raise ValueError(f"Sidecar format must be one of {', '.join(sidecar.SIDECAR_FORMATS)}")
+
+        trackings = object_trackings if isinstance(object_trackings, Trackings) else Trackings.from_list(object_trackings)
+
+        # Read the video properties without decoding any frame
+        video_capture = cv.VideoCapture(video_file)
+        if not video_capture.isOpened():
+            logger.error("invalid video file")
+            raise ValueError("Video file could not be opened")
+        fps = video_capture.get(cv.CAP_PROP_FPS) or DEFAULT_FPS
+        width = utils.get_video_frame_width(video_capture)
+        height = utils.get_video_frame_height(video_capture)
+        frame_count = utils.get_video_frame_count(video_capture)
+        video_capture.release()
+        if frame_count != trackings.frame_count:
+            logger.error("video frame count and object trackings must be equal")
+            raise ValueError("Video frame count and object trackings must be equal")
+
+        files = []
+        for sidecar_format in formats:
+            file = path.join(out_path, file_name + "." + sidecar.SIDECAR_FORMATS[sidecar_format])
+            if sidecar_format == "ass":
+                sidecar.write_ass(file, trackings, fps, width, height, self._box_color, self._box_line_width,
+                                  self._text_color, self._font_scale, TRACKING_FAILURE_TEXT, TRACKING_FAILURE_POINT)
+            elif sidecar_format == "vtt":
+                sidecar.write_webvtt(file, trackings, fps)
+            else:
+                sidecar.write_jsonl(file, trackings, fps, width, height)
+            logger.info(f"Annotations written to {file}")
+            files.append(file)
+
+        return files
+
+    def draw_frame(self, frame, object_trackings, i, frame_height):
+        """Draws the bounding boxes and texts of frame i of the object trackings over the frame
+        
+        Args:
+            frame: frame to draw on, it is modified in place
+            object_trackings: object trackings history, a Trackings object or a list of dictionaries, see ObjectTracker.track_objects
+            i: index of the frame in the object trackings
+            frame_height: height of the frame, used to place the texts inside the frame
+        """
+
+        # Get the track status and coordinates of every object in frame i
+        # The columnar trackings are read directly from its arrays
+        if isinstance(object_trackings, Trackings):
+            statuses, boxes = object_trackings.frame(i)
+            self.draw_objects(frame, object_trackings.objects, statuses, boxes, frame_height)
+        else:
+            statuses = [obj["track"][i]["track_status"] for obj in object_trackings]
+            boxes = [obj["track"][i]["coordinates"] for obj in object_trackings]
+            self.draw_objects(frame, object_trackings, statuses, boxes, frame_height)
+
+    def draw_objects(self, frame, objects, statuses, boxes, frame_height):
+        """Draws the bounding boxes and texts of the objects over the frame
+
+        Args:
+            frame: frame to draw on, it is modified in place
+            objects: list of dictionaries with the "object" and "id" of every object
+            statuses: track status of every object, list or array
+            boxes: bounding box (x, y, width, height) of every object, list or (n_objects, 4) array
+            frame_height: height of the frame, used to place the texts inside the frame
+        """
+
+        statuses = np.asarray(statuses, dtype=bool).reshape(-1)
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        tracked = np.nonzero(statuses)[0]
+
+        # Add the rectangles over all the tracked objects at once, as the corners of cv.rectangle
+        if len(tracked) > 0:
+            x1, y1 = boxes[tracked, 0], boxes[tracked, 1]
+            x2, y2 = x1 + boxes[tracked, 2], y1 + boxes[tracked, 3]
+            corners = np.stack([np.stack([x1, y1], 1), np.stack([x2, y1], 1), np.stack([x2, y2], 1),
+                                np.stack([x1, y2], 1)], axis=1)
+            cv.polylines(frame, list(corners), True, self._box_color, self._box_line_width)
+
+        # Add text for every object
+        # Text is shown UNDER the bbox unless it goes out of the video frame
+        # In that case it is shown OVER the bbox
+        y_under = boxes[:, 1] + boxes[:, 3] + int(round(30 * self._label_scale))
+        y_over = boxes[:, 1] - int(round(20 * self._label_scale))
+        label_y = np.where(y_under >= frame_height, y_over, y_under)
+        for k in tracked.tolist():
+            obj = objects[k]
+            self._draw_label(frame, (obj["object"], obj["id"]), (int(boxes[k, 0]), int(label_y[k])))
+
+        # Indicate a tracking error ocurred
+        if len(tracked) < len(statuses):
+            self._draw_label(frame, None, tuple(int(round(c * self._label_scale)) for c in TRACKING_FAILURE_POINT))
+
+    def _draw_label(self, frame, key, point):
+        """Draws the label of an object, or the tracking failure text if key is None, with origin in point"""
+
+        sprite = self._label_sprites.get(key)
+        if sprite is None:
+            text = TRACKING_FAILURE_TEXT if key is None else key[0] + "_" + str(key[1])
+            sprite = self._label_sprites[key] = self._create_label_sprite(text)
+        text, image, mask, (dx, dy) = sprite
+
+        # Copy the text pixels, labels crossing the frame border are drawn by opencv
+        x, y = point[0] + dx, point[1] + dy
+        height, width = mask.shape
+        if x < 0 or y < 0 or x + width > frame.shape[1] or y + height > frame.shape[0] or frame.ndim != 3:
+            cv.putText(frame, text, point, self._text_font, self._font_scale, self._text_color, self._text_thickness)
+        else:
+            cv.copyTo(image, mask, frame[y:y + height, x:x + width])
+
+    def _create_label_sprite(self, text):
+        """Returns (text, image, mask, offset) with the pixels drawn by cv.putText and their offset from the text origin"""
+
+        (width, height), baseline = cv.getTextSize(text, self._text_font, self._font_scale, self._text_thickness)
+        padding = 2 * self._text_thickness + 4
+        canvas = np.zeros((height + baseline + 2 * padding, width + 2 * padding), dtype=np.uint8)
+        cv.putText(canvas, text, (padding, padding + height), self._text_font, self._font_scale, 255, self._text_thickness)
+
+        # Crop to the drawn pixels
+        ys, xs = np.nonzero(canvas)
+        if len(xs) == 0:
+            return (text, np.zeros((0, 0, 3), dtype=np.uint8), np.zeros((0, 0), dtype=np.uint8), (0, 0))
+        mask = canvas[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+        image = np.empty(mask.shape + (3,), dtype=np.uint8)
+        image[:] = self._text_color
+        return (text, image, mask, (int(xs.min()) - padding, int(ys.min()) - padding - height))
+
+    def create_video_writer(self, video_capture, out_path, file_name, fps=None, frame_size=None):
+        """Returns a video writer with the fps and frame size of the video capture, unless fps or frame_size are given
+        
+        The writer applies the video format, see set_video_format. If write_queue is positive the frames are
+        encoded in a background thread, see video_io.AsyncVideoWriter
+
+        Args:
+            video_capture: open video capture of the input video
+            out_path: output directory of the video
+            file_name: output file name of the video, without extension
+            fps: frames per second of the output video
+            frame_size: (width, height) of the frames written to the writer
+
+        Raises:
+            ValueError: if the codec can not be encoded by the OpenCV backend, or ffmpeg is not found
+        """
+
+        video_file = out_path + "/" + file_name + "." + self.video_format.value
+        fps = fps or utils.get_video_fps(video_capture) or DEFAULT_FPS
+        frame_size = frame_size or (utils.get_video_frame_width(video_capture), utils.get_video_frame_height(video_capture))
+        size = self._output_size(frame_size)
+
+        if self.video_backend == VideoBackend.FFMPEG:
+            # An odd source or resolution is rounded to the even size of the 4:2:0 encoders
+            size = ffmpeg_output_size(self.video_codec, size)
+            video_writer = FFmpegVideoWriter(video_file, self.video_codec, fps, size, self.video_quality,
+                                             self.ffmpeg_preset, self.ffmpeg_threads)
+        else:
+            video_writer = cv.VideoWriter(video_file, cv.VideoWriter_fourcc(*self.video_codec.value), fps, size)
+            if not video_writer.isOpened():
+                logger.error("video writer could not be opened")
+                raise ValueError(f"OpenCV can not encode {self.video_codec.name} in {self.video_format.value}, "
+                                 "try the ffmpeg backend")
+
+        # Frames are drawn at the video resolution and resized before encoding
+        if size != frame_size:
+            video_writer = ScaledVideoWriter(video_writer, size)
+        if self.write_queue > 0:
+            video_writer = AsyncVideoWriter(video_writer, self.write_queue)
+
+        return video_writer
+
+    def _output_size(self, frame_size):
+        """Returns the (width, height) of the output video for frames of frame_size"""
+
+        if self.video_resolution is None:
+            return frame_size
+        width, height = self.video_resolution
+        if width == 0:
+            width = 2 * round(frame_size[0] * height / frame_size[1] / 2)
+        elif height == 0:
+            height = 2 * round(frame_size[1] * width / frame_size[0] / 2)
+        return (width, height)
 
 
 #######################################################################
@@ -179,7 +482,6 @@ class BoundingBoxRenderer:
 
 from tracker.object_tracker import ObjectTracker
 from tracker.types import TrackerType
-import json
 
 if __name__ == "__main__":
 
@@ -200,5 +502,4 @@ if __name__ == "__main__":
     renderer.set_text_format((255, 255, 255), 2, 0.8)
     renderer.render(video_file, object_trackings, out_path=".", file_name="out")
 
-    #with open("trackings.json", "w") as f:
-    #    json.dump(object_trackings, f)
+    #utils.write_trackings_file("trackings.json", object_trackings)
@@ -0,0 +1,107 @@
+"""Implements a single object tracker wrapper that tracks inside a search window around the object
+
+    OpenCV trackers only look at the neighbourhood of the object, but the whole frame is passed to the
+    update method. SearchWindowTracker passes a crop of the frame around the object instead, so less
+    memory is touched on each update. When the object gets close to the border of the window, the window
+    is centered again on the object and the wrapped tracker is initialized in the new window, so the
+    learned appearance model is lost: tracking is faster but it can be less accurate.
+
+    The window must be larger than the region the wrapped tracker searches by itself, KCF for example pads
+    the bounding box 2.5 times, otherwise the tracker lags behind moving objects.
+
+    Typical usage:
+
+        tracker = SearchWindowTracker(cv.TrackerKCF_create, factor=5)
+        tracker.init(frame, bounding_box)
+        track_status, bounding_box = tracker.update(next_frame)
+"""
+
+import logging
+from tracker import root_logger
+
+
+# Define logger for this module
+logger = logging.getLogger(root_logger.LOGGER_NAME + ".search_window")
+
+
+class SearchWindowTracker:
+    """Tracks an object with a wrapped tracker inside a crop of the frame"""
+
+    def __init__(self, create_tracker, factor=5.0, margin=0.5):
+        """Initialize the search window parameters
+
+        Args:
+            create_tracker: function that returns a new single object tracker
+            factor: size of the search window relative to the bounding box size
+            margin: the window is moved when the distance from the bounding box to the window border
+                is less than margin times the bounding box size
+
+        Raises:
+            ValueError: if factor is not greater than 1
+            ValueError: if margin is negative
+        """
+
+        if factor <= 1:
+            raise ValueError("Search window factor must be greater than 1")
+        if margin < 0:
+            raise ValueError("Search window margin can not be negative")
+
+        self._create_tracker = create_tracker
+        self._factor = factor
+        self._margin = margin
+        self._tracker = None
+        self._window = None
+        self.recenter_count = 0
+
+    def init(self, frame, bounding_box):
+        """Initialize the wrapped tracker in a window centered on the bounding box"""
+
+        x, y, width, height = bounding_box
+        self._window = self._centered_window(frame, bounding_box)
+        window_x, window_y = self._window[:2]
+
+        self._tracker = self._create_tracker()
+        return self._tracker.init(self._crop(frame), (x - window_x, y - window_y, width, height))
+
+    def update(self, frame):
+        """Update the wrapped tracker with the crop of the frame
+
+        Returns:
+            (track_status, bounding_box) with the bounding box in frame coordinates
+        """
+
+        window_x, window_y, window_width, window_height = self._window
+        track_status, bounding_box = self._tracker.update(self._crop(frame))
+        x, y, width, height = bounding_box
+        bounding_box = (x + window_x, y + window_y, width, height)
+
+        # Move the window if the object is close to its border
+        if track_status:
+            margin_x, margin_y = self._margin * width, self._margin * height
+            if (x < margin_x or y < margin_y or 
+                x + width > window_width - margin_x or y + height > window_height - margin_y):
+
+                # The window can not move when it is already at the border of the frame
+                bounding_box = tuple([int(i) for i in bounding_box])
+                if self._centered_window(frame, bounding_box) != self._window:
+                    self.init(frame, bounding_box)
+                    self.recenter_count = self.recenter_count + 1
+                    logger.debug(f"Search window moved to {self._window}")
+
+        return (track_status, bounding_box)
+
+    def _centered_window(self, frame, bounding_box):
+        """Returns the search window (x, y, width, height) centered on the bounding box, inside the frame"""
+
+        x, y, width, height = bounding_box
+        frame_height, frame_width = frame.shape[:2]
+        window_width = min(int(width * self._factor), frame_width)
+        window_height = min(int(height * self._factor), frame_height)
+        window_x = min(max(int(x + width / 2 - window_width / 2), 0), frame_width - window_width)
+        window_y = min(max(int(y + height / 2 - window_height / 2), 0), frame_height - window_height)
+        return (window_x, window_y, window_width, window_height)
+
+    def _crop(self, frame):
+        """Returns the search window of the frame"""
+        window_x, window_y, window_width, window_height = self._window
+        return frame[window_y:window_y + window_height, window_x:window_x + window_width]
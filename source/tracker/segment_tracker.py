@@ -0,0 +1,223 @@
+"""Implements a segment parallel tracker for long videos
+
+    The video is split into segments that are tracked in a pool of worker processes. Each worker seeks
+    to the first frame of its segment with CAP_PROP_POS_FRAMES and tracks it with an ObjectTracker.
+
+    Every segment after the first must be seeded with the bounding boxes of its first frame:
+
+        keyframe seed: the bounding boxes are given for that frame, as initial conditions. These segments
+            are tracked in parallel as soon as the pool has a free worker.
+        tail seed: the segment is seeded with the last bounding boxes of the previous segment. It can only
+            be tracked when the previous segment is finished, so chains of tail seeded segments are tracked
+            sequentially. The tracker is initialized on the last frame of the previous segment, where the
+            seed boxes were computed. The objects lost in that frame stay lost in the whole segment, their
+            trackers are not initialized in a stale box.
+
+    The segment boundaries are the equal length split points of the video plus the keyframes, so the speed
+    up comes from the keyframes: without them the segments are tracked one after the other.
+
+    The results are stitched into a single Trackings object. Seams are reported in the seams attribute,
+    a list with one dictionary per segment boundary:
+
+        {
+            "frame": (int) first frame of the segment,
+            "seed": (string) "keyframe" or "tail",
+            "lost_objects": (list) ids of the objects not tracked in the last frame of the previous segment,
+            "offsets": (dict) for each object id, distance in pixels between the centers of the last box
+                of the previous segment and the first box of the segment
+        }
+
+    Typical usage:
+
+        object_tracker = ObjectTracker(TrackerType.CSRT)
+        segment_tracker = SegmentTracker(object_tracker, segments=8, processes=4)
+        keyframes = utils.read_keyframes_file("keyframes.json")
+        object_trackings = segment_tracker.track_objects(video_file, objects_to_track, keyframes)
+        print(segment_tracker.seams)
+
+    Note that seeking is exact only for containers and codecs that support frame accurate seeking. The
+    segments are split with the frame count of the container: if it overstates the frames, the last segment
+    ends at the last decoded frame, and a video that ends before the last segment starts raises.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+from tracker.trackings import Trackings
+from tracker import utils
+import logging
+from tracker import root_logger
+
+
+# Define logger for this module
+logger = logging.getLogger(root_logger.LOGGER_NAME + ".segment_tracker")
+
+
+class SegmentTracker:
+    """Tracks the segments of a video in parallel processes and stitches the results"""
+
+    def __init__(self, object_tracker, segments=4, processes=None):
+        """Initialize the segment tracker
+
+        Args:
+            object_tracker: ObjectTracker used to track each segment, it is copied to the worker processes
+            segments: number of equal length segments the video is split into
+            processes: number of worker processes, None uses the number of cores
+
+        Raises:
+            ValueError: if segments is less than 1
+            ValueError: if processes is less than 1
+            ValueError: if the object tracker tracks in real time, the segments would drop frames
+        """
+
+        if segments < 1:
+            raise ValueError("Segments must be a positive value")
+        if processes is not None and processes < 1:
+            raise ValueError("Processes must be a positive value")
+        if object_tracker.real_time:
+            raise ValueError("Segments can not be tracked in real time")
+
+        self.object_tracker = object_tracker
+        self.segments = segments
+        self.processes = processes
+        self.seams = []
+        logger.info(f"Segment tracker initialized for {segments} segments")
+
+    def track_objects(self, video_file, objects_to_track, keyframes=None):
+        """Tracks objects in a video file given the initial bounding boxes and optional keyframes
+
+        Args:
+            video_file: video file
+            objects_to_track: initial conditions in the first frame, see ObjectTracker.track_objects
+            keyframes: optional dictionary {frame index: objects to track}, with the bounding boxes of the objects
+                in that frame, see utils.read_keyframes_file
+
+        Returns:
+            A Trackings object, see ObjectTracker.track_objects
+
+        Raises:
+            ValueError: if video file can not be opened
+            ValueError: if no frame can be read from the video
+            ValueError: if the frame count of the video is unknown
+            ValueError: if a segment other than the last one ends before its last frame
+            ValueError: if the objects of a keyframe are not the objects to track
+        """
+
+        # Get the video frame count
+        try:
+            _, video_capture = utils.get_video_capture(video_file)
+        except ValueError:
+            logger.error("invalid video file")
+            raise
+        frame_count = utils.get_video_frame_count(video_capture)
+        video_capture.release()
+        if frame_count <= 0:
+            logger.error("unknown video frame count")
+            raise ValueError("The frame count of the video is unknown, it can not be split in segments")
+
+        # Segment boundaries and seeds, None seeds are taken from the tail of the previous segment
+        seeds = {0: objects_to_track}
+        for frame, objects in (keyframes or {}).items():
+            if 0 <= frame < frame_count:
+                seeds[frame] = self._sort_keyframe_objects(objects, objects_to_track)
+            else:
+                logger.warning(f"Keyframe {frame} out of the video, ignored")
+        starts = sorted(set(seeds) | set(k * frame_count // self.segments for k in range(self.segments)))
+        stops = starts[1:] + [frame_count]
+        logger.info(f"Tracking {len(starts)} segments, {len(seeds)} seeded by keyframes")
+        if len(starts) > 1 and len(seeds) == 1:
+            logger.warning("Without keyframes the segments are tracked one after the other, not in parallel")
+
+        # Track the seeded segments first, tail seeded segments are submitted when the previous one finishes
+        results = {}
+        with ProcessPoolExecutor(self.processes) as executor:
+            pending = {}
+            for k, start in enumerate(starts):
+                if start in seeds:
+                    future = executor.submit(_track_segment, self.object_tracker, video_file, seeds[start], start, stops[k],
+                                             np.zeros(len(objects_to_track), dtype=bool))
+                    pending[future] = (k, False)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    k, overlap = pending.pop(future)
+                    boxes, statuses = future.result()
+                    if overlap:
+                        boxes, statuses = boxes[:, 1:], statuses[:, 1:]
+                    results[k] = (boxes, statuses)
+                    logger.info(f"Segment {starts[k]}-{stops[k]} tracked")
+                    if k + 1 < len(starts) and boxes.shape[1] < stops[k] - starts[k]:
+                        logger.error("video shorter than its frame count")
+                        raise ValueError(f"Segment {starts[k]}-{stops[k]} ended in frame {starts[k] + boxes.shape[1]}, "
+                                         f"the video has fewer frames than its frame count {frame_count}")
+
+                    # Seed the next segment with the tail of this one
+                    # The tracker is initialized in the last frame of this segment, where the tail boxes are located
+                    if k + 1 < len(starts) and starts[k + 1] not in seeds:
+                        tail_objects = [dict(obj, coordinates=tuple(box)) for obj, box in zip(objects_to_track, boxes[:, -1].tolist())]
+                        future = executor.submit(_track_segment, self.object_tracker, video_file, tail_objects,
+                                                 starts[k + 1] - 1, stops[k + 1], ~statuses[:, -1])
+                        pending[future] = (k + 1, True)
+
+        # Stitch the segments and report the seams
+        boxes = np.concatenate([results[k][0] for k in range(len(starts))], axis=1)
+        statuses = np.concatenate([results[k][1] for k in range(len(starts))], axis=1)
+        self.seams = [self._seam_report(results[k - 1], results[k], starts[k], starts[k] in seeds, objects_to_track)
+                      for k in range(1, len(starts))]
+
+        return Trackings(objects_to_track, boxes, statuses)
+
+    @staticmethod
+    def _sort_keyframe_objects(keyframe_objects, objects_to_track):
+        """Returns the keyframe objects in the order of the objects to track
+
+        Raises:
+            ValueError: if the keyframe ids are not the ids of the objects to track
+        """
+
+        keyframe_objects_by_id = {obj["id"]: obj for obj in keyframe_objects}
+        if sorted(keyframe_objects_by_id) != sorted(obj["id"] for obj in objects_to_track):
+            logger.error("keyframe objects must be the objects to track")
+            raise ValueError("Keyframe objects must be the objects to track")
+
+        return [keyframe_objects_by_id[obj["id"]] for obj in objects_to_track]
+
+    @staticmethod
+    def _seam_report(previous, current, frame, keyframe_seed, objects_to_track):
+        """Returns the report of the seam between two consecutive segments"""
+
+        previous_boxes, previous_statuses = previous[0][:, -1], previous[1][:, -1]
+        current_boxes = current[0][:, 0]
+        centers_distance = np.linalg.norm((previous_boxes[:, :2] + previous_boxes[:, 2:] / 2) -
+                                          (current_boxes[:, :2] + current_boxes[:, 2:] / 2), axis=1)
+        ids = [obj["id"] for obj in objects_to_track]
+
+        seam = {
+            "frame": frame,
+            "seed": "keyframe" if keyframe_seed else "tail",
+            "lost_objects": [id for id, status in zip(ids, previous_statuses) if not status],
+            "offsets": {id: float(distance) for id, distance in zip(ids, centers_distance)}
+        }
+        if seam["lost_objects"]:
+            logger.warning(f"Objects {seam['lost_objects']} lost at the seam in frame {frame}")
+
+        return seam
+
+
+def _track_segment(object_tracker, video_file, objects_to_track, start_frame, stop_frame, lost):
+    """Worker process function, returns the (boxes, statuses) arrays of the segment
+
+    The lost objects are not tracked, they keep their seed box with a lost status in every frame. If the
+    video ends before stop_frame the arrays end at the last tracked frame
+    """
+
+    boxes = np.repeat(np.array([obj["coordinates"] for obj in objects_to_track], dtype=np.int32)[:, None],
+                      stop_frame - start_frame, axis=1)
+    statuses = np.zeros((len(objects_to_track), stop_frame - start_frame), dtype=bool)
+    tracked = np.flatnonzero(~lost)
+    if len(tracked) > 0:
+        object_trackings = object_tracker.track_objects(video_file, [objects_to_track[k] for k in tracked],
+                                                        start_frame, stop_frame)
+        boxes, statuses = boxes[:, :object_trackings.frame_count], statuses[:, :object_trackings.frame_count]
+        boxes[tracked], statuses[tracked] = object_trackings.boxes, object_trackings.statuses
+    return (boxes, statuses)
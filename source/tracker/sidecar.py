@@ -0,0 +1,165 @@
+"""Implements the annotation sidecar files, the trackings drawn by the video player or client instead of the renderer
+
+    The sidecar files only need the trackings and the frame rate and size of the video, read from the capture
+    properties, so no frame is decoded nor encoded. The supported formats are:
+
+        ass: Advanced SubStation Alpha subtitles. Every box is a vector drawing and every label a text event,
+            in the video coordinates and with the colors of the renderer. Players as mpv, VLC or ffmpeg
+            (subtitles filter) draw them over the video
+        vtt: WebVTT metadata track, one cue per run of frames with the same boxes, its payload is the json of
+            the tracked boxes. Web players expose it as a TextTrack for the client to draw the boxes
+        jsonl: compact annotation stream, a json header line followed by one json line per frame
+
+    The json payload of the vtt cues and of the jsonl frame lines is:
+
+        {"frame": (int) frame index, "boxes": [[id, x, y, width, height], ...], "lost": [id, ...]}
+
+    with the tracked boxes and the ids of the lost objects. The first jsonl line is the header:
+
+        {"fps": (float), "width": (int), "height": (int), "frame_count": (int), "objects": [{"object", "id"}, ...]}
+
+    Typical usage:
+
+        renderer.render_sidecar(video_file, object_trackings, out_path=".", file_name="out", formats=("ass", "jsonl"))
+
+    or with the video properties:
+
+        sidecar.write_jsonl("out.jsonl", trackings, fps=25, width=1920, height=1080)
+"""
+
+import json
+import numpy as np
+
+
+# Sidecar formats and the extension of their files
+SIDECAR_FORMATS = {"ass": "ass", "vtt": "vtt", "jsonl": "jsonl"}
+
+def write_jsonl(file, trackings, fps, width, height):
+    """Writes the trackings as a json lines annotation stream, see the module documentation"""
+
+    header = {"fps": fps, "width": width, "height": height, "frame_count": trackings.frame_count,
+              "objects": trackings.objects}
+    with open(file, "w") as f:
+        f.write(json.dumps(header) + "\n")
+        for payload in _frame_payloads(trackings):
+            f.write(payload + "\n")
+
+
+def write_webvtt(file, trackings, fps):
+    """Writes the trackings as a WebVTT metadata track, consecutive frames with the same boxes share a cue"""
+
+    payloads = _frame_payloads(trackings)
+    with open(file, "w") as f:
+        f.write("WEBVTT\n\nNOTE tracker boxes, payload {\"frame\", \"boxes\": [[id, x, y, width, height]], \"lost\"}\n")
+        for start, stop in _runs(_frame_changes(trackings)):
+            f.write(f"\n{_vtt_time(start / fps)} --> {_vtt_time(stop / fps)}\n{payloads[start]}\n")
+
+
+def write_ass(file, trackings, fps, width, height, box_color=(0, 255, 0), line_width=2, text_color=(255, 255, 255),
+              font_scale=0.8, failure_text=None, failure_point=(60, 50)):
+    """Writes the trackings as ASS subtitles that draw the boxes and labels as the renderer
+
+    Every object has a box and a label event per run of frames with the same box. Colors are BGR tuples,
+    as in the renderer, and the failure text, if given, is shown at the failure point while an object is lost.
+    """
+
+    font_size = max(int(round(30 * font_scale)), 1)
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, "
+        "Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, "
+        "MarginL, MarginR, MarginV, Encoding",
+        f"Style: Box,Arial,{font_size},&HFF000000,&HFF000000,{_ass_color(box_color)},&HFF000000,0,0,0,0,100,100,0,0,1,"
+        f"{line_width / 2:g},0,7,0,0,0,1",
+        f"Style: Label,Arial,{font_size},{_ass_color(text_color)},&HFF000000,&H00000000,&HFF000000,0,0,0,0,100,100,0,0,1,"
+        f"0,0,1,0,0,0,1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text"
+    ]
+
+    boxes, statuses = trackings.boxes, trackings.statuses
+    for k, obj in enumerate(trackings.objects):
+        label = f"{obj['object']}_{obj['id']}"
+        changes = np.ones(trackings.frame_count, dtype=bool)
+        changes[1:] = (boxes[k, 1:] != boxes[k, :-1]).any(axis=1) | (statuses[k, 1:] != statuses[k, :-1])
+        for start, stop in _runs(changes):
+            if not statuses[k, start]:
+                continue
+            x, y, box_width, box_height = boxes[k, start].tolist()
+            times = f"{_ass_time(start / fps)},{_ass_time(stop / fps)}"
+
+            # Text is shown UNDER the bbox unless it goes out of the video frame, as in the renderer
+            label_y = y - 20 if y + box_height + 30 >= height else y + box_height + 30
+            lines.append(f"Dialogue: 0,{times},Box,,0,0,0,,{{\\pos(0,0)\\p1}}m {x} {y} l {x + box_width} {y} "
+                         f"l {x + box_width} {y + box_height} l {x} {y + box_height}{{\\p0}}")
+            lines.append(f"Dialogue: 1,{times},Label,,0,0,0,,{{\\pos({x},{label_y})}}{label}")
+
+    lost = ~statuses.all(axis=0)
+    changes = np.ones(trackings.frame_count, dtype=bool)
+    changes[1:] = lost[1:] != lost[:-1]
+    for start, stop in _runs(changes):
+        if failure_text and lost[start]:
+            lines.append(f"Dialogue: 1,{_ass_time(start / fps)},{_ass_time(stop / fps)},Label,,0,0,0,,"
+                         f"{{\\pos({failure_point[0]},{failure_point[1]})}}{failure_text}")
+
+    with open(file, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def _frame_payloads(trackings):
+    """Returns the json payload of every frame"""
+
+    ids = [obj["id"] for obj in trackings.objects]
+    boxes = trackings.boxes.transpose(1, 0, 2).tolist()
+    statuses = trackings.statuses.T.tolist()
+    payloads = []
+    for i, (frame_boxes, frame_statuses) in enumerate(zip(boxes, statuses)):
+        tracked = [[object_id] + box for object_id, box, status in zip(ids, frame_boxes, frame_statuses) if status]
+        lost = [object_id for object_id, status in zip(ids, frame_statuses) if not status]
+        payloads.append(json.dumps({"frame": i, "boxes": tracked, "lost": lost}, separators=(",", ":")))
+    return payloads
+
+
+def _frame_changes(trackings):
+    """Returns a bool array, True for the frames whose boxes or statuses differ from the previous frame"""
+
+    changes = np.ones(trackings.frame_count, dtype=bool)
+    boxes, statuses = trackings.boxes, trackings.statuses
+    changes[1:] = (boxes[:, 1:] != boxes[:, :-1]).any(axis=(0, 2)) | (statuses[:, 1:] != statuses[:, :-1]).any(axis=0)
+    return changes
+
+
+def _runs(changes):
+    """Returns the (start, stop) frame ranges between the True values of a changes array"""
+
+    starts = np.nonzero(changes)[0].tolist()
+    return list(zip(starts, starts[1:] + [len(changes)]))
+
+
+def _vtt_time(seconds):
+    """Formats a time in seconds as a WebVTT timestamp, HH:MM:SS.mmm"""
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    return f"{hours:02d}:{minutes:02d}:{milliseconds // 1000:02d}.{milliseconds % 1000:03d}"
+
+
+def _ass_time(seconds):
+    """Formats a time in seconds as an ASS timestamp, H:MM:SS.cc"""
+    centiseconds = int(round(seconds * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    return f"{hours:d}:{minutes:02d}:{centiseconds // 100:02d}.{centiseconds % 100:02d}"
+
+
+def _ass_color(color):
+    """Returns the ASS color of a BGR tuple, &HAABBGGRR"""
+    blue, green, red = color
+    return f"&H00{blue:02X}{green:02X}{red:02X}"
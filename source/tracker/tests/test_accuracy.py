@@ -0,0 +1,72 @@
+"""Tests the accuracy module"""
+
+import json
+import pytest
+import numpy as np
+from tracker import accuracy
+from tracker import utils
+from tracker.trackings import Trackings
+
+
+@pytest.fixture(scope="module")
+def synthetic_clips(synthetic_video, synthetic_boxes, tmp_path_factory):
+    """Writes a clips file for the synthetic video with its ground truth as reference trackings"""
+
+    video_file, objects_to_track = synthetic_video
+    clips_path = tmp_path_factory.mktemp("clips")
+    utils.write_trackings_file(str(clips_path / "reference.json"),
+                               Trackings(objects_to_track, synthetic_boxes(40), np.ones((2, 40))))
+    with open(clips_path / "initial_conditions.json", "w") as f:
+        json.dump([dict(obj, coordinates=list(obj["coordinates"])) for obj in objects_to_track], f)
+    with open(clips_path / "clips.json", "w") as f:
+        json.dump([{"video": video_file, "initial_conditions": "initial_conditions.json", "reference": "reference.json"}], f)
+
+    return str(clips_path / "clips.json")
+
+
+def test_pareto_front():
+    """Test that the dominated points are not in the Pareto front"""
+
+    speeds = [10, 20, 30, 5, 20]
+    accuracies = [0.9, 0.8, 0.5, 0.9, 0.7]
+    assert accuracy.pareto_front(speeds, accuracies).tolist() == [True, True, True, False, False]
+
+
+def test_run_accuracy(synthetic_clips):
+    """Test a small accuracy run, its summary and table"""
+
+    clips = accuracy.read_clips_file(synthetic_clips)
+    assert clips[0]["name"] == "synthetic"
+
+    configurations = accuracy.build_configurations(["KCF", "MOSSE"], [1.0], [1, 2])
+    assert [c["configuration"] for c in configurations] == ["KCF/scale=1/stride=1", "KCF/scale=1/stride=2",
+                                                             "MOSSE/scale=1/stride=1", "MOSSE/scale=1/stride=2"]
+
+    results = accuracy.run_accuracy(configurations, clips, max_frames=20)
+    for result in results:
+        assert result["error"] is None
+        assert result["frames"] == 20 and result["fps"] > 0
+        assert 0 <= result["mean_iou"] <= 1
+    assert results[0]["mean_iou"] > 0.7
+
+    summary = accuracy.summarize(configurations, results)
+    assert len(summary) == 4 and any(item["pareto"] for item in summary)
+    table = accuracy.format_table(summary)
+    assert len(table.splitlines()) == 5 and "KCF/scale=1/stride=2" in table
+
+
+def test_failed_case(synthetic_clips):
+    """Test that a failed case is reported and left out of the summary"""
+
+    clips = [dict(accuracy.read_clips_file(synthetic_clips)[0], video="missing.avi")]
+    configurations = accuracy.build_configurations(["KCF"], [1.0], [1])
+    results = accuracy.run_accuracy(configurations, clips)
+    assert results[0]["error"] is not None
+    assert accuracy.summarize(configurations, results) == []
+
+
+def test_clips_file_without_reference(tmp_path):
+    clips_file = tmp_path / "clips.json"
+    clips_file.write_text(json.dumps([{"video": "input.mkv", "initial_conditions": "initial_conditions.json"}]))
+    with pytest.raises(ValueError):
+        accuracy.read_clips_file(str(clips_file))
@@ -0,0 +1,84 @@
+"""Tests the adaptive module"""
+
+import pytest
+import numpy as np
+from tracker.adaptive import AdaptiveTracker
+from tracker.object_tracker import ObjectTracker
+from tracker.types import TrackerType
+
+
+class ScriptedTracker:
+    """Single tracker that returns a scripted list of update results"""
+
+    def __init__(self, name, results, created):
+        self.name = name
+        self._results = results
+        created.append(name)
+
+    def init(self, frame, bounding_box):
+        return True
+
+    def update(self, frame):
+        return self._results.pop(0)
+
+
+def test_adaptive_switches():
+    """Test escalation on a lost object and on fast motion, and demotion after calm frames"""
+
+    # The cheap tracker loses the object, the accurate one follows it without motion and then it moves fast
+    results = [(True, (10, 10, 20, 20)), (False, (0, 0, 0, 0))] + [(True, (12, 10, 20, 20))] * 3 + \
+              [(True, (12, 10, 20, 20)), (True, (32, 10, 20, 20))]
+    created = []
+    tracker = AdaptiveTracker(lambda: ScriptedTracker("cheap", results, created),
+                              lambda: ScriptedTracker("accurate", results, created),
+                              budget=1.0, calm_frames=3)
+
+    tracker.init(None, (10, 10, 20, 20))
+    assert tracker.update(None) == (True, (10, 10, 20, 20))
+    # Lost by the cheap tracker, the frame is lost and the accurate tracker starts at the last tracked box
+    assert tracker.update(None) == (False, (0, 0, 0, 0))
+    assert created == ["cheap", "accurate"]
+    for _ in range(3):
+        tracker.update(None)
+    tracker.update(None)
+    tracker.update(None)
+
+    assert created == ["cheap", "accurate", "cheap", "accurate"]
+    assert tracker.stats == {"cheap_updates": 3, "accurate_updates": 4, "escalations": 2, "demotions": 1}
+
+
+@pytest.mark.parametrize("budget, max_accurate_updates", [(0.0, 0), (0.1, 2 + 2 + 1)])
+def test_adaptive_budget(budget, max_accurate_updates):
+    """Test that a small budget only allows the budget fraction and the burst of accurate updates, and a zero
+    budget none"""
+
+    results = [(False, (0, 0, 0, 0))] * 20
+    created = []
+    tracker = AdaptiveTracker(lambda: ScriptedTracker("cheap", results, created),
+                              lambda: ScriptedTracker("accurate", results, created),
+                              budget=budget, calm_frames=2)
+    tracker.init(None, (10, 10, 20, 20))
+    statuses = [tracker.update(None)[0] for _ in range(20)]
+
+    assert tracker.stats["accurate_updates"] <= max_accurate_updates
+    assert (tracker.stats["escalations"] == 0) == (budget == 0)
+    assert not any(statuses)
+
+
+def test_adaptive_tracking(synthetic_video, synthetic_ground_truth):
+    """Test the adaptive tracker type against the synthetic ground truth, where MOSSE alone loses the objects"""
+
+    video_file, objects_to_track = synthetic_video
+    tracker = ObjectTracker(TrackerType.ADAPTIVE)
+    trackings = tracker.track_objects(video_file, objects_to_track)
+    assert trackings.statuses.mean() >= 0.9
+    assert np.abs(trackings.boxes - synthetic_ground_truth)[trackings.statuses].max() <= 6
+    for stats in tracker.adaptive_stats:
+        assert stats["cheap_updates"] + stats["accurate_updates"] == 40
+        assert stats["escalations"] >= 1
+
+
+@pytest.mark.parametrize("budget, motion_threshold, calm_frames", [(-0.1, 0.2, 10), (1.5, 0.2, 10), (0.5, 0, 10), (0.5, 0.2, 0)])
+def test_adaptive_invalid_parameters(budget, motion_threshold, calm_frames):
+    with pytest.raises(ValueError):
+        AdaptiveTracker(None, None, budget, motion_threshold, calm_frames)
@@ -0,0 +1,56 @@
+"""Tests the batch module"""
+
+import pytest
+from tracker import batch
+import json
+
+
+def test_read_json_manifest(tmp_path):
+    """Test the json manifest reader with valid and invalid jobs"""
+
+    manifest_file = tmp_path / "manifest.json"
+    manifest_file.write_text(json.dumps([{"video": "a.mkv", "initial_conditions": "a.json"},
+                                         {"video": "b.mkv", "initial_conditions": "b.json", "options": {"algorithm": "KCF"}}]))
+    jobs = batch.read_batch_manifest(str(manifest_file))
+    assert jobs[0]["options"] == {}
+    assert jobs[1]["options"] == {"algorithm": "KCF"}
+
+    manifest_file.write_text(json.dumps([{"video": "a.mkv", "initial_conditions": "a.json", "options": {"foo": 1}}]))
+    with pytest.raises(ValueError):
+        batch.read_batch_manifest(str(manifest_file))
+
+    manifest_file.write_text(json.dumps([{"video": "a.mkv"}]))
+    with pytest.raises(ValueError):
+        batch.read_batch_manifest(str(manifest_file))
+
+
+def test_read_csv_manifest(tmp_path):
+    """Test the csv manifest reader"""
+
+    manifest_file = tmp_path / "manifest.csv"
+    manifest_file.write_text("video,initial_conditions,algorithm,box_color,workers\n"
+                             "a.mkv,a.json,KCF,0 0 255,2\n"
+                             "b.mkv,b.json,,,\n")
+    jobs = batch.read_batch_manifest(str(manifest_file))
+    assert jobs == [{"video": "a.mkv", "initial_conditions": "a.json", "options": {"algorithm": "KCF", "box_color": [0, 0, 255], "workers": 2}},
+                    {"video": "b.mkv", "initial_conditions": "b.json", "options": {}}]
+
+
+def test_run_batch(synthetic_video, tmp_path):
+    """Test that a failed job does not stop the other jobs"""
+
+    video_file, objects_to_track = synthetic_video
+    (tmp_path / "conditions.json").write_text(json.dumps(objects_to_track))
+    jobs = [{"video": video_file, "initial_conditions": "conditions.json", 
+             "options": {"algorithm": "KCF", "save_trackings": "trackings.json"}},
+            {"video": "tests/data/foo.avi", "initial_conditions": "conditions.json", "options": {}},
+            {"video": video_file, "initial_conditions": "conditions.json", "options": {"algorithm": "KCF", "out_file_name": "second"}}]
+
+    summary = batch.run_batch(jobs, processes=2, base_path=str(tmp_path))
+
+    assert [result["status"] for result in summary] == ["ok", "failed", "ok"]
+    assert summary[0]["frame_count"] == 40
+    assert summary[1]["error"] is not None
+    assert (tmp_path / "trackings.json").exists()
+    assert len(list(tmp_path.glob("synthetic_out.*"))) == 1
+    assert len(list(tmp_path.glob("second.*"))) == 1
@@ -0,0 +1,62 @@
+"""Tests the benchmark module"""
+
+from tracker import benchmark
+import cv2 as cv
+
+
+def test_make_synthetic_video(tmp_path):
+    """Test the synthetic video generator"""
+
+    video_file = str(tmp_path / "synthetic.avi")
+    objects_to_track = benchmark.make_synthetic_video(video_file, 160, 120, 5, 3)
+
+    assert [obj["id"] for obj in objects_to_track] == [0, 1, 2]
+    video_capture = cv.VideoCapture(video_file)
+    assert int(video_capture.get(cv.CAP_PROP_FRAME_COUNT)) == 5
+    assert int(video_capture.get(cv.CAP_PROP_FRAME_WIDTH)) == 160
+
+
+def test_run_benchmark(tmp_path):
+    """Test a small benchmark run and the comparison of its results"""
+
+    cases = benchmark.build_cases(None, [], ["KCF"], [2], ["160x120"], 5, str(tmp_path))
+    assert [case["case"] for case in cases] == ["decode/synthetic/160x120/2", "render/synthetic/160x120/2", "track/KCF/synthetic/160x120/2"]
+
+    results = benchmark.run_benchmark(cases)
+    for result in results:
+        assert result["error"] is None
+        assert result["frames"] == 5
+        assert result["fps"] > 0
+        assert result["peak_rss_mb"] > 0
+    assert set(results[1]["ms_per_frame"]) == {"decode", "draw", "write"}
+    assert set(results[2]["ms_per_frame"]) == {"decode", "track"}
+
+    comparison = benchmark.compare_results(results, results)
+    assert [speed_up for _, _, _, speed_up in comparison] == [1.0, 1.0, 1.0]
+
+
+def test_run_case_without_resource(tmp_path, monkeypatch):
+    """Test that the peak memory is None where the resource module is not available"""
+
+    cases = benchmark.build_cases(None, [], [], [1], ["160x120"], 5, str(tmp_path))
+    monkeypatch.setattr(benchmark, "resource", None)
+    result = benchmark.run_case(cases[0])
+    assert result["error"] is None and result["frames"] == 5
+    assert result["peak_rss_mb"] is None
+
+
+def test_encode_cases(synthetic_video, tmp_path):
+    """Test that the encode cases run on the input video and measure the output size"""
+
+    video_file, objects_to_track = synthetic_video
+    cases = benchmark.build_cases(video_file, objects_to_track, [], [], [], 5, str(tmp_path),
+                                  ["opencv/MJPG/avi", "opencv/H264/mp4"])
+    assert [case["case"] for case in cases][2:] == [f"encode/opencv/MJPG/avi/{cases[0]['case'][7:]}",
+                                                    f"encode/opencv/H264/mp4/{cases[0]['case'][7:]}"]
+
+    results = benchmark.run_benchmark(cases[2:])
+    assert results[0]["error"] is None and results[0]["frames"] == 5 and results[0]["output_mb"] > 0
+    assert set(results[0]["ms_per_frame"]) == {"decode", "draw", "write"}
+
+    # OpenCV builds without the H264 encoder fail the case without size, the benchmark goes on
+    assert (results[1]["error"] is None) == (results[1]["output_mb"] is not None)
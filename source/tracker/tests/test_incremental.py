@@ -0,0 +1,91 @@
+"""Tests the incremental module"""
+
+import shutil
+import pytest
+import numpy as np
+import cv2 as cv
+from tracker.incremental import IncrementalRenderer
+from tracker.renderer import BoundingBoxRenderer
+from tracker.trackings import Trackings
+
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not available")
+
+
+def read_frames(video_file):
+    """Returns the list of frames of a video"""
+
+    video_capture = cv.VideoCapture(video_file)
+    frames = []
+    read_ok, frame = video_capture.read()
+    while read_ok:
+        frames.append(frame)
+        read_ok, frame = video_capture.read()
+    video_capture.release()
+    return frames
+
+
+@requires_ffmpeg
+def test_incremental_render(synthetic_trackings, tmp_path):
+    """Test that only the segments with changed trackings are rendered again and the video matches a full render"""
+
+    video_file, trackings = synthetic_trackings
+    renderer = IncrementalRenderer(segment_frames=10)
+    renderer.video_codec = renderer.video_codec.MJPG
+    extension = renderer.video_format.value
+
+    renderer.render(video_file, trackings, out_path=str(tmp_path), file_name="out")
+    assert renderer.render_stats == {"mode": "incremental", "segments": 4, "rendered_segments": [0, 1, 2, 3],
+                                     "rendered_frames": 40}
+
+    # Nothing changed
+    renderer.render(video_file, trackings, out_path=str(tmp_path), file_name="out")
+    assert renderer.render_stats["mode"] == "unchanged"
+
+    # Fix the boxes of one object in frames 12 to 14
+    boxes, statuses = trackings.boxes.copy(), trackings.statuses.copy()
+    boxes[1, 12:15] += 5
+    fixed_trackings = Trackings(trackings.objects, boxes, statuses)
+    renderer.render(video_file, fixed_trackings.to_list(), out_path=str(tmp_path), file_name="out")
+    assert renderer.render_stats["rendered_segments"] == [1] and renderer.render_stats["rendered_frames"] == 10
+
+    # Same frames as rendering the whole video
+    full_renderer = BoundingBoxRenderer()
+    full_renderer.video_codec = full_renderer.video_codec.MJPG
+    full_renderer.render(video_file, fixed_trackings, out_path=str(tmp_path), file_name="full")
+    frames = read_frames(str(tmp_path / ("out." + extension)))
+    full_frames = read_frames(str(tmp_path / ("full." + extension)))
+    assert len(frames) == len(full_frames) == 40
+    for frame, full_frame in zip(frames, full_frames):
+        assert np.array_equal(frame, full_frame)
+
+    # A format change renders every segment
+    renderer.set_box_format((255, 0, 0), 2)
+    renderer.render(video_file, fixed_trackings, out_path=str(tmp_path), file_name="out")
+    assert renderer.render_stats["rendered_segments"] == [0, 1, 2, 3]
+
+
+def test_render_without_ffmpeg(synthetic_trackings, tmp_path):
+    """Test that without ffmpeg the video is rendered in full, and skipped when nothing changed"""
+
+    video_file, trackings = synthetic_trackings
+    renderer = IncrementalRenderer(segment_frames=10, ffmpeg="missing-ffmpeg")
+
+    renderer.render(video_file, trackings, out_path=str(tmp_path), file_name="out")
+    assert renderer.render_stats["mode"] == "full" and renderer.render_stats["rendered_frames"] == 40
+    assert len(read_frames(str(tmp_path / ("out." + renderer.video_format.value)))) == 40
+
+    renderer.render(video_file, trackings, out_path=str(tmp_path), file_name="out")
+    assert renderer.render_stats["mode"] == "unchanged"
+
+
+def test_incremental_render_invalid_parameters(synthetic_trackings, tmp_path):
+
+    with pytest.raises(ValueError):
+        IncrementalRenderer(segment_frames=0)
+
+    # Trackings shorter than the video
+    video_file, trackings = synthetic_trackings
+    short_trackings = Trackings(trackings.objects, trackings.boxes[:, :20], trackings.statuses[:, :20])
+    with pytest.raises(ValueError):
+        IncrementalRenderer().render(video_file, short_trackings, out_path=str(tmp_path))
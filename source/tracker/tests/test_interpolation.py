@@ -0,0 +1,70 @@
+"""Tests the interpolation module"""
+
+import pytest
+import numpy as np
+from tracker.interpolation import StrideInterpolator
+from tracker.object_tracker import ObjectTracker
+from tracker.types import TrackerType
+
+
+def run_interpolator(interpolator, keyframes, frame_count):
+    """Feeds the keyframe results of a dictionary {frame_index: (statuses, boxes)} and returns the emitted results"""
+
+    results = []
+    for i in range(frame_count):
+        if interpolator.is_keyframe(i):
+            results += interpolator.keyframe(i, *keyframes[i])
+        else:
+            results += interpolator.skipped(i)
+    return results + interpolator.flush()
+
+
+def test_linear_interpolation():
+    """Test linear interpolation between keyframes and extrapolation after the last one"""
+
+    keyframes = {0: ([True], [[0, 0, 10, 10]]), 3: ([True], [[30, 3, 10, 10]]), 6: ([False], [[60, 6, 10, 10]])}
+    results = run_interpolator(StrideInterpolator(3, "linear"), keyframes, 8)
+
+    assert [i for i, _, _, _ in results] == list(range(8))
+    assert [boxes[0, :2].tolist() for _, _, boxes, _ in results] == [[0, 0], [10, 1], [20, 2], [30, 3], [40, 4], [50, 5],
+                                                                      [60, 6], [70, 7]]
+    assert [bool(statuses[0]) for _, statuses, _, _ in results] == [True, True, True, True, False, False, False, False]
+
+
+def test_velocity_interpolation():
+    """Test that constant velocity results are emitted without delay"""
+
+    interpolator = StrideInterpolator(2, "velocity")
+    assert len(interpolator.keyframe(0, [True], [[0, 0, 10, 10]])) == 1
+    # No velocity before the second keyframe, the box stays in place
+    assert interpolator.skipped(1)[0][2].tolist() == [[0, 0, 10, 10]]
+    interpolator.keyframe(2, [True], [[4, 2, 10, 10]])
+    assert interpolator.skipped(3)[0][2].tolist() == [[6, 3, 10, 10]]
+
+
+def test_adaptive_stride():
+    """Test that the stride is shortened when the objects move fast and restored when they stop"""
+
+    interpolator = StrideInterpolator(8, "linear", adaptive=True, max_motion=0.5)
+    interpolator.keyframe(0, [True], [[0, 0, 10, 10]])
+    interpolator.keyframe(8, [True], [[16, 0, 10, 10]])
+    assert interpolator.current_stride == 2
+    interpolator.keyframe(10, [True], [[16, 0, 10, 10]])
+    assert interpolator.current_stride == 8
+
+
+@pytest.mark.parametrize("stride", [2, 3])
+def test_stride_tracking(synthetic_video, synthetic_ground_truth, stride):
+    """Test that tracking with a stride gives one result per frame, close to the synthetic ground truth"""
+
+    video_file, objects_to_track = synthetic_video
+    trackings = ObjectTracker(TrackerType.KCF, stride=stride).track_objects(video_file, objects_to_track)
+    assert trackings.frame_count == 40
+    assert trackings.statuses.all()
+    assert np.abs(trackings.boxes - synthetic_ground_truth).max() <= 6
+
+
+@pytest.mark.parametrize("stride, method, max_motion", [(0, "linear", 0.5), (2, "spline", 0.5), (2, "linear", 0)])
+def test_interpolator_invalid_parameters(stride, method, max_motion):
+    with pytest.raises(ValueError):
+        StrideInterpolator(stride, method, max_motion=max_motion)
@@ -0,0 +1,83 @@
+"""Tests the kalman module"""
+
+import pytest
+import numpy as np
+from tracker.kalman import BatchKalmanFilter
+from tracker.object_tracker import ObjectTracker
+from tracker.types import TrackerType
+
+
+def test_kalman_smoothing(synthetic_boxes):
+    """Test that the filtered boxes have less jitter than noisy measurements of a constant velocity motion"""
+
+    # (n_frames, n_objects, 4) boxes of the constant velocity motion of the synthetic video objects
+    ground_truth = synthetic_boxes(100).transpose(1, 0, 2).astype(float)
+    random_state = np.random.RandomState(0)
+    measurements = ground_truth + random_state.normal(0, 2, ground_truth.shape)
+
+    kalman = BatchKalmanFilter()
+    kalman.start(ground_truth[0])
+    filtered = np.array([kalman.update([True, True], boxes)[1] for boxes in measurements])
+
+    # Skip the first frames, while the velocity converges
+    measurement_error = np.abs(measurements[20:] - ground_truth[20:]).mean()
+    filtered_error = np.abs(filtered[20:] - ground_truth[20:]).mean()
+    assert filtered_error < measurement_error
+
+
+def test_kalman_prediction(synthetic_boxes):
+    """Test that lost objects are predicted with a True status for max_prediction frames"""
+
+    ground_truth = synthetic_boxes(30).transpose(1, 0, 2).astype(float)
+    kalman = BatchKalmanFilter(max_prediction=3)
+    kalman.start(ground_truth[0])
+    for boxes in ground_truth[1:20]:
+        kalman.update([True, True], boxes)
+
+    statuses = []
+    for i in range(20, 25):
+        status, boxes = kalman.update([False, True], np.zeros((2, 4)))
+        statuses.append(bool(status[0]))
+        if status[0]:
+            assert np.abs(boxes[0] - ground_truth[i][0]).max() <= 2
+    assert statuses == [True, True, True, False, False]
+
+    # The object is tracked again
+    status, _ = kalman.update([True, True], ground_truth[25])
+    assert status.all()
+
+
+def test_kalman_search_windows(synthetic_boxes):
+    """Test that the search windows contain the box of the next frame, and grow while the object is lost"""
+
+    ground_truth = synthetic_boxes(20).transpose(1, 0, 2).astype(float)
+    kalman = BatchKalmanFilter()
+    kalman.start(ground_truth[0])
+    for boxes in ground_truth[1:10]:
+        kalman.update([True, True], boxes)
+
+    windows = kalman.search_windows()
+    next_boxes = ground_truth[10]
+    assert (windows[:, :2] <= next_boxes[:, :2]).all()
+    assert (windows[:, :2] + windows[:, 2:] >= next_boxes[:, :2] + next_boxes[:, 2:]).all()
+
+    kalman.update([False, False], np.zeros((2, 4)))
+    assert (kalman.search_windows()[:, 2:] > windows[:, 2:]).all()
+
+
+def test_kalman_tracking(synthetic_video, synthetic_ground_truth):
+    """Test tracking with a Kalman filter, also over a stride"""
+
+    video_file, objects_to_track = synthetic_video
+    for stride in (1, 3):
+        tracker = ObjectTracker(TrackerType.KCF, stride=stride, kalman=BatchKalmanFilter())
+        trackings = tracker.track_objects(video_file, objects_to_track)
+        assert trackings.frame_count == 40
+        assert trackings.statuses.all()
+        assert np.abs(trackings.boxes - synthetic_ground_truth).max() <= 6
+
+
+@pytest.mark.parametrize("max_prediction, position_weight, velocity_weight", [(-1, 0.05, 0.01), (5, 0, 0.01), (5, 0.05, -1)])
+def test_kalman_invalid_parameters(max_prediction, position_weight, velocity_weight):
+    with pytest.raises(ValueError):
+        BatchKalmanFilter(max_prediction, position_weight, velocity_weight)
@@ -0,0 +1,96 @@
+"""Tests the metrics module"""
+
+import time
+import pytest
+import numpy as np
+from tracker import metrics
+from tracker import utils
+from tracker.trackings import Trackings
+
+
+@pytest.fixture(scope="module")
+def reference_trackings():
+    """Reads the reference trackings of the input video"""
+    return utils.read_trackings_file("tests/data/input_trackings.json")
+
+
+def test_box_iou():
+    """Test the iou of identical, overlapping, disjoint and empty boxes"""
+
+    boxes = np.array([[0, 0, 10, 10], [0, 0, 10, 10], [0, 0, 10, 10], [0, 0, 0, 0]])
+    reference_boxes = np.array([[0, 0, 10, 10], [5, 0, 10, 10], [20, 20, 10, 10], [0, 0, 0, 0]])
+    assert np.allclose(metrics.box_iou(boxes, reference_boxes), [1, 50 / 150, 0, 0])
+    assert metrics.pairwise_iou(boxes[:2, None], reference_boxes[:3, None]).shape == (1, 2, 3)
+    assert np.allclose(metrics.center_error(boxes[:2], reference_boxes[:2]), [0, 5])
+
+
+def test_curves():
+    """Test the success and precision curves"""
+
+    assert np.allclose(metrics.success_curve([0.2, 0.6, 1.0], [0, 0.5, 1]), [1, 2 / 3, 0])
+    assert np.allclose(metrics.precision_curve([0, 10, np.inf], [0, 20]), [1 / 3, 2 / 3])
+    assert np.allclose(metrics.success_curve([]), 0)
+
+
+def test_evaluate_reference(reference_trackings):
+    """Test that the reference trackings evaluated against themselves are perfect"""
+
+    report = metrics.evaluate(reference_trackings, reference_trackings)
+    assert report["frames"] == 250
+    assert report["mean_iou"] == pytest.approx(1) and report["precision_20"] == pytest.approx(1)
+    assert report["success_auc"] == pytest.approx(20 / 21)
+    assert report["mot"]["mota"] == pytest.approx(1) and report["mot"]["idf1"] == pytest.approx(1)
+    assert all(summary["lost_frames"] == 0 for summary in report["objects"].values())
+
+
+def test_evaluate_errors(reference_trackings):
+    """Test the metrics of trackings with a lost object, a shifted object and swapped identities"""
+
+    # Reference with all the objects visible
+    statuses = np.ones(reference_trackings.statuses.shape, dtype=bool)
+    reference = Trackings(reference_trackings.objects, reference_trackings.boxes, statuses)
+    boxes = reference_trackings.boxes.copy()
+    statuses = statuses.copy()
+
+    # Object 0 lost in the last 50 frames, object 1 shifted half its width, objects swapped after frame 100
+    statuses[0, 200:] = False
+    boxes[1, :, 0] += boxes[1, :, 2] // 2
+    boxes[1:, 100:] = boxes[[2, 1], 100:]
+    statuses[1:, 100:] = statuses[[2, 1], 100:]
+    trackings = Trackings(reference_trackings.objects, boxes, statuses)
+
+    report = metrics.evaluate(trackings, reference.to_list())
+    assert report["objects"]["player_0"]["lost_frames"] == 50
+    assert report["objects"]["player_0"]["mean_iou"] == pytest.approx(0.8)
+    assert report["objects"]["player_1"]["mean_iou"] < 0.5
+
+    mot = report["mot"]
+    assert mot["false_negatives"] == 50 + 250 and mot["false_positives"] == 250
+    assert mot["id_switches"] == 1
+    assert mot["mota"] == pytest.approx(1 - (300 + 250 + 1) / 750)
+    assert mot["idf1"] < 1
+
+
+def test_evaluate_speed(reference_trackings):
+    """Test that the reference video is evaluated in milliseconds"""
+
+    random_state = np.random.RandomState(0)
+    boxes = reference_trackings.boxes + random_state.randint(-5, 6, reference_trackings.boxes.shape)
+    trackings = Trackings(reference_trackings.objects, boxes, reference_trackings.statuses)
+
+    start = time.perf_counter()
+    report = metrics.evaluate(trackings, reference_trackings)
+    assert time.perf_counter() - start < 0.1
+    assert report["mean_iou"] > 0.8 and report["mot"]["id_switches"] == 0
+
+
+def test_evaluate_invalid_threshold(reference_trackings):
+    with pytest.raises(ValueError):
+        metrics.evaluate(reference_trackings, reference_trackings, iou_threshold=0)
+
+
+def test_evaluate_no_objects():
+    """Test that empty trackings evaluate to zero metrics"""
+
+    report = metrics.evaluate([], [])
+    assert report["frames"] == 0 and report["objects"] == {} and report["mot"]["reference_boxes"] == 0
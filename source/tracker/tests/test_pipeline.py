@@ -0,0 +1,113 @@
+"""Tests the pipeline module"""
+
+import os
+import shutil
+import threading
+import pytest
+from tracker.pipeline import TrackingPipeline
+from tracker.object_tracker import ObjectTracker
+from tracker.renderer import BoundingBoxRenderer
+from tracker.types import TrackerType
+import numpy as np
+import cv2 as cv
+
+
+def test_pipeline_invalid_out_path(synthetic_video):
+    """Test that a non existing output path raises"""
+
+    video_file, objects_to_track = synthetic_video
+    pipeline = TrackingPipeline(ObjectTracker(TrackerType.KCF), BoundingBoxRenderer())
+    with pytest.raises(ValueError):
+        pipeline.run(video_file, objects_to_track, out_path="non/existing/path")
+
+
+def test_pipeline_writer_error_releases_capture(synthetic_video, tmp_path, monkeypatch):
+    """Test that the tracking generator and its video capture are closed when the video writer can not be created"""
+
+    video_file, objects_to_track = synthetic_video
+    tracker = ObjectTracker(TrackerType.KCF, prefetch=4)
+    renderer = BoundingBoxRenderer()
+
+    generators = []
+    iter_tracks = tracker.iter_tracks
+    def record_iter_tracks(*args, **kwargs):
+        generators.append(iter_tracks(*args, **kwargs))
+        return generators[-1]
+    def fail_create_video_writer(*args, **kwargs):
+        raise ValueError("Codec not available")
+    monkeypatch.setattr(tracker, "iter_tracks", record_iter_tracks)
+    monkeypatch.setattr(renderer, "create_video_writer", fail_create_video_writer)
+
+    with pytest.raises(ValueError):
+        TrackingPipeline(tracker, renderer).run(video_file, objects_to_track, out_path=str(tmp_path))
+    assert len(generators) == 1 and generators[0].gi_frame is None
+
+
+def test_pipeline_matches_two_pass(synthetic_video, tmp_path):
+    """Test that the single pass pipeline gives the same trackings and video as tracking and rendering separately"""
+
+    video_file, objects_to_track = synthetic_video
+    tracker = ObjectTracker(TrackerType.KCF)
+    renderer = BoundingBoxRenderer()
+
+    # Single pass
+    pipeline = TrackingPipeline(tracker, renderer)
+    single_pass_trackings = pipeline.run(video_file, objects_to_track, out_path=str(tmp_path), file_name="single")
+
+    # Two pass
+    two_pass_trackings = tracker.track_objects(video_file, objects_to_track)
+    renderer.render(video_file, two_pass_trackings, out_path=str(tmp_path), file_name="two")
+
+    assert single_pass_trackings == two_pass_trackings
+
+    # Compare the rendered videos frame by frame
+    extension = renderer.video_format.value
+    single_pass = cv.VideoCapture(str(tmp_path / ("single." + extension)))
+    two_pass = cv.VideoCapture(str(tmp_path / ("two." + extension)))
+    frame_count = 0
+    is_ok_1, frame_1 = single_pass.read()
+    is_ok_2, frame_2 = two_pass.read()
+    while is_ok_1 and is_ok_2:
+        assert np.array_equal(frame_1, frame_2)
+        frame_count = frame_count + 1
+        is_ok_1, frame_1 = single_pass.read()
+        is_ok_2, frame_2 = two_pass.read()
+
+    assert frame_count == len(two_pass_trackings[0]["track"])
+
+
+class InterruptingRenderer(BoundingBoxRenderer):
+    """Renderer interrupted (Ctrl-C) while drawing the frame 5"""
+
+    def draw_objects(self, frame, objects, statuses, boxes, frame_height):
+        self.drawn = getattr(self, "drawn", 0) + 1
+        if self.drawn == 5:
+            raise KeyboardInterrupt
+        super().draw_objects(frame, objects, statuses, boxes, frame_height)
+
+
+def test_pipeline_interrupt(synthetic_video, tmp_path):
+    """Test that an interrupt stops the pipeline of a live source but is raised with a file"""
+
+    video_file, objects_to_track = synthetic_video
+    with pytest.raises(KeyboardInterrupt):
+        TrackingPipeline(ObjectTracker(TrackerType.KCF), InterruptingRenderer()).run(video_file, objects_to_track,
+                                                                                    out_path=str(tmp_path))
+
+    # A named pipe is a live source, the trackings of the frames up to the interrupt are returned
+    pipe = str(tmp_path / "pipe.avi")
+    os.mkfifo(pipe)
+
+    def feed_pipe():
+        try:
+            with open(video_file, "rb") as video, open(pipe, "wb") as f:
+                shutil.copyfileobj(video, f)
+        except BrokenPipeError:
+            pass
+
+    feeder = threading.Thread(target=feed_pipe)
+    feeder.start()
+    object_trackings = TrackingPipeline(ObjectTracker(TrackerType.KCF), InterruptingRenderer()).run(
+        pipe, objects_to_track, out_path=str(tmp_path), file_name="live")
+    feeder.join()
+    assert object_trackings.frame_count == 5
@@ -0,0 +1,87 @@
+"""Tests the preview module"""
+
+import pytest
+import numpy as np
+import cv2 as cv
+from tracker.preview import PreviewRenderer
+from tracker.trackings import Trackings
+from tracker import utils
+
+
+@pytest.mark.parametrize("scale, frame_step", [(0.5, 1), (0.25, 3)])
+def test_render_preview(synthetic_trackings, tmp_path, scale, frame_step):
+    """Test that the preview has the scaled size, one of every frame_step frames, and the scaled boxes drawn"""
+
+    video_file, trackings = synthetic_trackings
+    renderer = PreviewRenderer(scale=scale, frame_step=frame_step)
+    renderer.video_codec = renderer.video_codec.MJPG
+    renderer.set_box_format((0, 0, 255), 1)
+    renderer.render(video_file, trackings, out_path=str(tmp_path), file_name="preview")
+
+    preview = cv.VideoCapture(str(tmp_path / ("preview." + renderer.video_format.value)))
+    assert utils.get_video_frame_width(preview) == int(320 * scale)
+    assert utils.get_video_frame_height(preview) == int(240 * scale)
+    assert utils.get_video_frame_count(preview) == len(range(0, 40, frame_step))
+
+    # The top left corner of the box of object 0 is red in the first frame
+    _, frame = preview.read()
+    x, y = int(round(20 * scale)), int(round(40 * scale))
+    assert frame[y, x, 2] > 150 and frame[y, x, 1] < 100
+
+
+def test_render_preview_scaled_labels(synthetic_trackings, tmp_path, monkeypatch):
+    """Test that the font, text thickness and label offsets are scaled in the preview and restored after it"""
+
+    video_file, trackings = synthetic_trackings
+    trackings.statuses[1, 30:] = False
+    renderer = PreviewRenderer(scale=0.25, frame_step=10)
+    renderer.video_codec = renderer.video_codec.MJPG
+    labels = []
+    draw_label = renderer._draw_label
+    def record_label(frame, key, point):
+        labels.append((key, point, renderer._font_scale, renderer._text_thickness))
+        draw_label(frame, key, point)
+    monkeypatch.setattr(renderer, "_draw_label", record_label)
+    renderer.render(video_file, trackings, out_path=str(tmp_path), file_name="preview")
+
+    # Label of object 0 under its scaled box (5, 10, 8, 8) in the first frame
+    assert labels[0] == (("player", 0), (5, 10 + 8 + 8), 0.75 * 0.25, 1)
+    # Tracking failure text of object 1, lost after frame 29, in the last preview frame
+    assert labels[-1] == (None, (15, 12), 0.75 * 0.25, 1)
+    assert (renderer._font_scale, renderer._text_thickness, renderer._label_scale) == (0.75, 2, 1.0)
+
+
+def test_render_contact_sheet(synthetic_trackings, tmp_path):
+    """Test that the contact sheet has a row per object and only the tracked keyframes"""
+
+    video_file, trackings = synthetic_trackings
+    trackings.statuses[1, 30:] = False
+    assert PreviewRenderer._keyframes(trackings.statuses[0], 4) == [0, 13, 26, 39]
+    assert PreviewRenderer._keyframes(trackings.statuses[1], 4) == [0, 10, 19, 29]
+    assert PreviewRenderer._keyframes(np.zeros(40, dtype=bool), 4) == []
+
+    renderer = PreviewRenderer()
+    sheet_file = renderer.render_contact_sheet(video_file, trackings, out_path=str(tmp_path), file_name="sheet",
+                                               thumbnails=4, thumbnail_size=(64, 48))
+    sheet = cv.imread(sheet_file)
+    assert sheet.shape[:2] == (2 * (48 + 18), 4 * 64)
+    assert sheet[:48].mean() > 10 and sheet[66:114].mean() > 10
+
+
+def test_preview_invalid_parameters(synthetic_trackings, tmp_path):
+
+    with pytest.raises(ValueError):
+        PreviewRenderer(scale=0)
+    with pytest.raises(ValueError):
+        PreviewRenderer(scale=1.5)
+    with pytest.raises(ValueError):
+        PreviewRenderer(frame_step=0)
+
+    video_file, trackings = synthetic_trackings
+    with pytest.raises(ValueError):
+        PreviewRenderer().render_contact_sheet(video_file, trackings, out_path=str(tmp_path), thumbnails=0)
+
+    # Trackings shorter than the video
+    short_trackings = Trackings(trackings.objects, trackings.boxes[:, :20], trackings.statuses[:, :20])
+    with pytest.raises(ValueError):
+        PreviewRenderer().render(video_file, short_trackings, out_path=str(tmp_path))
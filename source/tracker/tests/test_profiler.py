@@ -0,0 +1,56 @@
+"""Tests the profiler module"""
+
+import pytest
+from tracker.profiler import StageProfiler
+from tracker.object_tracker import ObjectTracker
+from tracker.renderer import BoundingBoxRenderer
+from tracker.types import TrackerType
+import json
+import time
+import numpy as np
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_profile_tracking_and_rendering(synthetic_video, tmp_path, workers):
+    """Test the profile of a tracking and rendering run"""
+
+    video_file, objects_to_track = synthetic_video
+    profiler = StageProfiler()
+    trackings = ObjectTracker(TrackerType.KCF, workers).track_objects(video_file, objects_to_track, profiler=profiler)
+    BoundingBoxRenderer().render(video_file, trackings, out_path=str(tmp_path), profiler=profiler)
+
+    # Profiling does not change the trackings
+    assert trackings == ObjectTracker(TrackerType.KCF, workers).track_objects(video_file, objects_to_track)
+
+    report = profiler.report()
+    assert report["loops"]["tracking"]["frames"] == 40
+    assert report["loops"]["rendering"]["frames"] == 40
+    assert report["loops"]["tracking"]["fps"] > 0
+    assert set(report["stages"]) == {"decode", "track", "draw", "write"}
+    assert report["stages"]["track"]["count"] == 40
+    assert report["stages"]["track"]["p50_ms"] <= report["stages"]["track"]["p99_ms"] <= report["stages"]["track"]["max_ms"]
+    assert set(report["objects"]) == {"player_0", "player_1"}
+    assert report["objects"]["player_0"]["count"] == 40
+
+    profiler.write(str(tmp_path / "profile.json"))
+    with open(tmp_path / "profile.json") as f:
+        assert json.load(f)["loops"]["rendering"]["frames"] == 40
+
+
+def test_profile_percentiles_bounded_memory():
+    """Test that the percentiles estimated from the histogram are close to the exact ones, with bounded memory"""
+
+    random_state = np.random.RandomState(0)
+    times = random_state.lognormal(np.log(0.005), 0.8, 100000)
+    profiler = StageProfiler()
+    profiler.set_objects([{"object": "player", "id": 0}])
+    for seconds in times:
+        profiler.stop("track", time.perf_counter() - seconds)
+        profiler.add_object_update(0, seconds)
+
+    for statistics in (profiler.report()["stages"]["track"], profiler.report()["objects"]["player_0"]):
+        assert statistics["count"] == 100000
+        for q in (50, 90, 99):
+            assert statistics[f"p{q}_ms"] == pytest.approx(1000 * np.percentile(times, q), rel=0.07)
+    assert profiler.report()["objects"]["player_0"]["max_ms"] == pytest.approx(1000 * times.max())
+    assert len(profiler._stages["track"].bins) == len(profiler._objects[0].bins) < 200
@@ -0,0 +1,97 @@
+"""Tests the recovery module"""
+
+import pytest
+import numpy as np
+import cv2 as cv
+from tracker.object_tracker import ObjectTracker
+from tracker.recovery import TemplateReacquirer
+from tracker.kalman import BatchKalmanFilter
+from tracker.types import TrackerType
+
+
+@pytest.fixture(scope="module")
+def occluded_video(tmp_path_factory, synthetic_boxes):
+    """Creates a video with the first square of the synthetic video, hidden from frame 12 to frame 19
+
+    Returns:
+        (video_file, objects_to_track)
+    """
+
+    video_file = str(tmp_path_factory.mktemp("occluded") / "occluded.avi")
+    random_state = np.random.RandomState(0)
+    background = random_state.randint(0, 60, (240, 320, 3), dtype=np.uint8)
+    patch = random_state.randint(100, 255, (30, 30, 3), dtype=np.uint8)
+
+    video_writer = cv.VideoWriter(video_file, cv.VideoWriter_fourcc(*"MJPG"), 25, (320, 240))
+    for i, (x, y, width, height) in enumerate(synthetic_boxes(40)[0]):
+        frame = background.copy()
+        if not 12 <= i < 20:
+            frame[y:y + height, x:x + width] = patch
+        video_writer.write(frame)
+    video_writer.release()
+
+    return (video_file, [{"object": "player", "id": 0, "coordinates": (20, 40, 30, 30)}])
+
+
+def test_template_reacquisition(occluded_video, synthetic_ground_truth):
+    """Test that an occluded object is found again by template matching and tracked until the end"""
+
+    video_file, objects_to_track = occluded_video
+    reacquirer = TemplateReacquirer(interval=2)
+    trackings = ObjectTracker(TrackerType.KCF, reacquire=reacquirer).track_objects(video_file, objects_to_track)
+
+    report = reacquirer.report()
+    assert len(report["events"]) == 1
+    event = report["events"][0]
+    assert event["id"] == 0 and event["method"] == "template" and 20 <= event["frame"] < 25
+    assert report["attempts"] >= 1 and report["seconds"] > 0
+
+    # Tracked after the re-acquisition, close to the ground truth
+    assert trackings.statuses[0, event["frame"]:].all()
+    assert np.abs(trackings.boxes[0, -1] - synthetic_ground_truth[0, -1]).max() <= 6
+
+
+def test_kalman_search_windows(occluded_video, synthetic_ground_truth):
+    """Test that the lost object is searched in the Kalman filter windows and predicted while it is hidden"""
+
+    video_file, objects_to_track = occluded_video
+    reacquirer = TemplateReacquirer(interval=2)
+    tracker = ObjectTracker(TrackerType.KCF, reacquire=reacquirer, kalman=BatchKalmanFilter(max_prediction=3))
+    trackings = tracker.track_objects(video_file, objects_to_track)
+
+    events = reacquirer.report()["events"]
+    assert len(events) == 1 and events[0]["method"] == "template"
+    assert trackings.statuses[0, events[0]["frame"]:].all()
+    assert np.abs(trackings.boxes[0, -1] - synthetic_ground_truth[0, -1]).max() <= 6
+
+
+def test_redetect_hook(occluded_video, synthetic_ground_truth):
+    """Test that the re-detect function is called when template matching fails"""
+
+    video_file, objects_to_track = occluded_video
+    calls = []
+
+    # Detects the bright square over the dark background
+    def redetect(frame, k, last_bounding_box):
+        calls.append(k)
+        ys, xs = np.nonzero(frame.min(axis=2) >= 100)
+        if len(xs) == 0:
+            return None
+        return (int(np.median(xs)) - 15, int(np.median(ys)) - 15, 30, 30)
+
+    # A threshold of 1 makes template matching fail
+    reacquirer = TemplateReacquirer(threshold=1.0, interval=3, redetect=redetect)
+    trackings = ObjectTracker(TrackerType.KCF, reacquire=reacquirer).track_objects(video_file, objects_to_track, stop_frame=31)
+
+    assert len(calls) >= 1
+    event = reacquirer.report()["events"][0]
+    assert event["method"] == "redetect" and event["score"] is None and event["frame"] >= 20
+    i = event["frame"]
+    assert np.abs(trackings.boxes[0, i] - synthetic_ground_truth[0, i]).max() <= 3
+    assert trackings.statuses[0, i:].all()
+
+
+@pytest.mark.parametrize("search_factor, threshold, interval", [(1, 0.5, 5), (3, 0, 5), (3, 0.5, 0)])
+def test_reacquirer_invalid_parameters(search_factor, threshold, interval):
+    with pytest.raises(ValueError):
+        TemplateReacquirer(search_factor, threshold, interval)
@@ -1,10 +1,12 @@
 """Tests the renderer module"""
 
+import shutil
 import pytest
 from tracker.renderer import BoundingBoxRenderer
 import json
 import numpy as np
-from tracker.types import TrackerType
+from tracker.types import TrackerType, VideoCodec, VideoFormat, VideoBackend
+from tracker.trackings import Trackings
 from tracker import utils
 import cv2 as cv
 
@@ -77,3 +79,129 @@ def test_renderer(renderer):
 
         is_ok_1, frame_1 = render.read()
         is_ok_2, frame_2 = render_pattern.read()
+
+
+def test_threaded_renderer(synthetic_video, tmp_path):
+    """Test that decoding and encoding in background threads, reading from the columnar trackings, renders the same video"""
+
+    video_file, objects_to_track = synthetic_video
+    frame_count = utils.get_video_frame_count(cv.VideoCapture(video_file))
+    object_trackings = [{"object": obj["object"], "id": obj["id"], 
+                         "track": [{"track_status": True, "coordinates": obj["coordinates"]}] * frame_count} 
+                        for obj in objects_to_track]
+
+    BoundingBoxRenderer().render(video_file, object_trackings, out_path=str(tmp_path), file_name="sync")
+    BoundingBoxRenderer(prefetch=4, write_queue=4).render(video_file, Trackings.from_list(object_trackings), 
+                                                          out_path=str(tmp_path), file_name="threaded")
+
+    extension = BoundingBoxRenderer().video_format.value
+    render = cv.VideoCapture(str(tmp_path / ("sync." + extension)))
+    threaded_render = cv.VideoCapture(str(tmp_path / ("threaded." + extension)))
+    for i in range(frame_count):
+        is_ok_1, frame_1 = render.read()
+        is_ok_2, frame_2 = threaded_render.read()
+        assert is_ok_1 and is_ok_2
+        assert np.array_equal(frame_1, frame_2)
+
+
+@pytest.mark.parametrize("quality, resolution, threads", [(101, None, 0), (-1, None, 0), (None, (-1, 240), 0),
+                                                          (None, (0, 0), 0), (None, None, -1)])
+def test_set_video_format(renderer, quality, resolution, threads):
+    """Test video format setter with invalid quality, resolution and threads"""
+
+    with pytest.raises(ValueError):
+        renderer.set_video_format(quality=quality, resolution=resolution, threads=threads)
+
+
+@pytest.mark.parametrize("backend", [VideoBackend.OPENCV, VideoBackend.FFMPEG])
+def test_render_video_format(synthetic_video, tmp_path, backend):
+    """Test that the output video has the requested container and resolution, the height kept to the aspect ratio"""
+
+    if backend == VideoBackend.FFMPEG and shutil.which("ffmpeg") is None:
+        pytest.skip("ffmpeg not available")
+
+    video_file, objects_to_track = synthetic_video
+    boxes = [[obj["coordinates"]] * 40 for obj in objects_to_track]
+    trackings = Trackings(objects_to_track, boxes, np.ones((2, 40), dtype=bool))
+    codec = VideoCodec.H264 if backend == VideoBackend.FFMPEG else VideoCodec.MP4V
+    renderer = BoundingBoxRenderer(write_queue=2)
+    renderer.set_video_format(codec, VideoFormat.MP4, resolution=(160, 0), backend=backend, preset="ultrafast")
+    renderer.render(video_file, trackings, out_path=str(tmp_path), file_name="out")
+
+    render = cv.VideoCapture(str(tmp_path / "out.mp4"))
+    assert utils.get_video_frame_count(render) == 40
+    assert utils.get_video_frame_width(render) == 160 and utils.get_video_frame_height(render) == 120
+
+
+def test_set_video_format_keeps_container(renderer):
+    """Test that the container is only changed when given"""
+
+    renderer.set_video_format(VideoCodec.H264, VideoFormat.MKV)
+    renderer.set_video_format(quality=50)
+    assert renderer.video_format == VideoFormat.MKV and renderer.video_codec == VideoCodec.H264
+
+
+def test_render_odd_resolution(synthetic_video, tmp_path):
+    """Test that an odd resolution is rounded down to even for H264 with the ffmpeg backend"""
+
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("ffmpeg not available")
+
+    video_file, objects_to_track = synthetic_video
+    boxes = [[obj["coordinates"]] * 40 for obj in objects_to_track]
+    trackings = Trackings(objects_to_track, boxes, np.ones((2, 40), dtype=bool))
+    renderer = BoundingBoxRenderer()
+    renderer.set_video_format(VideoCodec.H264, VideoFormat.MP4, resolution=(161, 121), backend=VideoBackend.FFMPEG,
+                              preset="ultrafast")
+    renderer.render(video_file, trackings, out_path=str(tmp_path), file_name="out")
+
+    render = cv.VideoCapture(str(tmp_path / "out.mp4"))
+    assert utils.get_video_frame_count(render) == 40
+    assert utils.get_video_frame_width(render) == 160 and utils.get_video_frame_height(render) == 120
+
+
+def draw_objects_reference(renderer, frame, objects, statuses, boxes, frame_height):
+    """Draws every box and label with cv.rectangle and cv.putText, as the renderer did before the label sprites"""
+
+    text_format = (renderer._text_font, renderer._font_scale, renderer._text_color, renderer._text_thickness)
+    for obj, track_status, (x, y, width, height) in zip(objects, statuses, boxes):
+        if track_status:
+            cv.rectangle(frame, (x, y), (x + width, y + height), renderer._box_color, renderer._box_line_width)
+            point = (x, y - 20) if y + height + 30 >= frame_height else (x, y + height + 30)
+            cv.putText(frame, obj["object"] + "_" + str(obj["id"]), point, *text_format)
+        else:
+            cv.putText(frame, "Tracking failure: one or more objects could not be tracked", (60, 50), *text_format)
+
+
+@pytest.mark.parametrize("thickness, scale", [(1, 0.5), (2, 0.8), (3, 1.3)])
+def test_draw_objects_pixel_identical(thickness, scale):
+    """Test that the batched boxes and label sprites draw the same pixels as cv.rectangle and cv.putText"""
+
+    renderer = BoundingBoxRenderer()
+    renderer.set_box_format((0, 255, 0), 2)
+    renderer.set_text_format((255, 255, 255), thickness, scale)
+    random_state = np.random.RandomState(thickness)
+    background = random_state.randint(0, 255, (720, 1280, 3), dtype=np.uint8)
+
+    # One object per column of the frame so the labels and boxes of different objects do not overlap,
+    # some of them crossing the frame borders. With lost objects the boxes are below the failure text
+    objects = [{"object": "player", "id": k} for k in range(5)]
+    for i in range(60):
+        lost = i % 2 == 1
+        boxes = [(int(random_state.randint(-40, 40)) + 280 * k, int(random_state.randint(100 if lost else -60, 680)),
+                  int(random_state.randint(10, 60)), int(random_state.randint(10, 80))) for k in range(5)]
+        statuses = (random_state.uniform(size=5) > (0.3 if lost else 0)).tolist()
+        frame, reference_frame = background.copy(), background.copy()
+        renderer.draw_objects(frame, objects, statuses, boxes, 720)
+        draw_objects_reference(renderer, reference_frame, objects, statuses, boxes, 720)
+        assert np.array_equal(frame, reference_frame)
+
+
+def test_render_no_objects(synthetic_video, tmp_path):
+    """Test that a video without objects is rendered unchanged"""
+
+    video_file, _ = synthetic_video
+    renderer = BoundingBoxRenderer()
+    renderer.video_codec = VideoCodec.MJPG
+    renderer.render(video_file, Trackings([], np.zeros((0, 40, 4)), np.zeros((0, 40))), out_path=str(tmp_path))
+    assert utils.get_video_frame_count(cv.VideoCapture(str(tmp_path / ("out." + renderer.video_format.value)))) == 40
@@ -0,0 +1,112 @@
+"""Tests the segment_tracker module"""
+
+import pytest
+import numpy as np
+from tracker.segment_tracker import SegmentTracker, _track_segment
+from tracker.object_tracker import ObjectTracker
+from tracker.types import TrackerType
+from tracker import utils
+
+
+@pytest.fixture(scope="module")
+def object_tracker():
+    """Creates a KCF ObjectTracker"""
+    return ObjectTracker(TrackerType.KCF)
+
+
+def test_invalid_parameters(object_tracker):
+    """Test that non positive segments and processes, and a real time object tracker, raise"""
+
+    with pytest.raises(ValueError):
+        SegmentTracker(object_tracker, segments=0)
+    with pytest.raises(ValueError):
+        SegmentTracker(object_tracker, processes=0)
+    with pytest.raises(ValueError):
+        SegmentTracker(ObjectTracker(TrackerType.KCF, real_time=True))
+
+
+def test_single_segment(object_tracker, synthetic_video):
+    """Test that a single segment gives the same trackings as the object tracker"""
+
+    video_file, objects_to_track = synthetic_video
+    segment_tracker = SegmentTracker(object_tracker, segments=1, processes=1)
+
+    assert segment_tracker.track_objects(video_file, objects_to_track) == object_tracker.track_objects(video_file, objects_to_track)
+    assert segment_tracker.seams == []
+
+
+def test_tail_seeded_segments(object_tracker, synthetic_video):
+    """Test that segments without keyframes are seeded with the tail of the previous segment"""
+
+    video_file, objects_to_track = synthetic_video
+    segment_tracker = SegmentTracker(object_tracker, segments=4, processes=2)
+    trackings = segment_tracker.track_objects(video_file, objects_to_track)
+
+    assert trackings.frame_count == 40
+    assert [seam["frame"] for seam in segment_tracker.seams] == [10, 20, 30]
+    for seam in segment_tracker.seams:
+        assert seam["seed"] == "tail"
+        assert seam["lost_objects"] == []
+        assert set(seam["offsets"]) == {0, 1}
+
+
+def test_inexact_frame_count(object_tracker, synthetic_video, monkeypatch):
+    """Test that an overstated frame count trims the last segment, and raises if a previous segment is short"""
+
+    video_file, objects_to_track = synthetic_video
+    segment_tracker = SegmentTracker(object_tracker, segments=4, processes=2)
+
+    # The last segment 33-45 ends in frame 40
+    monkeypatch.setattr(utils, "get_video_frame_count", lambda video_capture: 45)
+    trackings = segment_tracker.track_objects(video_file, objects_to_track)
+    assert trackings.frame_count == 40 and trackings.statuses.all()
+
+    # The segment 30-45 ends in frame 40, before the last segment
+    monkeypatch.setattr(utils, "get_video_frame_count", lambda video_capture: 60)
+    with pytest.raises(ValueError, match="fewer frames"):
+        segment_tracker.track_objects(video_file, objects_to_track)
+
+    # Unknown frame count
+    monkeypatch.setattr(utils, "get_video_frame_count", lambda video_capture: 0)
+    with pytest.raises(ValueError):
+        segment_tracker.track_objects(video_file, objects_to_track)
+
+
+def test_lost_objects_carried_into_segment(object_tracker, synthetic_video):
+    """Test that an object lost at the tail of the previous segment stays lost, the other ones are tracked"""
+
+    # Boxes of the objects in frame 9, object 1 with a stale box
+    video_file, objects_to_track = synthetic_video
+    seed_objects = [dict(objects_to_track[0], coordinates=(47, 49, 30, 30)), objects_to_track[1]]
+    boxes, statuses = _track_segment(object_tracker, video_file, seed_objects, 9, 20, np.array([False, True]))
+
+    assert boxes.shape == (2, 11, 4) and statuses.shape == (2, 11)
+    assert statuses[0].all() and not statuses[1].any()
+    assert (boxes[1] == seed_objects[1]["coordinates"]).all()
+    assert np.array_equal(boxes[0], object_tracker.track_objects(video_file, seed_objects[:1], 9, 20).boxes[0])
+
+
+def test_keyframe_seeded_segments(object_tracker, synthetic_video):
+    """Test that keyframes seed the segments and add segment boundaries"""
+
+    video_file, objects_to_track = synthetic_video
+
+    # Ground truth position of the synthetic objects in frame 25, in reversed order
+    keyframes = {25: [{"object": "player", "id": 1, "coordinates": (200, 125, 24, 24)},
+                      {"object": "player", "id": 0, "coordinates": (95, 65, 30, 30)}]}
+    segment_tracker = SegmentTracker(object_tracker, segments=2, processes=2)
+    trackings = segment_tracker.track_objects(video_file, objects_to_track, keyframes)
+
+    assert trackings.frame_count == 40
+    assert [(seam["frame"], seam["seed"]) for seam in segment_tracker.seams] == [(20, "tail"), (25, "keyframe")]
+    assert trackings.boxes[0, 25].tolist() == [95, 65, 30, 30]
+    assert trackings.boxes[1, 25].tolist() == [200, 125, 24, 24]
+
+
+def test_invalid_keyframe(object_tracker, synthetic_video):
+    """Test that keyframes with other objects raise"""
+
+    video_file, objects_to_track = synthetic_video
+    keyframes = {25: [{"object": "player", "id": 5, "coordinates": (200, 125, 24, 24)}]}
+    with pytest.raises(ValueError):
+        SegmentTracker(object_tracker, segments=2).track_objects(video_file, objects_to_track, keyframes)
@@ -0,0 +1,84 @@
+"""Tests the sidecar module"""
+
+import json
+import time
+import pytest
+import numpy as np
+from tracker import sidecar
+from tracker.renderer import BoundingBoxRenderer
+from tracker.trackings import Trackings
+
+
+def test_render_sidecar(synthetic_trackings, tmp_path):
+    """Test that every format is written from the capture properties and the jsonl stream holds the trackings"""
+
+    video_file, trackings = synthetic_trackings
+    trackings.statuses[1, 10:15] = False
+    renderer = BoundingBoxRenderer()
+    files = renderer.render_sidecar(video_file, trackings, out_path=str(tmp_path), file_name="out",
+                                    formats=("ass", "vtt", "jsonl"))
+    assert files == [str(tmp_path / "out.ass"), str(tmp_path / "out.vtt"), str(tmp_path / "out.jsonl")]
+
+    # The boxes of the tracked objects and the ids of the lost ones, one line per frame after the header
+    lines = (tmp_path / "out.jsonl").read_text().splitlines()
+    header = json.loads(lines[0])
+    assert header["frame_count"] == 40 and header["fps"] > 0 and header["width"] > 0
+    assert len(lines) == 41
+    ids = [obj["id"] for obj in trackings.objects]
+    for i, line in enumerate(lines[1:]):
+        payload = json.loads(line)
+        assert payload["frame"] == i
+        statuses, boxes = trackings.frame(i)
+        assert payload["boxes"] == [[ids[k]] + boxes[k].tolist() for k in range(2) if statuses[k]]
+        assert payload["lost"] == [ids[k] for k in range(2) if not statuses[k]]
+
+    # The boxes change every frame, so there is a cue per frame
+    vtt = (tmp_path / "out.vtt").read_text()
+    assert vtt.startswith("WEBVTT") and vtt.count(" --> ") == 40
+
+    # A box and a label per object and frame, and the failure text while object 1 is lost
+    ass = (tmp_path / "out.ass").read_text()
+    assert ass.count(",Box,") == 75 and ass.count("\\p1") == 75
+    assert ass.count("Tracking failure") == 1
+
+
+def test_sidecar_merges_static_frames(synthetic_trackings, tmp_path):
+    """Test that consecutive frames with the same boxes share a single cue and event"""
+
+    _, trackings = synthetic_trackings
+    boxes = np.repeat(trackings.boxes[:, :1], 40, axis=1)
+    static_trackings = Trackings(trackings.objects, boxes, np.ones((2, 40), dtype=bool))
+    sidecar.write_webvtt(str(tmp_path / "static.vtt"), static_trackings, fps=25)
+    sidecar.write_ass(str(tmp_path / "static.ass"), static_trackings, fps=25, width=320, height=240)
+
+    vtt = (tmp_path / "static.vtt").read_text()
+    assert vtt.count(" --> ") == 1 and "00:00:00.000 --> 00:00:01.600" in vtt
+    ass = (tmp_path / "static.ass").read_text()
+    assert ass.count(",Box,") == 2 and "0:00:00.00,0:00:01.60" in ass
+
+
+def test_sidecar_speed(synthetic_trackings, tmp_path):
+    """Test that the annotations of a long video are written without decoding it"""
+
+    _, trackings = synthetic_trackings
+    boxes = np.tile(trackings.boxes, (1, 250, 1))
+    long_trackings = Trackings(trackings.objects, boxes, np.tile(trackings.statuses, (1, 250)))
+
+    start = time.perf_counter()
+    for name, write in (("long.ass", sidecar.write_ass), ("long.jsonl", sidecar.write_jsonl)):
+        write(str(tmp_path / name), long_trackings, 25, 320, 240)
+    sidecar.write_webvtt(str(tmp_path / "long.vtt"), long_trackings, 25)
+    assert time.perf_counter() - start < 2.0
+
+
+def test_render_sidecar_invalid_parameters(synthetic_trackings, tmp_path):
+
+    video_file, trackings = synthetic_trackings
+    renderer = BoundingBoxRenderer()
+    with pytest.raises(ValueError):
+        renderer.render_sidecar(video_file, trackings, out_path=str(tmp_path), formats=("srt",))
+
+    # Trackings shorter than the video
+    short_trackings = Trackings(trackings.objects, trackings.boxes[:, :20], trackings.statuses[:, :20])
+    with pytest.raises(ValueError):
+        renderer.render_sidecar(video_file, short_trackings, out_path=str(tmp_path))
@@ -0,0 +1,86 @@
+"""Tests the trackings module"""
+
+import pytest
+from tracker.trackings import Trackings
+import json
+import numpy as np
+
+
+@pytest.fixture(scope="module")
+def reference_trackings():
+    """Reads the reference trackings json file"""
+    with open("tests/data/input_trackings.json") as f:
+        return json.load(f)
+
+
+def test_from_list(reference_trackings):
+    """Test the conversion from the json list of dictionaries to the columnar store and back"""
+
+    trackings = Trackings.from_list(reference_trackings)
+    assert trackings.boxes.shape == (3, 250, 4)
+    assert trackings.boxes.dtype == np.int32
+    assert trackings.statuses.shape == (3, 250)
+    assert trackings.frame_count == 250
+
+    # Round trip, dumping to json gives the same file content
+    assert json.loads(json.dumps(trackings.to_list())) == reference_trackings
+    assert trackings == reference_trackings
+
+
+def test_compatibility_view(reference_trackings):
+    """Test that the trackings can be read as the list of dictionaries"""
+
+    trackings = Trackings.from_list(reference_trackings)
+    assert len(trackings) == len(reference_trackings)
+    for obj, reference_obj in zip(trackings, reference_trackings):
+        assert obj["object"] == reference_obj["object"]
+        assert obj["id"] == reference_obj["id"]
+        assert len(obj["track"]) == len(reference_obj["track"])
+        assert obj["track"][-1]["coordinates"] == tuple(reference_obj["track"][-1]["coordinates"])
+        assert obj["track"][10]["track_status"] == reference_obj["track"][10]["track_status"]
+        assert obj == reference_obj
+
+    with pytest.raises(IndexError):
+        trackings[3]
+    with pytest.raises(IndexError):
+        trackings[0]["track"][250]
+
+
+def test_append():
+    """Test appending frames beyond the preallocated capacity"""
+
+    objects = [{"object": "player", "id": 0, "coordinates": (0, 0, 10, 10)},
+               {"object": "ball", "id": 1, "coordinates": (5, 5, 2, 2)}]
+    trackings = Trackings(objects, capacity=2)
+    for i in range(5):
+        trackings.append([True, i % 2 == 0], [(i, i, 10, 10), (5 + i, 5, 2, 2)])
+
+    assert trackings.frame_count == 5
+    assert trackings.boxes.shape == (2, 5, 4)
+    assert trackings.statuses[1].tolist() == [True, False, True, False, True]
+    assert trackings[1]["track"][3] == {"track_status": False, "coordinates": (8, 5, 2, 2)}
+    statuses, boxes = trackings.frame(4)
+    assert statuses.tolist() == [True, True]
+    assert boxes.tolist() == [[4, 4, 10, 10], [9, 5, 2, 2]]
+
+
+def test_invalid_tracks():
+    """Test that tracks of different length raise"""
+
+    object_trackings = [{"object": "player", "id": 0, "track": [{"track_status": True, "coordinates": [0, 0, 1, 1]}]},
+                        {"object": "player", "id": 1, "track": []}]
+    with pytest.raises(ValueError):
+        Trackings.from_list(object_trackings)
+
+
+def test_no_objects():
+    """Test trackings without objects, as an empty trackings file"""
+
+    trackings = Trackings.from_list([])
+    assert trackings.boxes.shape == (0, 0, 4) and trackings.statuses.shape == (0, 0)
+    assert trackings.frame_count == 0 and trackings.to_list() == []
+
+    # The number of frames is kept from the shape of the arrays, and frames can be appended
+    trackings = Trackings([], np.zeros((0, 5, 4)), np.zeros((0, 5)))
+    trackings.append([], [])
+    assert trackings.frame_count == 6 and trackings.boxes.shape == (0, 6, 4)
@@ -2,6 +2,8 @@
 
 import pytest
 from tracker import utils
+import json
+import os
 
 
 @pytest.mark.parametrize("file",
@@ -38,3 +40,81 @@ def test_read_objects_to_track_file():
     for d, p in zip(result, pattern):
         assert d == p
 
+
+
+@pytest.mark.parametrize("file",
+                         [ ("tests/data/foo.avi"),
+                           ("tests/data/empty_video.avi")
+                         ])
+def test_get_prefetch_video_capture(file):
+    """Test prefetch video capture method with invalid input files"""
+
+    with pytest.raises(ValueError):
+        utils.get_video_capture(file, prefetch=4)
+
+
+@pytest.mark.parametrize("memory_map", [True, False])
+def test_trackings_file_round_trip(tmp_path, memory_map):
+    """Test the conversion of the json trackings file to the binary format and back"""
+
+    reference_trackings = utils.read_trackings_file("tests/data/input_trackings.json")
+
+    binary_file = str(tmp_path / "trackings.trk")
+    utils.write_trackings_file(binary_file, reference_trackings)
+    trackings = utils.read_trackings_file(binary_file, memory_map=memory_map)
+    assert trackings == reference_trackings
+    assert trackings.frame(100)[1].tolist() == reference_trackings.frame(100)[1].tolist()
+
+    json_file = str(tmp_path / "trackings.json")
+    utils.write_trackings_file(json_file, trackings)
+    with open(json_file) as f, open("tests/data/input_trackings.json") as reference:
+        assert json.load(f) == json.load(reference)
+
+
+def test_read_invalid_trackings_file(tmp_path):
+    """Test that a file without the binary trackings header, truncated or with a corrupt header raises"""
+
+    with pytest.raises(ValueError):
+        utils.read_trackings_file("tests/data/empty_video.avi")
+
+    utils.write_trackings_file(tmp_path / "trackings.bin", utils.read_trackings_file("tests/data/input_trackings.json"))
+    data = (tmp_path / "trackings.bin").read_bytes()
+    header_length = int.from_bytes(data[8:16], "little")
+    corrupt_files = [data[:12],                                                        # Truncated header length
+                     data[:16 + header_length // 2],                                   # Truncated header
+                     data[:-1],                                                        # Truncated statuses
+                     data[:16] + b"x" + data[17:],                                     # Not json
+                     data[:16] + b"[" + data[17:15 + header_length] + b"]" + data[16 + header_length:]]  # Not a dict
+    for k, corrupt_data in enumerate(corrupt_files):
+        (tmp_path / f"corrupt_{k}.bin").write_bytes(corrupt_data)
+        for memory_map in (True, False):
+            with pytest.raises(ValueError):
+                utils.read_trackings_file(tmp_path / f"corrupt_{k}.bin", memory_map)
+
+
+def test_read_keyframes_file(tmp_path):
+    """Test the reader of the keyframes file"""
+
+    keyframes_file = tmp_path / "keyframes.json"
+    keyframes_file.write_text('{"120": [{"object": "player", "id": "1", "coordinates": [1, 2, 3, 4]}]}')
+
+    keyframes = utils.read_keyframes_file(str(keyframes_file))
+    assert keyframes == {120: [{"object": "player", "id": 1, "coordinates": (1, 2, 3, 4)}]}
+
+
+@pytest.mark.parametrize("source, live", [(0, True), ("1", True), ("rtsp://localhost:8554/stream", True), 
+                                          ("tests/data/input_trackings.json", False)])
+def test_is_live_source(source, live):
+    assert utils.is_live_source(source) == live
+
+
+def test_is_live_source_named_pipe(tmp_path):
+    pipe = str(tmp_path / "pipe.avi")
+    os.mkfifo(pipe)
+    assert utils.is_live_source(pipe)
+
+
+@pytest.mark.parametrize("frame_count, progress_frames", [(40, [0, 4, 8]), (5, [0, 1, 2]), (0, [0, 100, 200])])
+def test_is_progress_frame(frame_count, progress_frames):
+    """Test the progress frames of known and unknown frame counts"""
+    assert [i for i in range(201) if utils.is_progress_frame(i, frame_count)][:3] == progress_frames
@@ -0,0 +1,185 @@
+"""Tests the video_io module"""
+
+import shutil
+import pytest
+from tracker.video_io import (PrefetchVideoCapture, LatestFrameCapture, ScaledVideoCapture, AsyncVideoWriter, FFmpegVideoWriter,
+                              ScaledVideoWriter, ffmpeg_output_size)
+from tracker.types import VideoCodec
+from tracker import utils
+import time
+import numpy as np
+import cv2 as cv
+
+
+def test_prefetch_invalid_depth(synthetic_video):
+    """Test that a non positive prefetch depth raises"""
+
+    video_file, _ = synthetic_video
+    with pytest.raises(ValueError):
+        PrefetchVideoCapture(cv.VideoCapture(video_file), 0)
+
+
+@pytest.mark.parametrize("prefetch", [1, 4, 64])
+def test_prefetch_reads_all_frames(synthetic_video, prefetch):
+    """Test that the prefetched frames are the same frames read by the video capture"""
+
+    video_file, _ = synthetic_video
+    reference = cv.VideoCapture(video_file)
+    video_capture = PrefetchVideoCapture(cv.VideoCapture(video_file), prefetch)
+    assert video_capture.get(cv.CAP_PROP_FRAME_COUNT) == reference.get(cv.CAP_PROP_FRAME_COUNT)
+
+    frame_count = 0
+    read_ok, frame = video_capture.read()
+    while read_ok:
+        _, reference_frame = reference.read()
+        assert np.array_equal(frame, reference_frame)
+        frame_count = frame_count + 1
+        read_ok, frame = video_capture.read()
+
+    assert frame_count == utils.get_video_frame_count(video_capture)
+    assert not video_capture.isOpened()
+    assert video_capture.read() == (False, None)
+    video_capture.release()
+
+
+def test_prefetch_release_before_end(synthetic_video):
+    """Test that releasing the capture with a full queue stops the decoding thread"""
+
+    video_file, _ = synthetic_video
+    video_capture = PrefetchVideoCapture(cv.VideoCapture(video_file), 2)
+    video_capture.read()
+    video_capture.release()
+    assert not video_capture.isOpened()
+
+
+def test_async_writer_invalid_queue_size(tmp_path):
+    """Test that a non positive queue size raises"""
+
+    video_writer = cv.VideoWriter(str(tmp_path / "out.avi"), cv.VideoWriter_fourcc(*"MJPG"), 25, (320, 240))
+    with pytest.raises(ValueError):
+        AsyncVideoWriter(video_writer, 0)
+    video_writer.release()
+
+
+def test_async_writer(synthetic_video, tmp_path):
+    """Test that the frames encoded in a background thread are the same frames encoded in the calling thread"""
+
+    video_file, _ = synthetic_video
+    fourcc = cv.VideoWriter_fourcc(*"MJPG")
+    video_writer = cv.VideoWriter(str(tmp_path / "sync.avi"), fourcc, 25, (320, 240))
+    async_video_writer = AsyncVideoWriter(cv.VideoWriter(str(tmp_path / "async.avi"), fourcc, 25, (320, 240)), 2)
+
+    video_capture = cv.VideoCapture(video_file)
+    read_ok, frame = video_capture.read()
+    while read_ok:
+        video_writer.write(frame)
+        async_video_writer.write(frame)
+        read_ok, frame = video_capture.read()
+    video_writer.release()
+    async_video_writer.release()
+    assert not async_video_writer.isOpened()
+
+    with pytest.raises(ValueError):
+        async_video_writer.write(frame)
+
+    sync_capture = cv.VideoCapture(str(tmp_path / "sync.avi"))
+    async_capture = cv.VideoCapture(str(tmp_path / "async.avi"))
+    assert utils.get_video_frame_count(async_capture) == utils.get_video_frame_count(sync_capture)
+    for i in range(utils.get_video_frame_count(sync_capture)):
+        _, frame_1 = sync_capture.read()
+        _, frame_2 = async_capture.read()
+        assert np.array_equal(frame_1, frame_2)
+
+
+def test_latest_frame_capture_drops_frames(synthetic_video):
+    """Test that a consumer slower than the source gets the most recent frames and the others are dropped"""
+
+    video_file, _ = synthetic_video
+    video_capture = LatestFrameCapture(cv.VideoCapture(video_file), fps=100)
+
+    frame_indexes = []
+    read_ok, frame = video_capture.read()
+    while read_ok:
+        frame_indexes.append(video_capture.frame_index)
+        assert time.perf_counter() >= video_capture.frame_time
+        time.sleep(0.03)
+        read_ok, frame = video_capture.read()
+    video_capture.release()
+
+    # Every frame is either read or dropped, the indexes of the read frames always increase
+    assert video_capture.frames_read == 40
+    assert video_capture.frames_dropped > 0
+    assert len(frame_indexes) + video_capture.frames_dropped == 40
+    assert frame_indexes == sorted(set(frame_indexes))
+
+
+@pytest.mark.parametrize("scale", [0.5, 0.3])
+def test_scaled_capture(synthetic_video, scale):
+    """Test that the frames have the scaled size, as if resized after decoding when the capture ignores the request"""
+
+    video_file, _ = synthetic_video
+    reference = cv.VideoCapture(video_file)
+    video_capture = PrefetchVideoCapture(ScaledVideoCapture(cv.VideoCapture(video_file), scale), 4)
+    size = (int(round(320 * scale)), int(round(240 * scale)))
+    assert (utils.get_video_frame_width(video_capture), utils.get_video_frame_height(video_capture)) == size
+    assert utils.get_video_frame_count(video_capture) == 40
+
+    read_ok, frame = video_capture.read()
+    while read_ok:
+        _, reference_frame = reference.read()
+        assert np.array_equal(frame, cv.resize(reference_frame, size, interpolation=cv.INTER_AREA))
+        read_ok, frame = video_capture.read()
+    video_capture.release()
+
+    with pytest.raises(ValueError):
+        ScaledVideoCapture(cv.VideoCapture(video_file), 0)
+
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not available")
+
+
+@requires_ffmpeg
+@pytest.mark.parametrize("codec, extension", [(VideoCodec.H264, "mp4"), (VideoCodec.XVID, "avi"), (VideoCodec.VP9, "mkv")])
+def test_ffmpeg_writer(synthetic_video, tmp_path, codec, extension):
+    """Test that the frames piped to ffmpeg are encoded, resized by the scaled writer"""
+
+    video_file, _ = synthetic_video
+    out_file = str(tmp_path / ("out." + extension))
+    video_writer = FFmpegVideoWriter(out_file, codec, 25, (160, 120), quality=80, preset="ultrafast")
+    video_writer = ScaledVideoWriter(video_writer, (160, 120))
+
+    video_capture = cv.VideoCapture(video_file)
+    read_ok, frame = video_capture.read()
+    while read_ok:
+        video_writer.write(frame)
+        read_ok, frame = video_capture.read()
+    video_writer.release()
+    assert not video_writer.isOpened()
+
+    output_capture = cv.VideoCapture(out_file)
+    assert utils.get_video_frame_count(output_capture) == utils.get_video_frame_count(video_capture)
+    assert utils.get_video_frame_width(output_capture) == 160 and utils.get_video_frame_height(output_capture) == 120
+
+
+def test_ffmpeg_output_size():
+    """Test that only the sizes of the 4:2:0 H264 and HEVC encoders are rounded down to even"""
+
+    assert ffmpeg_output_size(VideoCodec.H264, (321, 241)) == (320, 240)
+    assert ffmpeg_output_size(VideoCodec.HEVC, (1, 240)) == (2, 240)
+    assert ffmpeg_output_size(VideoCodec.MJPG, (321, 241)) == (321, 241)
+
+
+def test_ffmpeg_writer_invalid_parameters(tmp_path):
+
+    with pytest.raises(ValueError):
+        FFmpegVideoWriter(str(tmp_path / "out.mp4"), VideoCodec.H264, 25, (320, 240), ffmpeg="missing-ffmpeg")
+
+    if shutil.which("ffmpeg") is not None:
+        with pytest.raises(ValueError):
+            FFmpegVideoWriter(str(tmp_path / "out.mp4"), VideoCodec.H264, 25, (320, 240), quality=101)
+
+        # Frames of another size
+        video_writer = FFmpegVideoWriter(str(tmp_path / "out.mp4"), VideoCodec.H264, 25, (320, 240))
+        with pytest.raises(ValueError):
+            video_writer.write(np.zeros((120, 160, 3), dtype=np.uint8))
+        video_writer.release()
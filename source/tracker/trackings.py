@@ -0,0 +1,220 @@
+"""Defines Trackings, a columnar store of the object trackings
+
+    The tracking history of every object is kept in two numpy arrays instead of a dictionary per
+    object and frame:
+
+        boxes: (n_objects, n_frames, 4) int32 array with the bounding boxes (x, y, width, height)
+        statuses: (n_objects, n_frames) bool array with the track status
+
+    The object description and id are kept in the objects list.
+
+    For compatibility, a Trackings object behaves as the list of dictionaries returned by previous
+    versions of ObjectTracker.track_objects, trackings[k]["track"][i]["coordinates"] works as before.
+    Each element is a read only view created on demand.
+
+    Typical usage:
+
+        trackings = Trackings(objects_to_track)
+        for frame in frames:
+            track_status_list, bounding_boxes = multi_tracker.update(frame)
+            trackings.append(track_status_list, bounding_boxes)
+
+        boxes = trackings.boxes
+        object_trackings = trackings.to_list()      # list of dicts, as in tests/data/input_trackings.json
+        trackings = Trackings.from_list(object_trackings)
+"""
+
+from collections.abc import Mapping, Sequence
+import numpy as np
+
+
+class Trackings(Sequence):
+    """Columnar store of the object trackings"""
+
+    def __init__(self, objects, boxes=None, statuses=None, capacity=256):
+        """Initialize the store for the objects
+
+        Args:
+            objects: list of dictionaries with the "object" and "id" keys, other keys are ignored
+            boxes: optional (n_objects, n_frames, 4) array with the initial bounding boxes
+            statuses: optional (n_objects, n_frames) array with the initial track status
+            capacity: number of frames preallocated when no initial arrays are given
+
+        Raises:
+            ValueError: if boxes and statuses shapes do not match the number of objects
+        """
+
+        self.objects = [{"object": str(obj["object"]), "id": int(obj["id"])} for obj in objects]
+        n_objects = len(self.objects)
+
+        if boxes is None and statuses is None:
+            self._boxes = np.zeros((n_objects, max(capacity, 1), 4), dtype=np.int32)
+            self._statuses = np.zeros((n_objects, max(capacity, 1)), dtype=bool)
+            self._frame_count = 0
+        elif n_objects == 0:
+            # Without objects the number of frames can only be taken from the shape of the arrays
+            frame_count = np.shape(boxes)[1] if np.ndim(boxes) == 3 else 0
+            self._boxes = np.zeros((0, frame_count, 4), dtype=np.int32)
+            self._statuses = np.zeros((0, frame_count), dtype=bool)
+            self._frame_count = frame_count
+        else:
+            boxes = np.asarray(boxes, dtype=np.int32).reshape(n_objects, -1, 4)
+            statuses = np.asarray(statuses, dtype=bool).reshape(n_objects, -1)
+            if boxes.shape[1] != statuses.shape[1]:
+                raise ValueError("Boxes and statuses must have the same number of frames")
+            self._boxes = boxes
+            self._statuses = statuses
+            self._frame_count = boxes.shape[1]
+
+    @property
+    def boxes(self):
+        """(n_objects, n_frames, 4) int32 array with the bounding boxes"""
+        return self._boxes[:, :self._frame_count]
+
+    @property
+    def statuses(self):
+        """(n_objects, n_frames) bool array with the track status"""
+        return self._statuses[:, :self._frame_count]
+
+    @property
+    def frame_count(self):
+        """Number of tracked frames"""
+        return self._frame_count
+
+    def append(self, track_status_list, bounding_boxes):
+        """Append the track status and bounding box of every object for a new frame"""
+
+        if self._frame_count == self._boxes.shape[1]:
+            self._grow()
+        self._statuses[:, self._frame_count] = track_status_list
+        if len(bounding_boxes) > 0:
+            self._boxes[:, self._frame_count] = bounding_boxes
+        self._frame_count = self._frame_count + 1
+
+    def _grow(self):
+        """Double the preallocated frames"""
+
+        capacity = max(2 * self._boxes.shape[1], 1)
+        boxes = np.zeros((len(self.objects), capacity, 4), dtype=np.int32)
+        statuses = np.zeros((len(self.objects), capacity), dtype=bool)
+        boxes[:, :self._frame_count] = self.boxes
+        statuses[:, :self._frame_count] = self.statuses
+        self._boxes = boxes
+        self._statuses = statuses
+
+    def frame(self, i):
+        """Returns (statuses, boxes) of every object in frame i"""
+        return (self.statuses[:, i], self.boxes[:, i])
+
+    def __len__(self):
+        """Number of objects"""
+        return len(self.objects)
+
+    def __getitem__(self, k):
+        """Returns a dictionary like view of the tracking of object k"""
+        if isinstance(k, slice):
+            return [self[j] for j in range(*k.indices(len(self)))]
+        if k < 0:
+            k = k + len(self)
+        if k < 0 or k >= len(self):
+            raise IndexError("Object index out of range")
+        return _ObjectTrackingView(self, k)
+
+    def __eq__(self, other):
+        if isinstance(other, Trackings):
+            return (self.objects == other.objects and np.array_equal(self.boxes, other.boxes)
+                    and np.array_equal(self.statuses, other.statuses))
+        if isinstance(other, Sequence):
+            return self.to_list() == [_as_dict(obj) for obj in other]
+        return NotImplemented
+
+    def to_list(self):
+        """Returns the trackings as a list of dictionaries, see ObjectTracker.track_objects"""
+
+        # Convert the whole arrays at once, much faster than going through the views
+        boxes = self.boxes.tolist()
+        statuses = self.statuses.tolist()
+
+        object_trackings = []
+        for obj, object_boxes, object_statuses in zip(self.objects, boxes, statuses):
+            track = [{"track_status": status, "coordinates": tuple(box)} for status, box in zip(object_statuses, object_boxes)]
+            object_trackings.append({"object": obj["object"], "id": obj["id"], "track": track})
+
+        return object_trackings
+
+    @classmethod
+    def from_list(cls, object_trackings):
+        """Creates a Trackings object from a list of dictionaries, for example a loaded trackings json file
+
+        Raises:
+            ValueError: if the tracks of the objects are not the same length
+        """
+
+        frame_counts = set(len(obj["track"]) for obj in object_trackings)
+        if len(frame_counts) > 1:
+            raise ValueError("All the object tracks must be the same length")
+        frame_count = frame_counts.pop() if frame_counts else 0
+
+        boxes = np.zeros((len(object_trackings), frame_count, 4), dtype=np.int32)
+        statuses = np.zeros((len(object_trackings), frame_count), dtype=bool)
+        for k, obj in enumerate(object_trackings):
+            if frame_count > 0:
+                boxes[k] = [item["coordinates"] for item in obj["track"]]
+                statuses[k] = [item["track_status"] for item in obj["track"]]
+
+        return cls(object_trackings, boxes, statuses)
+
+
+class _ObjectTrackingView(Mapping):
+    """Read only view of the tracking of one object, as {"object": ..., "id": ..., "track": [...]}"""
+
+    def __init__(self, trackings, k):
+        self._trackings = trackings
+        self._k = k
+
+    def __getitem__(self, key):
+        if key == "track":
+            return _TrackView(self._trackings, self._k)
+        return self._trackings.objects[self._k][key]
+
+    def __iter__(self):
+        return iter(("object", "id", "track"))
+
+    def __len__(self):
+        return 3
+
+
+class _TrackView(Sequence):
+    """Read only view of the track of one object, as a list of {"track_status": ..., "coordinates": ...}"""
+
+    def __init__(self, trackings, k):
+        self._trackings = trackings
+        self._k = k
+
+    def __len__(self):
+        return self._trackings.frame_count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i = i + len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError("Frame index out of range")
+        return {"track_status": bool(self._trackings._statuses[self._k, i]),
+                "coordinates": tuple(self._trackings._boxes[self._k, i].tolist())}
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence):
+            return list(self) == [_as_track_item(item) for item in other]
+        return NotImplemented
+
+
+def _as_track_item(item):
+    """Returns a track item with the coordinates as a tuple"""
+    return {"track_status": bool(item["track_status"]), "coordinates": tuple(item["coordinates"])}
+
+
+def _as_dict(obj):
+    """Returns an object tracking as a plain dictionary with the coordinates as tuples"""
+    return {"object": obj["object"], "id": obj["id"], "track": [_as_track_item(item) for item in obj["track"]]}
@@ -3,18 +3,29 @@
 from enum import Enum
 
 class VideoCodec(Enum):
-    """Available codecs"""
+    """Available codecs, the value is the fourcc of the OpenCV video writer"""
     MJPG = 'MJPG'
     DIVX = 'DIVX'
     XVID = 'XVID'
+    MP4V = 'mp4v'
+    H264 = 'avc1'
+    HEVC = 'hev1'
+    VP9 = 'VP90'
 
 class VideoFormat(Enum):
     "Video Extentions"
     AVI = 'avi'
     MP4 = 'mp4'
+    MKV = 'mkv'
+
+class VideoBackend(Enum):
+    """Video writer backends, OpenCV or an ffmpeg process fed through a pipe"""
+    OPENCV = 'opencv'
+    FFMPEG = 'ffmpeg'
 
 class TrackerType(Enum):
     """Enumeration of the posible single object trackers"""
     KCF = 0
     MOSSE = 1
     CSRT = 2
+    ADAPTIVE = 3
@@ -2,7 +2,25 @@
 """
 
 import json
+import os
+import stat
+import struct
+import numpy as np
 import cv2 as cv
+from tracker.video_io import PrefetchVideoCapture, LatestFrameCapture, ScaledVideoCapture
+from tracker.trackings import Trackings
+
+# Binary trackings file layout:
+#   magic (8 bytes) | header length (uint64, little endian) | json header | padding | boxes | statuses
+# The arrays are aligned so they can be memory mapped
+TRACKINGS_FILE_MAGIC = b"TRACKS01"
+_TRACKINGS_FILE_ALIGNMENT = 64
+
+# Url schemes of streaming sources, read as live sources
+LIVE_SOURCE_SCHEMES = ("rtsp://", "rtmp://", "http://", "https://", "udp://", "tcp://")
+
+# Frames between progress logs when the frame count is unknown
+PROGRESS_INTERVAL = 100
 
 def read_objects_to_track_file(json_file):
     """Reads a json file and returns a list of dictionaries containing the objects to track info
@@ -38,6 +56,46 @@ def read_objects_to_track_file(json_file):
     with open(json_file) as f:
         objects_to_track = json.load(f)
 
+    return _parse_objects_to_track(objects_to_track)
+
+
+def read_keyframes_file(json_file):
+    """Reads a json file with the bounding boxes of the objects to track in some frames of the video
+    
+    The file is expected to map frame indexes to lists of objects in the format of read_objects_to_track_file:
+        {
+            "1500": [
+                {
+                    "object": "player",
+                    "id": 0,
+                    "coordinates": [
+                        630,
+                        875,
+                        146,
+                        212
+                    ]
+                },
+
+                ...
+            ],
+
+            ...
+        }
+
+    Returns:
+        A dictionary {frame index (int): list of objects to track}
+    """
+
+    keyframes = None
+    with open(json_file) as f:
+        keyframes = json.load(f)
+
+    return {int(frame): _parse_objects_to_track(objects) for frame, objects in keyframes.items()}
+
+
+def _parse_objects_to_track(objects_to_track):
+    """Converts the coordinates, id and object description of a loaded objects list to its types"""
+
     for obj in objects_to_track:
         obj["coordinates"] = tuple(obj["coordinates"])
         obj["id"] = int(obj["id"])
@@ -46,11 +104,49 @@ def read_objects_to_track_file(json_file):
     return objects_to_track
 
 
-def get_video_capture(video_file):
+def parse_video_source(video_source):
+    """Returns the device index of a camera source given as an int or a string of digits, the source otherwise"""
+
+    if isinstance(video_source, str) and video_source.isdigit():
+        return int(video_source)
+    return video_source
+
+
+def is_live_source(video_source):
+    """Returns True if the video source is unbounded: a device index, a streaming url or a named pipe"""
+
+    video_source = parse_video_source(video_source)
+    if isinstance(video_source, int):
+        return True
+    if str(video_source).startswith(LIVE_SOURCE_SCHEMES):
+        return True
+    try:
+        return stat.S_ISFIFO(os.stat(video_source).st_mode)
+    except (OSError, TypeError, ValueError):
+        return False
+
+
+def is_progress_frame(i, frame_count):
+    """Returns True if the progress must be logged in frame i, every tenth of the video or every 
+    PROGRESS_INTERVAL frames if the frame count is unknown"""
+
+    if frame_count > 0:
+        return i % max(frame_count // 10, 1) == 0
+    return i % PROGRESS_INTERVAL == 0
+
+
+def get_video_capture(video_file, prefetch=0, start_frame=0, real_time=False, decode_scale=1.0):
     """Gets the video capture object and the first frame of it
     
     Args: 
-        video_file: the video file
+        video_file: the video file, device index, streaming url or named pipe, see is_live_source
+        prefetch: if positive, the frames are decoded ahead in a background thread and up to prefetch 
+            frames are buffered, see video_io.PrefetchVideoCapture
+        start_frame: index of the first frame to read, the capture is moved to it with CAP_PROP_POS_FRAMES
+        real_time: if True only the most recent frame is kept and the frames that can not be processed 
+            in time are dropped, see video_io.LatestFrameCapture. Files are read at their frame rate
+        decode_scale: factor in (0, 1] applied to the frame size, requested from the capture and resized after
+            decoding if the capture ignores it, see video_io.ScaledVideoCapture
     
     Returns:
         (first_frame, video_capture)
@@ -58,17 +154,42 @@ def get_video_capture(video_file):
     Raises:
         ValueError: if video file can not be opened
         ValueError: if video file has no frame
+        ValueError: if start_frame is given for a live source
+        ValueError: if decode_scale is not in (0, 1]
     """  
     
+    if decode_scale <= 0 or decode_scale > 1:
+        raise ValueError("Decode scale must be in (0, 1]")
+
+    video_source = parse_video_source(video_file)
+    live_source = is_live_source(video_source)
+    if live_source and start_frame > 0:
+        raise ValueError("Live sources can not be seeked")
+
     # Open capture
     try:
-        video_capture = cv.VideoCapture(video_file)
+        video_capture = cv.VideoCapture(video_source)
     except:
         raise ValueError("Video file could not be opened")
 
+    # Seek to the first frame
+    if start_frame > 0:
+        video_capture.set(cv.CAP_PROP_POS_FRAMES, start_frame)
+
+    # Decode at a reduced resolution, before the frames are queued
+    if decode_scale != 1 and video_capture.isOpened():
+        video_capture = ScaledVideoCapture(video_capture, decode_scale)
+
+    # Read the most recent frame in real time, or decode frames in a background thread
+    if real_time and video_capture.isOpened():
+        video_capture = LatestFrameCapture(video_capture, None if live_source else get_video_fps(video_capture))
+    elif prefetch > 0 and video_capture.isOpened():
+        video_capture = PrefetchVideoCapture(video_capture, prefetch)
+
     # Read first frame
     read_ok, first_frame = video_capture.read()
     if not read_ok:
+        video_capture.release()
         raise ValueError("Empty video file")
 
     return (first_frame, video_capture)
@@ -87,6 +208,127 @@ def get_video_frame_height(video_capture):
     return int(video_capture.get(cv.CAP_PROP_FRAME_HEIGHT))
 
 def get_video_frame_count(video_capture):
-    """Get video frame count"""
-    return int(video_capture.get(cv.CAP_PROP_FRAME_COUNT))
-    
\ No newline at end of file
+    """Get video frame count, 0 if unknown as in live sources"""
+    return max(int(video_capture.get(cv.CAP_PROP_FRAME_COUNT)), 0)
+    
+
+def write_trackings_file(file, object_trackings):
+    """Writes the object trackings to a file
+    
+    Files with the .json extension are written in the json format of tests/data/input_trackings.json,
+    any other file is written in the binary trackings format, which can be memory mapped when read. 
+    Both formats store the same information, so a file can be converted losslessly from one format to the other.
+
+    Args:
+        file: output file
+        object_trackings: a Trackings object or a list of dictionaries, see ObjectTracker.track_objects
+    """
+
+    if not isinstance(object_trackings, Trackings):
+        object_trackings = Trackings.from_list(object_trackings)
+
+    # Json format
+    if str(file).endswith(".json"):
+        with open(file, "w") as f:
+            json.dump(object_trackings.to_list(), f)
+        return
+
+    # Binary format, the offsets of the aligned arrays after the header are part of the header
+    # They only grow with the header length, so they are computed again until they are stable
+    n_objects, frame_count = len(object_trackings), object_trackings.frame_count
+    header = {"objects": object_trackings.objects, "frame_count": frame_count, "boxes_offset": 0, "statuses_offset": 0}
+    while True:
+        header_bytes = json.dumps(header).encode()
+        boxes_offset = _align(len(TRACKINGS_FILE_MAGIC) + 8 + len(header_bytes))
+        statuses_offset = _align(boxes_offset + n_objects * frame_count * 4 * 4)
+        if (boxes_offset, statuses_offset) == (header["boxes_offset"], header["statuses_offset"]):
+            break
+        header.update({"boxes_offset": boxes_offset, "statuses_offset": statuses_offset})
+
+    with open(file, "wb") as f:
+        f.write(TRACKINGS_FILE_MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (boxes_offset - f.tell()))
+        f.write(np.ascontiguousarray(object_trackings.boxes, dtype="<i4").tobytes())
+        f.write(b"\0" * (statuses_offset - f.tell()))
+        f.write(np.ascontiguousarray(object_trackings.statuses, dtype=np.uint8).tobytes())
+
+
+def read_trackings_file(file, memory_map=True):
+    """Reads an object trackings file written by write_trackings_file
+
+    Args:
+        file: json or binary trackings file
+        memory_map: if True the arrays of a binary file are memory mapped instead of loaded, so single 
+            frames can be accessed without reading the whole file
+
+    Returns:
+        A Trackings object
+
+    Raises:
+        ValueError: if the file is not a valid trackings file
+    """
+
+    # Json format
+    if str(file).endswith(".json"):
+        with open(file) as f:
+            return Trackings.from_list(json.load(f))
+
+    # Binary format
+    file_size = os.path.getsize(file)
+    with open(file, "rb") as f:
+        header = _read_trackings_header(f, file_size)
+
+    shapes = {"boxes": (len(header["objects"]), header["frame_count"], 4), 
+              "statuses": (len(header["objects"]), header["frame_count"])}
+    dtypes = {"boxes": "<i4", "statuses": np.bool_}
+    header_end = len(TRACKINGS_FILE_MAGIC) + 8
+    arrays = {}
+    for name in ("boxes", "statuses"):
+        offset = header[name + "_offset"]
+        if offset < header_end or offset + int(np.prod(shapes[name])) * np.dtype(dtypes[name]).itemsize > file_size:
+            raise ValueError("Invalid trackings file")
+        if 0 in shapes[name]:
+            arrays[name] = np.zeros(shapes[name], dtype=dtypes[name])
+        elif memory_map:
+            arrays[name] = np.memmap(file, dtype=dtypes[name], mode="r", offset=offset, shape=shapes[name])
+        else:
+            count = int(np.prod(shapes[name]))
+            arrays[name] = np.fromfile(file, dtype=dtypes[name], count=count, offset=offset).reshape(shapes[name])
+
+    return Trackings(header["objects"], arrays["boxes"], arrays["statuses"])
+
+
+def _read_trackings_header(f, file_size):
+    """Returns the header of a binary trackings file
+
+    Raises:
+        ValueError: if the magic, the header length or the header are not valid
+    """
+
+    if f.read(len(TRACKINGS_FILE_MAGIC)) != TRACKINGS_FILE_MAGIC:
+        raise ValueError("Invalid trackings file")
+    header_length = f.read(8)
+    if len(header_length) != 8:
+        raise ValueError("Invalid trackings file")
+    header_length, = struct.unpack("<Q", header_length)
+    if len(TRACKINGS_FILE_MAGIC) + 8 + header_length > file_size:
+        raise ValueError("Invalid trackings file")
+
+    # Json and unicode decoding errors are value errors too
+    try:
+        header = json.loads(f.read(header_length).decode())
+    except ValueError:
+        raise ValueError("Invalid trackings file")
+    if (not isinstance(header, dict) or not isinstance(header.get("objects"), list) or
+            not all(isinstance(header.get(key), int) and header[key] >= 0
+                    for key in ("frame_count", "boxes_offset", "statuses_offset"))):
+        raise ValueError("Invalid trackings file")
+
+    return header
+
+
+def _align(offset):
+    """Returns the offset rounded up to the trackings file alignment"""
+    return -(-offset // _TRACKINGS_FILE_ALIGNMENT) * _TRACKINGS_FILE_ALIGNMENT
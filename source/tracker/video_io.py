@@ -0,0 +1,534 @@
+"""Implements video input and output helpers that run in background threads
+
+    PrefetchVideoCapture decodes the frames of a video capture in a background thread and keeps
+    them in a bounded queue, so decoding the next frames overlaps with tracking or rendering the
+    current one. It exposes the same read/isOpened/get/release interface as cv.VideoCapture.
+
+    Typical usage:
+
+        video_capture = PrefetchVideoCapture(cv.VideoCapture(video_file), prefetch=8)
+        read_ok, frame = video_capture.read()
+        while read_ok:
+            ...
+            read_ok, frame = video_capture.read()
+        video_capture.release()
+
+    utils.get_video_capture creates it when a prefetch depth is given.
+
+    LatestFrameCapture is the real time alternative for live sources: the background thread keeps only the
+    most recent frame, frames that arrive while the consumer is busy are dropped instead of queued, so
+    the latency stays bounded when tracking is slower than the source. Files are read at their frame rate,
+    as if they were live. Every read frame has its source index and the time it was decoded:
+
+        video_capture = LatestFrameCapture(cv.VideoCapture(0))
+        read_ok, frame = video_capture.read()
+        print(video_capture.frame_index, video_capture.frame_time, video_capture.frames_dropped)
+
+    ScaledVideoCapture decodes at a reduced resolution. The scaled size is requested through the
+    CAP_PROP_FRAME_WIDTH and CAP_PROP_FRAME_HEIGHT properties, so cameras and the backends that support it
+    decode the small frames directly. The others, like the FFmpeg backend with files, ignore the request and
+    the frames are resized right after decoding, inside the decoding thread when wrapped by PrefetchVideoCapture:
+
+        video_capture = PrefetchVideoCapture(ScaledVideoCapture(cv.VideoCapture(video_file), 0.5), prefetch=8)
+
+    AsyncVideoWriter does the same for the output side, frames are encoded by a background thread
+    while the next frame is being drawn. The queue is bounded, write blocks when it is full so
+    memory stays bounded on long videos.
+
+        video_writer = AsyncVideoWriter(cv.VideoWriter(...), queue_size=8)
+        for frame in frames:
+            video_writer.write(frame)
+        video_writer.release()
+
+    FFmpegVideoWriter has the same interface as cv.VideoWriter but pipes the raw frames to an ffmpeg process,
+    which has the H264, HEVC and VP9 encoders that the OpenCV builds usually lack, and exposes the quality,
+    speed preset and threads of the encoder. ScaledVideoWriter resizes the frames to the output resolution
+    before writing them, inside the encoding thread when wrapped by AsyncVideoWriter:
+
+        video_writer = FFmpegVideoWriter("out.mp4", VideoCodec.H264, 25, (1280, 720), quality=70, preset="veryfast")
+        video_writer = AsyncVideoWriter(ScaledVideoWriter(video_writer, (1280, 720)), queue_size=8)
+"""
+
+import shutil
+import subprocess
+import threading
+import queue
+import time
+import numpy as np
+import cv2 as cv
+import logging
+from tracker import root_logger
+
+
+# Define logger for this module
+logger = logging.getLogger(root_logger.LOGGER_NAME + ".video_io")
+
+# Properties read once before the decoding thread starts
+_STATIC_PROPERTIES = (cv.CAP_PROP_FPS, cv.CAP_PROP_FRAME_COUNT, cv.CAP_PROP_FRAME_WIDTH, cv.CAP_PROP_FRAME_HEIGHT)
+
+# ffmpeg encoder of every codec, its quality option and the option values of quality 0 and 100
+_FFMPEG_ENCODERS = {
+    "MJPG": ("mjpeg", "-q:v", 31, 2),
+    "DIVX": ("mpeg4", "-q:v", 31, 2),
+    "XVID": ("mpeg4", "-q:v", 31, 2),
+    "MP4V": ("mpeg4", "-q:v", 31, 2),
+    "H264": ("libx264", "-crf", 40, 10),
+    "HEVC": ("libx265", "-crf", 40, 10),
+    "VP9": ("libvpx-vp9", "-crf", 55, 15)
+}
+
+
+class PrefetchVideoCapture:
+    """Video capture that decodes frames ahead of time in a background thread"""
+
+    def __init__(self, video_capture, prefetch):
+        """Start decoding frames of the video capture into a bounded queue
+
+        Args:
+            video_capture: opened cv.VideoCapture object
+            prefetch: maximum number of decoded frames waiting to be read
+
+        Raises:
+            ValueError: if prefetch is less than 1
+        """
+
+        if prefetch < 1:
+            raise ValueError("Prefetch must be a positive value")
+
+        self._video_capture = video_capture
+        self._properties = {prop: video_capture.get(prop) for prop in _STATIC_PROPERTIES}
+        self._queue = queue.Queue(maxsize=prefetch)
+        self._stop = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(target=self._decode, name="frame-prefetch", daemon=True)
+        self._thread.start()
+        logger.debug(f"Prefetch video capture started, prefetch: {prefetch}")
+
+    def _decode(self):
+        """Decoding thread, puts (read_ok, frame, error) items in the queue until end of video or stop"""
+
+        try:
+            while not self._stop.is_set():
+                read_ok, frame = self._video_capture.read()
+                if not self._put((read_ok, frame, None)) or not read_ok:
+                    break
+        except Exception as e:
+            logger.error(f"error decoding video: {e}")
+            self._put((False, None, e))
+
+    def _put(self, item):
+        """Put an item in the queue, waiting for free space unless the capture is released
+
+        Returns:
+            False if the capture was released before the item could be queued
+        """
+
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read(self):
+        """Returns the next decoded frame as (read_ok, frame)
+
+        Raises:
+            the exception raised by the decoding thread, if any
+        """
+
+        if self._finished:
+            return (False, None)
+
+        read_ok, frame, error = self._queue.get()
+        if not read_ok:
+            self._finished = True
+        if error is not None:
+            raise error
+        return (read_ok, frame)
+
+    def isOpened(self):
+        """Returns True while there are frames to read"""
+        return not self._finished and self._video_capture.isOpened()
+
+    def get(self, prop):
+        """Returns a property of the underlying video capture"""
+        if prop in self._properties:
+            return self._properties[prop]
+        return self._video_capture.get(prop)
+
+    def release(self):
+        """Stop the decoding thread and release the underlying video capture"""
+
+        self._stop.set()
+        self._thread.join()
+        self._finished = True
+        self._video_capture.release()
+        logger.debug("Prefetch video capture released")
+
+
+class LatestFrameCapture:
+    """Video capture that always returns the most recent frame of a live source, dropping older frames"""
+
+    def __init__(self, video_capture, fps=None):
+        """Start reading frames of the video capture in a background thread
+
+        Args:
+            video_capture: opened cv.VideoCapture object
+            fps: if given, the frames are read at this rate, used to play a file as a live source.
+                Live sources are read as fast as they produce frames
+        """
+
+        self._video_capture = video_capture
+        self._properties = {prop: video_capture.get(prop) for prop in _STATIC_PROPERTIES}
+        self._period = 1 / fps if fps else 0
+        self._condition = threading.Condition()
+        self._latest = None
+        self._stop = threading.Event()
+        self._finished = False
+        self.frame_index = -1
+        self.frame_time = None
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self._thread = threading.Thread(target=self._decode, name="frame-latest", daemon=True)
+        self._thread.start()
+        logger.debug(f"Latest frame video capture started, fps: {fps}")
+
+    def _decode(self):
+        """Reading thread, replaces the latest (read_ok, frame, error, index, time) item until end of video or stop"""
+
+        index = 0
+        next_time = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                if self._period:
+                    next_time = next_time + self._period
+                    self._stop.wait(max(next_time - time.perf_counter(), 0))
+                read_ok, frame = self._video_capture.read()
+                self._set_latest((read_ok, frame, None, index, time.perf_counter()))
+                if not read_ok:
+                    break
+                index = index + 1
+        except Exception as e:
+            logger.error(f"error decoding video: {e}")
+            self._set_latest((False, None, e, index, time.perf_counter()))
+
+    def _set_latest(self, item):
+        """Replaces the latest item, an unread frame is counted as dropped"""
+
+        with self._condition:
+            if self._latest is not None and self._latest[0]:
+                self.frames_dropped = self.frames_dropped + 1
+            if item[0]:
+                self.frames_read = self.frames_read + 1
+            self._latest = item
+            self._condition.notify()
+
+    def read(self):
+        """Returns the most recent frame as (read_ok, frame), waits for a new one if it was already read
+
+        Raises:
+            the exception raised by the reading thread, if any
+        """
+
+        if self._finished:
+            return (False, None)
+
+        with self._condition:
+            while self._latest is None:
+                self._condition.wait()
+            read_ok, frame, error, self.frame_index, self.frame_time = self._latest
+            self._latest = None
+        if not read_ok:
+            self._finished = True
+        if error is not None:
+            raise error
+        return (read_ok, frame)
+
+    def isOpened(self):
+        """Returns True while there are frames to read"""
+        return not self._finished and self._video_capture.isOpened()
+
+    def get(self, prop):
+        """Returns a property of the underlying video capture"""
+        if prop in self._properties:
+            return self._properties[prop]
+        return self._video_capture.get(prop)
+
+    def release(self):
+        """Stop the reading thread and release the underlying video capture"""
+
+        self._stop.set()
+        self._thread.join()
+        self._finished = True
+        self._video_capture.release()
+        logger.debug(f"Latest frame video capture released, {self.frames_read} frames read, {self.frames_dropped} dropped")
+
+
+class ScaledVideoCapture:
+    """Video capture that decodes the frames at a reduced resolution"""
+
+    def __init__(self, video_capture, scale):
+        """Request the scaled frame size from the video capture
+
+        Args:
+            video_capture: opened cv.VideoCapture object
+            scale: factor in (0, 1] applied to the width and height of the frames
+
+        Raises:
+            ValueError: if scale is not in (0, 1]
+        """
+
+        if scale <= 0 or scale > 1:
+            raise ValueError("Scale must be in (0, 1]")
+
+        self._video_capture = video_capture
+        width = video_capture.get(cv.CAP_PROP_FRAME_WIDTH)
+        height = video_capture.get(cv.CAP_PROP_FRAME_HEIGHT)
+        self.size = (max(int(round(width * scale)), 1), max(int(round(height * scale)), 1))
+
+        # Cameras and some backends decode at the requested size, the others ignore it
+        self.decoded_scaled = bool(video_capture.set(cv.CAP_PROP_FRAME_WIDTH, self.size[0]) and
+                                   video_capture.set(cv.CAP_PROP_FRAME_HEIGHT, self.size[1]) and
+                                   video_capture.get(cv.CAP_PROP_FRAME_WIDTH) == self.size[0] and
+                                   video_capture.get(cv.CAP_PROP_FRAME_HEIGHT) == self.size[1])
+        logger.debug(f"Scaled video capture {self.size}, decoded by the capture: {self.decoded_scaled}")
+
+    def read(self):
+        """Returns the next frame as (read_ok, frame), resized if the capture did not decode it at the scaled size"""
+
+        read_ok, frame = self._video_capture.read()
+        if read_ok and (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv.resize(frame, self.size, interpolation=cv.INTER_AREA)
+        return (read_ok, frame)
+
+    def isOpened(self):
+        """Returns True if the underlying video capture is opened"""
+        return self._video_capture.isOpened()
+
+    def get(self, prop):
+        """Returns a property of the underlying video capture, the frame size is the scaled one"""
+        if prop == cv.CAP_PROP_FRAME_WIDTH:
+            return self.size[0]
+        if prop == cv.CAP_PROP_FRAME_HEIGHT:
+            return self.size[1]
+        return self._video_capture.get(prop)
+
+    def release(self):
+        """Release the underlying video capture"""
+        self._video_capture.release()
+
+
+class AsyncVideoWriter:
+    """Video writer that encodes frames in a background thread"""
+
+    def __init__(self, video_writer, queue_size):
+        """Start the encoding thread of the video writer
+
+        Args:
+            video_writer: opened cv.VideoWriter object
+            queue_size: maximum number of frames waiting to be encoded, write blocks when the queue is full
+
+        Raises:
+            ValueError: if queue_size is less than 1
+        """
+
+        if queue_size < 1:
+            raise ValueError("Queue size must be a positive value")
+
+        self._video_writer = video_writer
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._released = False
+        self._thread = threading.Thread(target=self._encode, name="frame-writer", daemon=True)
+        self._thread.start()
+        logger.debug(f"Async video writer started, queue size: {queue_size}")
+
+    def _encode(self):
+        """Encoding thread, writes the queued frames until a None item is received"""
+
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            if self._error is not None:
+                continue
+            try:
+                self._video_writer.write(frame)
+            except Exception as e:
+                logger.error(f"error encoding video: {e}")
+                self._error = e
+
+    def write(self, frame):
+        """Queue a frame to be encoded, the frame must not be modified after this call
+
+        Raises:
+            ValueError: if the writer was released
+            the exception raised by the encoding thread, if any
+        """
+
+        if self._released:
+            raise ValueError("Video writer already released")
+        if self._error is not None:
+            raise self._error
+        self._queue.put(frame)
+
+    def isOpened(self):
+        """Returns True if the underlying video writer is opened"""
+        return not self._released and self._video_writer.isOpened()
+
+    def release(self):
+        """Wait for the queued frames to be encoded and release the underlying video writer
+
+        Raises:
+            the exception raised by the encoding thread, if any
+        """
+
+        if not self._released:
+            self._released = True
+            self._queue.put(None)
+            self._thread.join()
+            self._video_writer.release()
+            logger.debug("Async video writer released")
+
+        if self._error is not None:
+            raise self._error
+
+
+class FFmpegVideoWriter:
+    """Video writer that pipes the raw frames to an ffmpeg process, with the cv.VideoWriter interface"""
+
+    def __init__(self, file, codec, fps, size, quality=None, preset=None, threads=0, ffmpeg="ffmpeg"):
+        """Start the ffmpeg process that encodes the frames into the file
+
+        Args:
+            file: output video file, its extension selects the container
+            codec: types.VideoCodec of the output video
+            fps: frames per second of the output video
+            size: (width, height) of the frames
+            quality: quality in [0, 100], higher is better and bigger, the encoder default if None
+            preset: encoder speed preset of H264 and HEVC, as "ultrafast" or "veryfast", the encoder default if None
+            threads: number of encoder threads, 0 lets ffmpeg choose
+            ffmpeg: ffmpeg executable
+
+        Raises:
+            ValueError: if ffmpeg is not found
+            ValueError: if quality is not in [0, 100]
+        """
+
+        if shutil.which(ffmpeg) is None:
+            raise ValueError(f"ffmpeg executable {ffmpeg} not found")
+        if quality is not None and not 0 <= quality <= 100:
+            raise ValueError("Quality must be in [0, 100]")
+
+        self._frame_size = (size[1], size[0], 3)
+        command = [ffmpeg, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "bgr24",
+                   "-s", f"{size[0]}x{size[1]}", "-r", str(fps), "-i", "-", "-an"]
+        command += _ffmpeg_encoder_options(codec, file, quality, preset, threads)
+        command.append(file)
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                         stderr=subprocess.PIPE)
+        self._released = False
+        logger.debug(f"ffmpeg video writer started: {' '.join(command)}")
+
+    def write(self, frame):
+        """Write a frame to the ffmpeg pipe
+
+        Raises:
+            ValueError: if the writer was released, the frame size is not the video size or ffmpeg failed
+        """
+
+        if self._released:
+            raise ValueError("Video writer already released")
+        if frame.shape != self._frame_size:
+            raise ValueError(f"Frame size {frame.shape} is not the video size {self._frame_size}")
+        try:
+            self._process.stdin.write(np.ascontiguousarray(frame).data)
+        except (BrokenPipeError, OSError):
+            self._released = True
+            self._process.wait()
+            raise ValueError(f"ffmpeg could not encode the video: {self._process.stderr.read().decode().strip()}")
+
+    def isOpened(self):
+        """Returns True while the ffmpeg process is running"""
+        return not self._released and self._process.poll() is None
+
+    def release(self):
+        """Close the pipe and wait for ffmpeg to finish the file
+
+        Raises:
+            ValueError: if ffmpeg failed
+        """
+
+        if self._released:
+            return
+        self._released = True
+        self._process.stdin.close()
+        error = self._process.stderr.read().decode().strip()
+        if self._process.wait() != 0:
+            raise ValueError(f"ffmpeg could not encode the video: {error}")
+        logger.debug("ffmpeg video writer released")
+
+
+class ScaledVideoWriter:
+    """Video writer that resizes the frames to the output size before writing them"""
+
+    def __init__(self, video_writer, size):
+        """Wrap a video writer opened with the output size
+
+        Args:
+            video_writer: opened video writer, cv.VideoWriter or FFmpegVideoWriter
+            size: (width, height) of the output video
+        """
+
+        self._video_writer = video_writer
+        self._size = tuple(size)
+
+    def write(self, frame):
+        """Resize the frame, with area interpolation when shrinking it, and write it"""
+
+        if (frame.shape[1], frame.shape[0]) != self._size:
+            shrink = frame.shape[1] > self._size[0]
+            frame = cv.resize(frame, self._size, interpolation=cv.INTER_AREA if shrink else cv.INTER_LINEAR)
+        self._video_writer.write(frame)
+
+    def isOpened(self):
+        """Returns True if the underlying video writer is opened"""
+        return self._video_writer.isOpened()
+
+    def release(self):
+        """Release the underlying video writer"""
+        self._video_writer.release()
+
+
+def ffmpeg_output_size(codec, size):
+    """Returns the (width, height) that the ffmpeg encoder of a codec can encode for frames of size
+
+    libx264 and libx265 can not encode yuv420p frames with an odd width or height, their size is rounded
+    down to even. The other encoders keep the size.
+    """
+
+    if _FFMPEG_ENCODERS[codec.name][0] not in ("libx264", "libx265"):
+        return tuple(size)
+    return (max(2 * (size[0] // 2), 2), max(2 * (size[1] // 2), 2))
+
+
+def _ffmpeg_encoder_options(codec, file, quality, preset, threads):
+    """Returns the ffmpeg output options of the encoder of a codec"""
+
+    encoder, quality_option, worst, best = _FFMPEG_ENCODERS[codec.name]
+    options = ["-c:v", encoder, "-pix_fmt", "yuvj420p" if encoder == "mjpeg" else "yuv420p"]
+    if encoder in ("libx264", "libx265") and preset is not None:
+        options += ["-preset", preset]
+    if encoder == "libvpx-vp9":
+        # The default deadline of libvpx is orders of magnitude slower than real time
+        options += ["-deadline", "realtime", "-cpu-used", "8", "-row-mt", "1", "-b:v", "0"]
+        quality = 60 if quality is None else quality
+    if quality is not None:
+        options += [quality_option, str(int(round(worst + (best - worst) * quality / 100)))]
+    if codec.name in ("DIVX", "XVID") and file.lower().endswith(".avi"):
+        options += ["-vtag", codec.value]
+    options += ["-threads", str(threads)]
+    return options
+